@@ -0,0 +1,82 @@
+"""zstd-compressed prompt and response on llm_requests
+
+Revision ID: 1f4c92b7e6a0
+Revises: e6f0b38a91d5
+Create Date: 2026-10-15 14:05:32.918247
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import zstandard
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f4c92b7e6a0'
+down_revision: Union[str, None] = 'e6f0b38a91d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ZSTD_LEVEL = 6
+PROMPT_PREFIX_LEN = 256
+BATCH_SIZE = 500
+
+
+def _compress(value):
+    return zstandard.compress(value.encode('utf-8'), ZSTD_LEVEL) if value is not None else None
+
+
+def _decompress(blob):
+    return zstandard.decompress(blob).decode('utf-8') if blob is not None else None
+
+
+def upgrade() -> None:
+    op.add_column('llm_requests', sa.Column('prompt_zstd', sa.LargeBinary(), nullable=True))
+    op.add_column('llm_requests', sa.Column('prompt_prefix', sa.String(length=PROMPT_PREFIX_LEN), nullable=True))
+    op.add_column('llm_requests', sa.Column('response_zstd', sa.LargeBinary(), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text('SELECT id, prompt, response FROM llm_requests')).yield_per(BATCH_SIZE)
+    update = sa.text(
+        'UPDATE llm_requests SET prompt_zstd = :prompt_zstd, prompt_prefix = :prompt_prefix, '
+        'response_zstd = :response_zstd WHERE id = :id'
+    )
+    for batch in rows.partitions():
+        bind.execute(update, [
+            {
+                'id': row.id,
+                'prompt_zstd': _compress(row.prompt),
+                'prompt_prefix': row.prompt[:PROMPT_PREFIX_LEN],
+                'response_zstd': _compress(row.response),
+            }
+            for row in batch
+        ])
+
+    op.alter_column('llm_requests', 'prompt_zstd', existing_type=sa.LargeBinary(), nullable=False)
+    op.drop_column('llm_requests', 'response')
+    op.drop_column('llm_requests', 'prompt')
+
+
+def downgrade() -> None:
+    op.add_column('llm_requests', sa.Column('prompt', sa.Text(), nullable=True))
+    op.add_column('llm_requests', sa.Column('response', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text('SELECT id, prompt_zstd, response_zstd FROM llm_requests')).yield_per(BATCH_SIZE)
+    update = sa.text('UPDATE llm_requests SET prompt = :prompt, response = :response WHERE id = :id')
+    for batch in rows.partitions():
+        bind.execute(update, [
+            {
+                'id': row.id,
+                'prompt': _decompress(row.prompt_zstd),
+                'response': _decompress(row.response_zstd),
+            }
+            for row in batch
+        ])
+
+    op.alter_column('llm_requests', 'prompt', existing_type=sa.Text(), nullable=False)
+    op.drop_column('llm_requests', 'response_zstd')
+    op.drop_column('llm_requests', 'prompt_prefix')
+    op.drop_column('llm_requests', 'prompt_zstd')
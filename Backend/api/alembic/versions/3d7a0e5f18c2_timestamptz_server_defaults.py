@@ -0,0 +1,64 @@
+"""timestamptz columns with server-side defaults
+
+Revision ID: 3d7a0e5f18c2
+Revises: 9b2f61d4c0ae
+Create Date: 2026-10-15 12:14:05.772031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7a0e5f18c2'
+down_revision: Union[str, None] = '9b2f61d4c0ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tabla, columna, con DEFAULT now())
+COLUMNS = [
+    ('users', 'created_at', True),
+    ('users', 'updated_at', True),
+    ('users', 'last_login', False),
+    ('models', 'created_at', True),
+    ('models', 'updated_at', True),
+    ('simulation_runs', 'start_time', False),
+    ('simulation_runs', 'end_time', False),
+    ('simulation_runs', 'created_at', True),
+    ('simulation_runs', 'updated_at', True),
+    ('audit_logs', 'timestamp', True),
+    ('attacks', 'started_at', False),
+    ('attacks', 'ended_at', False),
+    ('attacks', 'created_at', True),
+    ('attacks', 'updated_at', True),
+    ('ids_alerts', 'timestamp', False),
+    ('ids_alerts', 'resolved_at', False),
+    ('ids_alerts', 'created_at', True),
+    ('ids_alerts', 'updated_at', True),
+    ('thresholds', 'created_at', True),
+    ('thresholds', 'updated_at', True),
+    ('llm_requests', 'created_at', True),
+    ('llm_requests', 'completed_at', False),
+]
+
+
+def upgrade() -> None:
+    # Los valores existentes se guardaron con datetime.utcnow()
+    for table, column, has_default in COLUMNS:
+        op.alter_column(table, column,
+                   existing_type=sa.DateTime(),
+                   type_=sa.DateTime(timezone=True),
+                   server_default=sa.text('now()') if has_default else None,
+                   postgresql_using=f"\"{column}\" AT TIME ZONE 'UTC'")
+
+
+def downgrade() -> None:
+    for table, column, has_default in reversed(COLUMNS):
+        op.alter_column(table, column,
+                   existing_type=sa.DateTime(timezone=True),
+                   type_=sa.DateTime(),
+                   server_default=None,
+                   postgresql_using=f"\"{column}\" AT TIME ZONE 'UTC'")
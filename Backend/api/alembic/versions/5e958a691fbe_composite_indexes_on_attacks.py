@@ -0,0 +1,33 @@
+"""composite indexes on attacks
+
+Revision ID: 5e958a691fbe
+Revises: 7fea2f27e437
+Create Date: 2026-10-15 09:48:31.502177
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e958a691fbe'
+down_revision: Union[str, None] = '7fea2f27e437'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_attacks_sim_trigger', 'attacks', ['simulation_run_id', 'trigger_time'], unique=False)
+    op.create_index('ix_attacks_type_status', 'attacks', ['attack_type', 'status'], unique=False)
+    op.create_index('ix_attacks_created_by', 'attacks', ['created_by'], unique=False)
+    # ix_attacks_type_status cubre attack_type como prefijo
+    op.drop_index(op.f('ix_attacks_attack_type'), table_name='attacks')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_attacks_attack_type'), 'attacks', ['attack_type'], unique=False)
+    op.drop_index('ix_attacks_created_by', table_name='attacks')
+    op.drop_index('ix_attacks_type_status', table_name='attacks')
+    op.drop_index('ix_attacks_sim_trigger', table_name='attacks')
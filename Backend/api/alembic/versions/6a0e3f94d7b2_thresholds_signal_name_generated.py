@@ -0,0 +1,40 @@
+"""thresholds.signal_name as a generated column
+
+Revision ID: 6a0e3f94d7b2
+Revises: b5d27c6e0f39
+Create Date: 2026-10-15 15:20:44.087315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a0e3f94d7b2'
+down_revision: Union[str, None] = 'b5d27c6e0f39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Una columna existente no puede convertirse en GENERATED: se recrea
+    op.drop_index(op.f('ix_thresholds_signal_name'), table_name='thresholds')
+    op.drop_column('thresholds', 'signal_name')
+    op.add_column('thresholds', sa.Column(
+        'signal_name',
+        sa.String(length=201),
+        sa.Computed("component_id || '.' || signal_id", persisted=True),
+        nullable=False
+    ))
+    op.create_index(op.f('ix_thresholds_signal_name'), 'thresholds', ['signal_name'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_thresholds_signal_name'), table_name='thresholds')
+    op.drop_column('thresholds', 'signal_name')
+    op.add_column('thresholds', sa.Column('signal_name', sa.String(length=100), nullable=True))
+    op.execute("UPDATE thresholds SET signal_name = component_id || '.' || signal_id")
+    op.alter_column('thresholds', 'signal_name', existing_type=sa.String(length=100), nullable=False)
+    op.create_index(op.f('ix_thresholds_signal_name'), 'thresholds', ['signal_name'], unique=False)
@@ -0,0 +1,29 @@
+"""keyset pagination index on models
+
+Revision ID: 7c1e5b2a9f40
+Revises: 6a0e3f94d7b2
+Create Date: 2026-10-15 16:02:11.540128
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5b2a9f40'
+down_revision: Union[str, None] = '6a0e3f94d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_models_owner_created', 'models', ['owner_id', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_models_owner_created', table_name='models', postgresql_concurrently=True)
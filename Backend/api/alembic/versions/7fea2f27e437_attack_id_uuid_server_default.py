@@ -0,0 +1,38 @@
+"""attack_id as native UUID generated by the database
+
+Revision ID: 7fea2f27e437
+Revises: eafd1c5bb16a
+Create Date: 2026-10-15 09:12:04.318220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7fea2f27e437'
+down_revision: Union[str, None] = 'eafd1c5bb16a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    op.alter_column('attacks', 'attack_id',
+               existing_type=sa.String(length=36),
+               type_=postgresql.UUID(as_uuid=False),
+               existing_nullable=False,
+               server_default=sa.text('gen_random_uuid()'),
+               postgresql_using='attack_id::uuid')
+
+
+def downgrade() -> None:
+    op.alter_column('attacks', 'attack_id',
+               existing_type=postgresql.UUID(as_uuid=False),
+               type_=sa.String(length=36),
+               existing_nullable=False,
+               server_default=None,
+               postgresql_using='attack_id::text')
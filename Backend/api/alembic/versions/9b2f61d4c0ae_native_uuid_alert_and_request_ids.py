@@ -0,0 +1,44 @@
+"""native uuid for alert_id and request_id
+
+Revision ID: 9b2f61d4c0ae
+Revises: c41d8a2e93b7
+Create Date: 2026-10-15 11:36:50.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2f61d4c0ae'
+down_revision: Union[str, None] = 'c41d8a2e93b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('ids_alerts', 'alert_id',
+               existing_type=sa.String(length=36),
+               type_=sa.Uuid(),
+               existing_nullable=False,
+               postgresql_using='alert_id::uuid')
+    op.alter_column('llm_requests', 'request_id',
+               existing_type=sa.String(length=36),
+               type_=sa.Uuid(),
+               existing_nullable=False,
+               postgresql_using='request_id::uuid')
+
+
+def downgrade() -> None:
+    op.alter_column('llm_requests', 'request_id',
+               existing_type=sa.Uuid(),
+               type_=sa.String(length=36),
+               existing_nullable=False,
+               postgresql_using='request_id::text')
+    op.alter_column('ids_alerts', 'alert_id',
+               existing_type=sa.Uuid(),
+               type_=sa.String(length=36),
+               existing_nullable=False,
+               postgresql_using='alert_id::text')
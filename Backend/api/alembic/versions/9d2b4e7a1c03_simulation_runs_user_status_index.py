@@ -0,0 +1,29 @@
+"""user/status index on simulation_runs
+
+Revision ID: 9d2b4e7a1c03
+Revises: 7c1e5b2a9f40
+Create Date: 2026-10-15 17:20:44.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2b4e7a1c03'
+down_revision: Union[str, None] = '7c1e5b2a9f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_simulation_runs_user_status', 'simulation_runs', ['user_id', 'status'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_simulation_runs_user_status', table_name='simulation_runs', postgresql_concurrently=True)
@@ -0,0 +1,87 @@
+"""partition audit_logs by month
+
+Revision ID: a83e5c7d2f14
+Revises: 3d7a0e5f18c2
+Create Date: 2026-10-15 12:51:43.206617
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83e5c7d2f14'
+down_revision: Union[str, None] = '3d7a0e5f18c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MONTHS_AHEAD = 3
+
+FOREIGN_KEYS = {
+    'audit_logs': [
+        ('user_id', 'users'),
+    ],
+}
+
+INDEXES = {
+    'audit_logs': [
+        ('ix_audit_logs_id', ['id']),
+        ('ix_audit_logs_timestamp', ['timestamp']),
+        ('ix_audit_logs_user_ts', ['user_id', 'timestamp']),
+        ('ix_audit_logs_event_ts', ['event_type', 'timestamp']),
+    ],
+}
+
+
+def _add_months(d: date, months: int) -> date:
+    month = d.year * 12 + d.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def _swap_table(table: str, partitioned: bool) -> None:
+    """Recrea `table` (particionada o no) copiando los datos de la actual."""
+    bind = op.get_bind()
+
+    op.rename_table(table, f'{table}_old')
+    # La secuencia del SERIAL se reutiliza: que no se borre con la tabla vieja
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+
+    partition_by = ' PARTITION BY RANGE ("timestamp")' if partitioned else ''
+    op.execute(f'CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS){partition_by}')
+
+    if partitioned:
+        oldest = bind.execute(sa.text(f'SELECT min("timestamp") FROM {table}_old')).scalar()
+        today = datetime.now(timezone.utc).date()
+        month = _add_months(min(oldest.date(), today) if oldest else today, 0)
+        last = _add_months(today, MONTHS_AHEAD)
+        while month <= last:
+            end = _add_months(month, 1)
+            op.execute(
+                f'CREATE TABLE {table}_y{month.year:04d}m{month.month:02d} PARTITION OF {table} '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            month = end
+        # Red de seguridad si la rotación (app/db/partitions.py) no corre a tiempo
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {table}_old')
+    op.drop_table(f'{table}_old')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    op.create_primary_key(f'{table}_pkey', table, ['id', 'timestamp'] if partitioned else ['id'])
+    for column, referent in FOREIGN_KEYS[table]:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, referent, [column], ['id'])
+    for name, columns in INDEXES[table]:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    _swap_table('audit_logs', partitioned=True)
+
+
+def downgrade() -> None:
+    _swap_table('audit_logs', partitioned=False)
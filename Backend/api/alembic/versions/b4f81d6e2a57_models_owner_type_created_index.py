@@ -0,0 +1,36 @@
+"""owner/type covering index on models
+
+Revision ID: b4f81d6e2a57
+Revises: 9d2b4e7a1c03
+Create Date: 2026-10-15 17:41:09.317582
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f81d6e2a57'
+down_revision: Union[str, None] = '9d2b4e7a1c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_models_owner_type_created',
+            'models',
+            ['owner_id', 'model_type', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_include=['name', 'version'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_models_owner_type_created', table_name='models', postgresql_concurrently=True)
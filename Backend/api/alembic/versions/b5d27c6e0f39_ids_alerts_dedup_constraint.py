@@ -0,0 +1,45 @@
+"""dedup unique index on ids_alerts
+
+Revision ID: b5d27c6e0f39
+Revises: 1f4c92b7e6a0
+Create Date: 2026-10-15 14:48:21.530964
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d27c6e0f39'
+down_revision: Union[str, None] = '1f4c92b7e6a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Misma ventana de detección; un tipo NULL cuenta como un valor más
+DEDUP_COLUMNS = ['simulation_run_id', 'simulation_time', sa.text("COALESCE(detected_attack_type, '')")]
+
+
+def upgrade() -> None:
+    # Alertas ya repetidas: se conserva la primera (menor id) de cada ventana
+    removed = op.get_bind().execute(sa.text(
+        'DELETE FROM ids_alerts a USING ids_alerts b '
+        'WHERE a.simulation_run_id = b.simulation_run_id '
+        'AND a.simulation_time = b.simulation_time '
+        "AND COALESCE(a.detected_attack_type, '') = COALESCE(b.detected_attack_type, '') "
+        'AND a.id > b.id'
+    )).rowcount
+    if removed:
+        logger.warning('Eliminadas %d alertas IDS duplicadas antes de crear uq_ids_alert_dedup', removed)
+
+    # ix_ids_alerts_alert_id (único) ya existe desde la migración inicial
+    op.create_index('uq_ids_alert_dedup', 'ids_alerts', DEDUP_COLUMNS, unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_ids_alert_dedup', table_name='ids_alerts')
@@ -0,0 +1,34 @@
+"""composite indexes on audit_logs
+
+Revision ID: c41d8a2e93b7
+Revises: 5e958a691fbe
+Create Date: 2026-10-15 11:02:17.384920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d8a2e93b7'
+down_revision: Union[str, None] = '5e958a691fbe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_audit_logs_user_ts', 'audit_logs', ['user_id', 'timestamp'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_audit_logs_event_ts', 'audit_logs', ['event_type', 'timestamp'], unique=False, postgresql_concurrently=True)
+        # ix_audit_logs_event_ts cubre event_type como prefijo
+        op.drop_index(op.f('ix_audit_logs_event_type'), table_name='audit_logs', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_audit_logs_event_type'), 'audit_logs', ['event_type'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_audit_logs_event_ts', table_name='audit_logs', postgresql_concurrently=True)
+        op.drop_index('ix_audit_logs_user_ts', table_name='audit_logs', postgresql_concurrently=True)
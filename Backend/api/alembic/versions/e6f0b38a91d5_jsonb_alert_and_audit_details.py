@@ -0,0 +1,48 @@
+"""jsonb for ids_alerts and audit_logs details
+
+Revision ID: e6f0b38a91d5
+Revises: a83e5c7d2f14
+Create Date: 2026-10-15 13:27:09.651384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f0b38a91d5'
+down_revision: Union[str, None] = 'a83e5c7d2f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = [
+    ('ids_alerts', 'affected_signals', False),
+    ('ids_alerts', 'shap_explanation', True),
+    ('ids_alerts', 'anomaly_details', True),
+    ('audit_logs', 'details', True),
+]
+
+
+def upgrade() -> None:
+    for table, column, nullable in COLUMNS:
+        op.alter_column(table, column,
+                   existing_type=sa.JSON(),
+                   type_=postgresql.JSONB(),
+                   existing_nullable=nullable,
+                   postgresql_using=f'{column}::jsonb')
+    op.create_index('ix_ids_alerts_affected_signals', 'ids_alerts', ['affected_signals'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'affected_signals': 'jsonb_path_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ids_alerts_affected_signals', table_name='ids_alerts', postgresql_using='gin')
+    for table, column, nullable in reversed(COLUMNS):
+        op.alter_column(table, column,
+                   existing_type=postgresql.JSONB(),
+                   type_=sa.JSON(),
+                   existing_nullable=nullable,
+                   postgresql_using=f'{column}::json')
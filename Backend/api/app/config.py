@@ -1,16 +1,28 @@
 """
 Configuración de la aplicación
 """
-from pydantic_settings import BaseSettings
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 from functools import lru_cache
-from typing import List
+from typing import Annotated, Any, List, Optional
 import os
 from pathlib import Path
 
+import orjson
+
 
 class Settings(BaseSettings):
     """Configuración de la aplicación."""
     
+    model_config = SettingsConfigDict(
+        # Buscar .env en la carpeta api/, incluso si se ejecuta desde otro lugar
+        env_file=os.environ.get('ENV_FILE', str(Path(__file__).parent.parent / ".env")),
+        env_parse_none_str="null",
+        case_sensitive=True,
+        extra="ignore",
+        frozen=True  # Inmutable: se lee en caliente y se comparte vía lru_cache
+    )
+    
     # Project Info
     PROJECT_NAME: str
     VERSION: str 
@@ -33,6 +45,10 @@ class Settings(BaseSettings):
     DATABASE_URL: str 
     DATABASE_POOL_SIZE: int 
     DATABASE_MAX_OVERFLOW: int 
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_TIMEOUT: int = 10  # Segundos esperando una conexión libre antes de fallar
+    PARTITION_RETENTION_MONTHS: int = 0  # audit_logs; 0 = sin límite
     
     # LLM Configuration
     LLM_PROVIDER: str 
@@ -51,9 +67,22 @@ class Settings(BaseSettings):
     
     # Local LLM
     LOCAL_LLM_ENDPOINT: str
+    
+    # HTTP pool (conectores LLM)
+    HTTPX_MAX_CONNECTIONS: int = 1024
+    HTTPX_MAX_KEEPALIVE: int = 256
+    
+    # Caché semántico de generate_model (prompts casi idénticos reutilizan el modelo)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Similitud coseno mínima para un hit
+    SEMANTIC_CACHE_TTL_S: int = 86400
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1024  # Por model_type
+    
+    # Redis (opcional): broadcast de telemetría entre workers; sin URL, solo en proceso
+    REDIS_URL: Optional[str] = None
 
     # CORS
-    CORS_ORIGINS: List[str] 
+    CORS_ORIGINS: Annotated[List[str], NoDecode]
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -77,10 +106,16 @@ class Settings(BaseSettings):
     GITHUB_CLIENT_ID: str 
     GITHUB_CLIENT_SECRET: str 
     
-    class Config:
-        # Buscar .env en la carpeta api/, incluso si se ejecuta desde otro lugar
-        env_file = os.environ.get('ENV_FILE', str(Path(__file__).parent.parent / ".env"))
-        case_sensitive = True
+    @field_validator("CORS_ORIGINS", mode="before")
+    @classmethod
+    def _parse_cors_origins(cls, v: Any) -> Any:
+        """Acepta un array JSON o una lista separada por comas."""
+        if isinstance(v, str):
+            v = v.strip()
+            if v.startswith("["):
+                return orjson.loads(v)
+            return [origin.strip() for origin in v.split(",") if origin.strip()]
+        return v
 
 
 @lru_cache()
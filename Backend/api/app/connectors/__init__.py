@@ -7,6 +7,15 @@ Este paquete contiene adaptadores para integrar con:
 - Bases de datos externas
 """
 
-from app.connectors.llm import OpenAIAdapter, AnthropicAdapter
-
 __all__ = ["OpenAIAdapter", "AnthropicAdapter"]
+
+
+def __getattr__(name: str):
+    """
+    Import perezoso de los adaptadores (PEP 562): el SDK de cada proveedor
+    solo se carga cuando se usa.
+    """
+    if name in __all__:
+        from app.connectors import llm
+        return getattr(llm, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,4 +1,12 @@
-from .openai_adapter import OpenAIAdapter
-from .anthropic_adapter import AnthropicAdapter
-
 __all__ = ["OpenAIAdapter", "AnthropicAdapter"]
+
+
+def __getattr__(name: str):
+    """Import perezoso de los adaptadores (PEP 562)."""
+    if name == "OpenAIAdapter":
+        from .openai_adapter import OpenAIAdapter
+        return OpenAIAdapter
+    if name == "AnthropicAdapter":
+        from .anthropic_adapter import AnthropicAdapter
+        return AnthropicAdapter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,17 +7,71 @@ Soporta:
 - Claude Haiku (más rápido y económico)
 """
 
-import anthropic
-from typing import Dict, Optional
-import json
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, List, Optional, Union
 import logging
-from datetime import datetime
+import time
+
+import orjson
 
 from app.config import get_settings
+from app.connectors.llm import cache
+from app.connectors.llm.batching import gather_limited
+from app.connectors.llm.clients import get_anthropic_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Valores de settings leídos una sola vez
+_ANTHROPIC_API_KEY = settings.ANTHROPIC_API_KEY
+
+# Tarifas por token (input, output) en USD
+_RATES = MappingProxyType({
+    "claude-sonnet-4.5": (3.00e-6, 15.00e-6),
+    "claude-3-opus-20240229": (15.00e-6, 75.00e-6),
+    "claude-3-haiku-20240307": (0.25e-6, 1.25e-6),
+})
+
+# Prompt caching: escribir el prefijo cuesta 1.25x la tarifa de input, leerlo 0.1x
+_CACHE_WRITE_FACTOR = 1.25
+_CACHE_READ_FACTOR = 0.10
+
+_JSON_SYSTEM_SUFFIX = "\n\nYou MUST respond with valid JSON only."
+_JSON_SYSTEM_DEFAULT = "You are a helpful assistant that responds with valid JSON only."
+
+
+def _usage_dict(usage) -> Dict:
+    """Uso de tokens de un mensaje (input_tokens no incluye los tokens escritos/leídos del cache)."""
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    prompt_tokens = usage.input_tokens + cache_write + cache_read
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": usage.output_tokens,
+        "total_tokens": prompt_tokens + usage.output_tokens,
+        "cache_creation_input_tokens": cache_write,
+        "cache_read_input_tokens": cache_read
+    }
+
+
+def _attach_json(response: Dict) -> Dict:
+    """Agrega parsed_json / validation_error a una respuesta de generate."""
+    try:
+        response["parsed_json"] = orjson.loads(response["content"])
+        response["validation_error"] = None
+    except orjson.JSONDecodeError as e:
+        response["parsed_json"] = None
+        response["validation_error"] = f"Invalid JSON: {str(e)}"
+    
+    return response
+
+
+def _system_blocks(system_prompt: Optional[str]) -> Union[List[Dict], str]:
+    """El system prompt es estático: se marca como prefijo cacheable en el proveedor."""
+    if not system_prompt:
+        return ""
+    return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
 
 class AnthropicAdapter:
     """
@@ -31,17 +85,17 @@ class AnthropicAdapter:
         temperature: float = 0.0,
         max_tokens: int = 4096
     ):
-        self.api_key = api_key or settings.ANTHROPIC_API_KEY
+        self.api_key = api_key or _ANTHROPIC_API_KEY
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-        # Cliente Anthropic
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        # Cliente Anthropic compartido del proceso
+        self.client = get_anthropic_client(self.api_key)
         
         logger.info(f"Anthropic adapter inicializado con modelo: {model}")
     
-    def generate(
+    async def generate(
         self,
         prompt: str,
         system_prompt: Optional[str] = None
@@ -49,49 +103,97 @@ class AnthropicAdapter:
         """
         Genera una respuesta con Claude.
         """
-        start_time = datetime.now()
+        # Cache exacto (solo respuestas determinísticas)
+        cache_key = None
+        if self.temperature == 0.0:
+            cache_key = cache.make_key(self.model, self.temperature, system_prompt, prompt)
+            cached = cache.get_cached(cache_key)
+            if cached is not None:
+                logger.info(f"✅ Respuesta servida desde cache ({self.model})")
+                return cached
+        
+        t0 = time.perf_counter_ns()
         
         try:
             # Llamar a Claude
             logger.info(f"Generando respuesta con {self.model}...")
             
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model=self.model,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
-                system=system_prompt if system_prompt else "",
+                system=_system_blocks(system_prompt),
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
             )
             
             # Calcular latencia
-            latency_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+            latency_ms = (time.perf_counter_ns() - t0) // 1_000_000
             
             # Extraer respuesta
             content = message.content[0].text
             
-            # Uso de tokens
-            usage = {
-                "prompt_tokens": message.usage.input_tokens,
-                "completion_tokens": message.usage.output_tokens,
-                "total_tokens": message.usage.input_tokens + message.usage.output_tokens
-            }
+            usage = _usage_dict(message.usage)
             
             logger.info(f"✅ Respuesta generada ({latency_ms}ms, {usage['total_tokens']} tokens)")
             
-            return {
+            result = {
                 "content": content,
                 "finish_reason": message.stop_reason,
                 "usage": usage,
-                "latency_ms": latency_ms
+                "latency_ms": latency_ms,
+                "cache_hit": False
             }
+            
+            if cache_key is not None:
+                cache.store(cache_key, result)
+            
+            return result
         
         except Exception as e:
             logger.error(f"Error al generar respuesta: {str(e)}")
             raise
     
-    def generate_json(
+    async def generate_many(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_concurrency: int = 64,
+        rpm: Optional[int] = None,
+        use_batch_api: bool = False
+    ) -> Union[List[Union[Dict, BaseException]], str]:
+        """
+        Genera respuestas para varios prompts en paralelo.
+        
+        Args:
+            prompts: Prompts del usuario
+            system_prompt: Instrucciones del sistema (compartidas)
+            max_concurrency: Máximo de requests simultáneas
+            rpm: Límite de requests por minuto (None = sin límite)
+            use_batch_api: Si True, envía los prompts a la Batch API del
+                proveedor (trabajos offline, mitad de costo) y retorna el
+                batch_id para consultarlo con poll_batch
+        
+        Returns:
+            Lista de respuestas (mismo formato que generate) en el orden de
+            `prompts`; las requests fallidas aparecen como excepciones.
+            Con use_batch_api, el batch_id.
+        """
+        if use_batch_api:
+            return await self.submit_batch([
+                {"custom_id": str(i), "prompt": p, "system_prompt": system_prompt}
+                for i, p in enumerate(prompts)
+            ])
+        
+        return await gather_limited(
+            lambda p: self.generate(p, system_prompt),
+            prompts,
+            max_concurrency=max_concurrency,
+            rpm=rpm
+        )
+    
+    async def generate_json(
         self,
         prompt: str,
         system_prompt: Optional[str] = None
@@ -99,22 +201,163 @@ class AnthropicAdapter:
         """
         Genera una respuesta en formato JSON.
         """
-        if system_prompt:
-            system_prompt += "\n\nYou MUST respond with valid JSON only."
-        else:
-            system_prompt = "You are a helpful assistant that responds with valid JSON only."
+        system_prompt = system_prompt + _JSON_SYSTEM_SUFFIX if system_prompt else _JSON_SYSTEM_DEFAULT
         
-        response = self.generate(prompt, system_prompt)
+        response = await self.generate(prompt, system_prompt)
+        
+        return _attach_json(response)
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[Union[str, Dict]]:
+        """
+        Genera una respuesta con Claude en streaming.
+        
+        Yields:
+            Fragmentos de texto a medida que llegan; el último elemento es
+            el dict de resultado (mismo formato que generate)
+        """
+        cache_key = None
+        if self.temperature == 0.0:
+            cache_key = cache.make_key(self.model, self.temperature, system_prompt, prompt)
+            cached = cache.get_cached(cache_key)
+            if cached is not None:
+                logger.info(f"✅ Respuesta servida desde cache ({self.model})")
+                yield cached["content"]
+                yield cached
+                return
+        
+        t0 = time.perf_counter_ns()
         
         try:
-            json_content = json.loads(response["content"])
-            response["parsed_json"] = json_content
-            response["validation_error"] = None
-            return response
-        except json.JSONDecodeError as e:
-            response["parsed_json"] = None
-            response["validation_error"] = f"Invalid JSON: {str(e)}"
-            return response
+            logger.info(f"Generando respuesta en streaming con {self.model}...")
+            
+            async with self.client.messages.stream(
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                system=_system_blocks(system_prompt),
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                
+                message = await stream.get_final_message()
+            
+            latency_ms = (time.perf_counter_ns() - t0) // 1_000_000
+            usage = _usage_dict(message.usage)
+            
+            logger.info(f"✅ Respuesta generada en streaming ({latency_ms}ms, {usage['total_tokens']} tokens)")
+            
+            result = {
+                "content": "".join(block.text for block in message.content if block.type == "text"),
+                "finish_reason": message.stop_reason,
+                "usage": usage,
+                "latency_ms": latency_ms,
+                "cache_hit": False
+            }
+            
+            if cache_key is not None:
+                cache.store(cache_key, result)
+            
+            yield result
+        
+        except Exception as e:
+            logger.error(f"Error al generar respuesta: {str(e)}")
+            raise
+    
+    async def generate_json_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[Union[str, Dict]]:
+        """
+        Versión streaming de generate_json.
+        
+        Yields:
+            Fragmentos de texto; el último elemento es el dict de resultado
+            con parsed_json / validation_error
+        """
+        system_prompt = system_prompt + _JSON_SYSTEM_SUFFIX if system_prompt else _JSON_SYSTEM_DEFAULT
+        
+        async for item in self.generate_stream(prompt, system_prompt):
+            yield _attach_json(item) if isinstance(item, dict) else item
+    
+    async def submit_batch(self, requests: List[Dict]) -> str:
+        """
+        Envía un lote a la Message Batches API de Anthropic.
+        
+        Args:
+            requests: [{"custom_id": "1", "prompt": "...", "system_prompt": "..."}]
+        
+        Returns:
+            ID del batch
+        """
+        batch = await self.client.beta.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": req["custom_id"],
+                    "params": {
+                        "model": self.model,
+                        "max_tokens": self.max_tokens,
+                        "temperature": self.temperature,
+                        "system": req.get("system_prompt") or "",
+                        "messages": [{"role": "user", "content": req["prompt"]}]
+                    }
+                }
+                for req in requests
+            ]
+        )
+        
+        logger.info(f"✅ Batch enviado a Anthropic ({batch.id}, {len(requests)} requests)")
+        
+        return batch.id
+    
+    async def poll_batch(self, batch_id: str) -> Dict:
+        """
+        Consulta el estado de un batch y, si terminó, sus resultados.
+        
+        Returns:
+            {"batch_id", "status", "done", "results": [...] | None}
+        """
+        batch = await self.client.beta.messages.batches.retrieve(batch_id)
+        done = batch.processing_status == "ended"
+        results = None
+        
+        if done:
+            results = []
+            
+            async for entry in await self.client.beta.messages.batches.results(batch_id):
+                if entry.result.type == "succeeded":
+                    message = entry.result.message
+                    results.append({
+                        "custom_id": entry.custom_id,
+                        "content": message.content[0].text,
+                        "usage": {
+                            "prompt_tokens": message.usage.input_tokens,
+                            "completion_tokens": message.usage.output_tokens,
+                            "total_tokens": message.usage.input_tokens + message.usage.output_tokens
+                        },
+                        "error": None
+                    })
+                else:
+                    results.append({
+                        "custom_id": entry.custom_id,
+                        "content": None,
+                        "usage": None,
+                        "error": entry.result.type
+                    })
+        
+        return {
+            "batch_id": batch.id,
+            "status": batch.processing_status,
+            "done": done,
+            "results": results
+        }
     
     def estimate_cost(self, usage: Dict) -> float:
         """
@@ -124,16 +367,16 @@ class AnthropicAdapter:
         - claude-sonnet-4.5: $3/1M input, $15/1M output
         - claude-opus: $15/1M input, $75/1M output
         - claude-haiku: $0.25/1M input, $1.25/1M output
-        """
-        rates = {
-            "claude-sonnet-4.5": {"input": 3.00, "output": 15.00},
-            "claude-3-opus-20240229": {"input": 15.00, "output": 75.00},
-            "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25},
-        }
         
-        model_rates = rates.get(self.model, rates["claude-sonnet-4.5"])
-        
-        input_cost = (usage["prompt_tokens"] / 1_000_000) * model_rates["input"]
-        output_cost = (usage["completion_tokens"] / 1_000_000) * model_rates["output"]
+        Los tokens de prompt caching se cobran aparte (escritura 1.25x, lectura 0.1x).
+        """
+        input_rate, output_rate = _RATES.get(self.model, _RATES["claude-sonnet-4.5"])
+        cache_write = usage.get("cache_creation_input_tokens", 0)
+        cache_read = usage.get("cache_read_input_tokens", 0)
+        uncached = usage["prompt_tokens"] - cache_write - cache_read
         
-        return round(input_cost + output_cost, 6)
+        return round(
+            (uncached + cache_write * _CACHE_WRITE_FACTOR + cache_read * _CACHE_READ_FACTOR) * input_rate
+            + usage["completion_tokens"] * output_rate,
+            6
+        )
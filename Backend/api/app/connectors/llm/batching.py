@@ -0,0 +1,43 @@
+"""
+Fan-out concurrente de prompts para los adaptadores LLM.
+
+Limita la concurrencia con un semáforo y, opcionalmente, las requests por
+minuto con un token bucket (aiolimiter).
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from aiolimiter import AsyncLimiter
+
+
+async def gather_limited(
+    call: Callable[[str], Awaitable[Dict]],
+    prompts: List[str],
+    max_concurrency: int = 64,
+    rpm: Optional[int] = None
+) -> List[Union[Dict, BaseException]]:
+    """
+    Ejecuta `call(prompt)` para cada prompt en paralelo.
+
+    Args:
+        call: Corrutina que genera la respuesta de un prompt
+        prompts: Prompts a procesar
+        max_concurrency: Máximo de requests en vuelo
+        rpm: Límite de requests por minuto (None = sin límite)
+
+    Returns:
+        Resultados en el mismo orden que `prompts`; los errores se retornan
+        como excepciones en su posición.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = AsyncLimiter(rpm, 60) if rpm else None
+
+    async def one(prompt: str) -> Dict:
+        async with semaphore:
+            if limiter is not None:
+                async with limiter:
+                    return await call(prompt)
+            return await call(prompt)
+
+    return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
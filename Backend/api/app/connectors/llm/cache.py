@@ -0,0 +1,55 @@
+"""
+Cache exacto de respuestas LLM.
+
+Solo se usa con temperature == 0.0, donde la respuesta es (casi)
+determinística. Un hit evita la llamada al proveedor: sin latencia de red y
+sin costo de tokens.
+"""
+
+from hashlib import blake2b
+from typing import Dict, Optional
+
+from cachetools import LRUCache
+
+_ZERO_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+_exact: LRUCache = LRUCache(maxsize=4096)
+
+
+def make_key(model: str, temperature: float, system_prompt: Optional[str], prompt: str, *extra: str) -> bytes:
+    """
+    Construye la clave del cache a partir de todo lo que define la respuesta.
+    """
+    h = blake2b(digest_size=32)
+    for part in (model, repr(temperature), system_prompt or "", prompt, *extra):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.digest()
+
+
+def get_cached(key: bytes) -> Optional[Dict]:
+    """
+    Retorna una copia de la respuesta cacheada (uso en cero), o None.
+    """
+    cached = _exact.get(key)
+    if cached is None:
+        return None
+
+    return {
+        **cached,
+        "usage": dict(_ZERO_USAGE),
+        "latency_ms": 0,
+        "cache_hit": True
+    }
+
+
+def store(key: bytes, response: Dict) -> None:
+    """
+    Guarda una copia de la respuesta (los llamadores pueden mutar la original).
+    """
+    _exact[key] = dict(response)
+
+
+def clear() -> None:
+    """Vacía el cache."""
+    _exact.clear()
@@ -0,0 +1,113 @@
+"""
+Clientes compartidos para los conectores LLM.
+
+Todos los adaptadores reutilizan un único httpx.AsyncClient y un cliente SDK
+por (proveedor, api_key), para que las conexiones TLS a los proveedores se
+mantengan abiertas entre requests.
+"""
+
+import asyncio
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    import anthropic
+    import openai
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# Singleton
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Obtiene el cliente HTTP compartido (se crea en el primer uso).
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTPX_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTPX_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(120.0, connect=5.0),
+        )
+        logger.info("✅ Pool HTTP para LLM inicializado")
+
+    return _http_client
+
+
+@lru_cache(maxsize=8)
+def get_openai_client(api_key: str) -> "openai.AsyncOpenAI":
+    """
+    Obtiene el cliente OpenAI del proceso para una API key (cached).
+    """
+    import openai
+
+    return openai.AsyncOpenAI(api_key=api_key, http_client=get_http_client())
+
+
+@lru_cache(maxsize=8)
+def get_anthropic_client(api_key: str) -> "anthropic.AsyncAnthropic":
+    """
+    Obtiene el cliente Anthropic del proceso para una API key (cached).
+    """
+    import anthropic
+
+    return anthropic.AsyncAnthropic(api_key=api_key, http_client=get_http_client())
+
+
+async def warmup_http_client() -> None:
+    """
+    Abre conexiones keepalive hacia el proveedor activo (settings.LLM_PROVIDER).
+
+    Se lanza como task en el startup (sin bloquearlo) para que el handshake
+    TLS no caiga sobre las primeras requests de usuarios. Los errores solo
+    se registran.
+    """
+    if settings.LLM_PROVIDER == "openai":
+        url = "https://api.openai.com/v1/models"
+        headers = {"Authorization": f"Bearer {settings.OPENAI_API_KEY}"}
+    elif settings.LLM_PROVIDER == "anthropic":
+        url = "https://api.anthropic.com/v1/models"
+        headers = {"x-api-key": settings.ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01"}
+    else:
+        return
+
+    client = get_http_client()
+    connections = max(1, settings.HTTPX_MAX_KEEPALIVE // 8)
+    results = await asyncio.gather(
+        *[client.get(url, headers=headers, timeout=5.0) for _ in range(connections)],
+        return_exceptions=True
+    )
+
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    if failed:
+        logger.warning(f"⚠️ Warmup del pool LLM: {failed}/{len(results)} conexiones fallaron")
+    else:
+        logger.info(f"✅ Pool LLM precalentado ({len(results)} conexiones)")
+
+
+async def close_http_client() -> None:
+    """
+    Cierra el cliente HTTP compartido (se llama en el shutdown de la app).
+    """
+    global _http_client
+
+    # Los clientes SDK cacheados apuntan al pool que se va a cerrar
+    get_openai_client.cache_clear()
+    get_anthropic_client.cache_clear()
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("Pool HTTP para LLM cerrado")
@@ -8,16 +8,63 @@ Soporta:
 """
 
 import openai
-from typing import Dict, Optional, List
-import json
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Optional, List, Union
 import logging
-from datetime import datetime
+import time
+
+import orjson
 
 from app.config import get_settings
+from app.connectors.llm import cache
+from app.connectors.llm.batching import gather_limited
+from app.connectors.llm.clients import get_openai_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Valores de settings leídos una sola vez
+_OPENAI_API_KEY = settings.OPENAI_API_KEY
+
+# Tarifas por token (input, output) en USD
+_RATES = MappingProxyType({
+    "gpt-4o-mini": (0.150e-6, 0.600e-6),
+    "gpt-4o": (2.50e-6, 10.00e-6),
+    "gpt-4": (30.00e-6, 60.00e-6),
+    "gpt-4-turbo": (10.00e-6, 30.00e-6),
+})
+
+# Prefix caching automático: los tokens de prompt cacheados cuestan la mitad
+_CACHE_READ_FACTOR = 0.50
+
+_JSON_SYSTEM_SUFFIX = "\n\nYou MUST respond with valid JSON only. No markdown, no explanations."
+_JSON_SYSTEM_DEFAULT = "You are a helpful assistant that responds with valid JSON only."
+
+
+def _usage_dict(usage) -> Dict:
+    """Uso de tokens de una respuesta (el prefijo >= 1024 tokens se cachea solo en el proveedor)."""
+    details = usage.prompt_tokens_details
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": (details.cached_tokens or 0) if details else 0
+    }
+
+
+def _attach_json(response: Dict) -> Dict:
+    """Agrega parsed_json / validation_error a una respuesta de generate."""
+    try:
+        response["parsed_json"] = orjson.loads(response["content"])
+        response["validation_error"] = None
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Error al parsear JSON: {str(e)}")
+        response["parsed_json"] = None
+        response["validation_error"] = f"Invalid JSON: {str(e)}"
+    
+    return response
+
 
 class OpenAIAdapter:
     """
@@ -40,17 +87,34 @@ class OpenAIAdapter:
             temperature: Creatividad (0.0 = determinístico, 1.0 = creativo)
             max_tokens: Máximo de tokens en la respuesta
         """
-        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.api_key = api_key or _OPENAI_API_KEY
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-        # Configurar cliente OpenAI
-        openai.api_key = self.api_key
+        # Cliente compartido del proceso (no se muta el módulo openai)
+        self.client = get_openai_client(self.api_key)
         
         logger.info(f"OpenAI adapter inicializado con modelo: {model}")
     
-    def generate(
+    def _messages(self, prompt: str, system_prompt: Optional[str]) -> List[Dict]:
+        """Mensajes de chat (system opcional + user)."""
+        messages = []
+        
+        if system_prompt:
+            messages.append({
+                "role": "system",
+                "content": system_prompt
+            })
+        
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        
+        return messages
+    
+    async def generate(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
@@ -73,30 +137,31 @@ class OpenAIAdapter:
                     "completion_tokens": 1500,
                     "total_tokens": 1750
                 },
-                "latency_ms": 2345
+                "latency_ms": 2345,
+                "cache_hit": False
             }
         """
-        start_time = datetime.now()
+        # Cache exacto (solo respuestas determinísticas)
+        cache_key = None
+        if self.temperature == 0.0:
+            cache_key = cache.make_key(
+                self.model, self.temperature, system_prompt, prompt, response_format or ""
+            )
+            cached = cache.get_cached(cache_key)
+            if cached is not None:
+                logger.info(f"✅ Respuesta servida desde cache ({self.model})")
+                return cached
+        
+        t0 = time.perf_counter_ns()
         
         try:
             # Construir mensajes
-            messages = []
-            
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            messages = self._messages(prompt, system_prompt)
             
             # Llamar a OpenAI
             logger.info(f"Generando respuesta con {self.model}...")
             
-            response = openai.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=self.temperature,
@@ -105,27 +170,28 @@ class OpenAIAdapter:
             )
             
             # Calcular latencia
-            latency_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+            latency_ms = (time.perf_counter_ns() - t0) // 1_000_000
             
             # Extraer respuesta
             content = response.choices[0].message.content
             finish_reason = response.choices[0].finish_reason
             
-            # Uso de tokens
-            usage = {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
-            }
+            usage = _usage_dict(response.usage)
             
             logger.info(f"✅ Respuesta generada ({latency_ms}ms, {usage['total_tokens']} tokens)")
             
-            return {
+            result = {
                 "content": content,
                 "finish_reason": finish_reason,
                 "usage": usage,
-                "latency_ms": latency_ms
+                "latency_ms": latency_ms,
+                "cache_hit": False
             }
+            
+            if cache_key is not None:
+                cache.store(cache_key, result)
+            
+            return result
         
         except openai.APIError as e:
             logger.error(f"OpenAI API error: {str(e)}")
@@ -135,7 +201,45 @@ class OpenAIAdapter:
             logger.error(f"Error al generar respuesta: {str(e)}")
             raise
     
-    def generate_json(
+    async def generate_many(
+        self,
+        prompts: List[str],
+        system_prompt: Optional[str] = None,
+        max_concurrency: int = 64,
+        rpm: Optional[int] = None,
+        use_batch_api: bool = False
+    ) -> Union[List[Union[Dict, BaseException]], str]:
+        """
+        Genera respuestas para varios prompts en paralelo.
+        
+        Args:
+            prompts: Prompts del usuario
+            system_prompt: Instrucciones del sistema (compartidas)
+            max_concurrency: Máximo de requests simultáneas
+            rpm: Límite de requests por minuto (None = sin límite)
+            use_batch_api: Si True, envía los prompts a la Batch API del
+                proveedor (trabajos offline, mitad de costo) y retorna el
+                batch_id para consultarlo con poll_batch
+        
+        Returns:
+            Lista de respuestas (mismo formato que generate) en el orden de
+            `prompts`; las requests fallidas aparecen como excepciones.
+            Con use_batch_api, el batch_id.
+        """
+        if use_batch_api:
+            return await self.submit_batch([
+                {"custom_id": str(i), "prompt": p, "system_prompt": system_prompt}
+                for i, p in enumerate(prompts)
+            ])
+        
+        return await gather_limited(
+            lambda p: self.generate(p, system_prompt),
+            prompts,
+            max_concurrency=max_concurrency,
+            rpm=rpm
+        )
+    
+    async def generate_json(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
@@ -153,37 +257,209 @@ class OpenAIAdapter:
             Dict con el JSON parseado
         """
         # Agregar instrucción de JSON al system prompt
-        if system_prompt:
-            system_prompt += "\n\nYou MUST respond with valid JSON only. No markdown, no explanations."
-        else:
-            system_prompt = "You are a helpful assistant that responds with valid JSON only."
+        system_prompt = system_prompt + _JSON_SYSTEM_SUFFIX if system_prompt else _JSON_SYSTEM_DEFAULT
         
         # Generar respuesta
-        response = self.generate(
+        response = await self.generate(
             prompt=prompt,
             system_prompt=system_prompt,
             response_format="json_object"
         )
         
-        # Parsear JSON
+        # TODO: Validar contra schema (jsonschema) si se provee
+        return _attach_json(response)
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        response_format: Optional[str] = "json_object"
+    ) -> AsyncIterator[Union[str, Dict]]:
+        """
+        Genera una respuesta en streaming (SSE del proveedor).
+        
+        Yields:
+            Fragmentos de texto a medida que llegan; el último elemento es
+            el dict de resultado (mismo formato que generate)
+        """
+        cache_key = None
+        if self.temperature == 0.0:
+            cache_key = cache.make_key(
+                self.model, self.temperature, system_prompt, prompt, response_format or ""
+            )
+            cached = cache.get_cached(cache_key)
+            if cached is not None:
+                logger.info(f"✅ Respuesta servida desde cache ({self.model})")
+                yield cached["content"]
+                yield cached
+                return
+        
+        t0 = time.perf_counter_ns()
+        
         try:
-            json_content = json.loads(response["content"])
-            response["parsed_json"] = json_content
-            response["validation_error"] = None
+            logger.info(f"Generando respuesta en streaming con {self.model}...")
             
-            # Validar contra schema si se provee
-            if schema:
-                # TODO: Implementar validación con jsonschema
-                pass
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=self._messages(prompt, system_prompt),
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                response_format={"type": response_format} if response_format else None,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            
+            parts: List[str] = []
+            finish_reason = None
+            usage = None
+            
+            async for chunk in stream:
+                # El último chunk trae solo el uso de tokens (sin choices)
+                if chunk.usage is not None:
+                    usage = _usage_dict(chunk.usage)
+                if not chunk.choices:
+                    continue
+                
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                if choice.delta.content:
+                    parts.append(choice.delta.content)
+                    yield choice.delta.content
+            
+            latency_ms = (time.perf_counter_ns() - t0) // 1_000_000
+            usage = usage or {
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "total_tokens": 0,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0
+            }
+            
+            logger.info(f"✅ Respuesta generada en streaming ({latency_ms}ms, {usage['total_tokens']} tokens)")
+            
+            result = {
+                "content": "".join(parts),
+                "finish_reason": finish_reason,
+                "usage": usage,
+                "latency_ms": latency_ms,
+                "cache_hit": False
+            }
+            
+            if cache_key is not None:
+                cache.store(cache_key, result)
+            
+            yield result
+        
+        except openai.APIError as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise Exception(f"OpenAI API error: {str(e)}")
+    
+    async def generate_json_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[Union[str, Dict]]:
+        """
+        Versión streaming de generate_json.
+        
+        Yields:
+            Fragmentos de texto; el último elemento es el dict de resultado
+            con parsed_json / validation_error
+        """
+        system_prompt = system_prompt + _JSON_SYSTEM_SUFFIX if system_prompt else _JSON_SYSTEM_DEFAULT
+        
+        async for item in self.generate_stream(prompt, system_prompt, "json_object"):
+            yield _attach_json(item) if isinstance(item, dict) else item
+    
+    async def submit_batch(self, requests: List[Dict]) -> str:
+        """
+        Envía un lote a la Batch API de OpenAI (ventana de 24h).
+        
+        Args:
+            requests: [{"custom_id": "1", "prompt": "...", "system_prompt": "..."}]
+        
+        Returns:
+            ID del batch
+        """
+        lines = []
+        for req in requests:
+            messages = []
+            if req.get("system_prompt"):
+                messages.append({"role": "system", "content": req["system_prompt"]})
+            messages.append({"role": "user", "content": req["prompt"]})
             
-            return response
+            lines.append(orjson.dumps({
+                "custom_id": req["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens
+                }
+            }))
+        
+        batch_file = await self.client.files.create(
+            file=("batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        logger.info(f"✅ Batch enviado a OpenAI ({batch.id}, {len(requests)} requests)")
+        
+        return batch.id
+    
+    async def poll_batch(self, batch_id: str) -> Dict:
+        """
+        Consulta el estado de un batch y, si terminó, sus resultados.
         
-        except json.JSONDecodeError as e:
-            logger.error(f"Error al parsear JSON: {str(e)}")
-            response["parsed_json"] = None
-            response["validation_error"] = f"Invalid JSON: {str(e)}"
+        Returns:
+            {
+                "batch_id": "batch_abc",
+                "status": "completed",
+                "done": True,
+                "results": [{"custom_id", "content", "usage", "error"}] | None
+            }
+        """
+        batch = await self.client.batches.retrieve(batch_id)
+        done = batch.status in ("completed", "failed", "expired", "cancelled")
+        results = None
+        
+        if batch.status == "completed" and batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            results = []
             
-            return response
+            for line in output.text.splitlines():
+                if not line:
+                    continue
+                item = orjson.loads(line)
+                body = (item.get("response") or {}).get("body") or {}
+                choices = body.get("choices") or [{}]
+                usage = body.get("usage") or {}
+                
+                results.append({
+                    "custom_id": item["custom_id"],
+                    "content": choices[0].get("message", {}).get("content"),
+                    "usage": {
+                        "prompt_tokens": usage.get("prompt_tokens", 0),
+                        "completion_tokens": usage.get("completion_tokens", 0),
+                        "total_tokens": usage.get("total_tokens", 0)
+                    },
+                    "error": item.get("error")
+                })
+        
+        return {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "done": done,
+            "results": results
+        }
     
     def estimate_cost(self, usage: Dict) -> float:
         """
@@ -195,23 +471,16 @@ class OpenAIAdapter:
         - gpt-4-turbo: $10/1M input, $30/1M output
         
         Args:
-            usage: Dict con prompt_tokens y completion_tokens
+            usage: Dict con prompt_tokens, completion_tokens y (opcional) cache_read_input_tokens
         
         Returns:
             Costo en USD
         """
-        rates = {
-            "gpt-4o-mini": {"input": 0.150, "output": 0.600},
-            "gpt-4o": {"input": 2.50, "output": 10.00},
-            "gpt-4": {"input": 30.00, "output": 60.00},
-            "gpt-4-turbo": {"input": 10.00, "output": 30.00},
-        }
-        
-        model_rates = rates.get(self.model, rates["gpt-4o-mini"])
+        input_rate, output_rate = _RATES.get(self.model, _RATES["gpt-4o-mini"])
+        cache_read = usage.get("cache_read_input_tokens", 0)
         
-        input_cost = (usage["prompt_tokens"] / 1_000_000) * model_rates["input"]
-        output_cost = (usage["completion_tokens"] / 1_000_000) * model_rates["output"]
-        
-        total_cost = input_cost + output_cost
-        
-        return round(total_cost, 6)
+        return round(
+            (usage["prompt_tokens"] - cache_read + cache_read * _CACHE_READ_FACTOR) * input_rate
+            + usage["completion_tokens"] * output_rate,
+            6
+        )
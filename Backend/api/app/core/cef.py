@@ -0,0 +1,9 @@
+"""
+CEF (Common Event Format) escaping.
+"""
+
+# Header fields: "\", "|" and newlines
+CEF_HEADER_ESCAPE = str.maketrans({"\\": "\\\\", "|": "\\|", "\n": "\\n", "\r": "\\r"})
+
+# Extension values: "\", "=" and newlines
+CEF_EXTENSION_ESCAPE = str.maketrans({"\\": "\\\\", "=": "\\=", "\n": "\\n", "\r": "\\r"})
@@ -0,0 +1,24 @@
+"""
+Time-ordered identifiers.
+"""
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a UUID version 7 (RFC 9562).
+
+    The first 48 bits are the Unix time in milliseconds, so successive ids
+    land at the end of a B-tree index instead of on random pages.
+    """
+    unix_ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+
+    value = (unix_ts_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76                                  # version
+    value |= ((rand >> 62) & 0xFFF) << 64               # rand_a (12 bits)
+    value |= 0b10 << 62                                 # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF               # rand_b (62 bits)
+    return uuid.UUID(int=value)
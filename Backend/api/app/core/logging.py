@@ -3,13 +3,16 @@ Structured logging configuration.
 """
 import logging
 import sys
-import json
-from datetime import datetime
-from typing import Any, Dict
+import orjson
+from datetime import datetime, timezone
+from functools import cache
+from typing import Any, Dict, Optional
 from app.config import get_settings
 
 settings = get_settings()
 
+_configured_logger: Optional[logging.Logger] = None
+
 
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging."""
@@ -17,33 +20,45 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON."""
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
             "level": record.levelname,
             "logger": record.name,
-            "message": record.getMessage(),
+            # No args means no %-formatting: skip getMessage()
+            "message": record.getMessage() if record.args else str(record.msg),
             "module": record.module,
             "function": record.funcName,
             "line": record.lineno,
         }
         
         # Add exception info if present
+        # (cached on the record, like logging.Formatter does)
         if record.exc_info:
-            log_data["exception"] = self.formatException(record.exc_info)
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            log_data["exception"] = record.exc_text
         
         # Add extra fields if present
         if hasattr(record, "extra"):
             log_data.update(record.extra)
         
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logging() -> logging.Logger:
     """
     Setup application logging.
     
+    Idempotent: repeated calls (e.g. the uvicorn reloader) reuse the
+    already configured logger instead of stacking handlers.
+    
     Returns:
         Configured logger instance
     """
+    global _configured_logger
+    
+    if _configured_logger is not None:
+        return _configured_logger
+    
     logger = logging.getLogger("twinsec")
     logger.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
     
@@ -64,12 +79,14 @@ def setup_logging() -> logging.Logger:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     
+    _configured_logger = logger
     return logger
 
 
+@cache
 def get_logger(name: str) -> logging.Logger:
     """
-    Get a logger instance.
+    Get a logger instance (cached per name).
     
     Args:
         name: Logger name (typically __name__)
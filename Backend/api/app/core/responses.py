@@ -0,0 +1,28 @@
+"""
+JSON response classes.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_NAIVE_UTC
+    | orjson.OPT_UTC_Z
+)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson.
+
+    Unlike fastapi.responses.ORJSONResponse, UTC datetimes (including naive
+    ones built in Python, treated as UTC) are emitted with a "Z" suffix, and
+    values orjson does not know (Decimal, ...) fall back to str().
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Serialize content with orjson."""
+        return orjson.dumps(content, default=str, option=ORJSON_OPTIONS)
@@ -2,8 +2,10 @@
 Security utilities: JWT token handling, password hashing, and authentication.
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
 from passlib.context import CryptContext
 from app.config import get_settings
 
@@ -46,6 +48,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+@lru_cache(maxsize=1)
+def _verification_key() -> Key:
+    """
+    Parsed JWT verification key.
+    
+    Passing a Key object to jwt.decode skips the per-call key parsing
+    (JSON probe + jwk.construct) that a raw secret goes through.
+    """
+    return jwk.construct(settings.SECRET_KEY, settings.ALGORITHM)
+
+
 def decode_access_token(token: str) -> Optional[dict]:
     """
     Decode and verify a JWT token.
@@ -57,7 +70,7 @@ def decode_access_token(token: str) -> Optional[dict]:
         Decoded token data or None if invalid
     """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, _verification_key(), algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
         return None
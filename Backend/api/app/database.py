@@ -1,42 +1,25 @@
 """
 Database configuration and session management.
-"""
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
-
-from app.config import get_settings
 
-settings = get_settings()
-
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
-    pool_pre_ping=True,  # Verify connections before using
-    echo=settings.API_DEBUG  # Log SQL queries in debug mode
+Módulo de compatibilidad: el engine, la sesión y Base viven en app.db para
+que toda la aplicación comparta un único pool de conexiones.
+"""
+from app.db.base import Base
+from app.db.session import (
+    engine,
+    SessionLocal,
+    get_db,
+    async_engine,
+    AsyncSessionLocal,
+    get_async_db
 )
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create Base class for models
-Base = declarative_base()
-
-
-def get_db() -> Generator[Session, None, None]:
-    """
-    Dependency for FastAPI routes to get database session.
-    
-    Usage:
-        @app.get("/users")
-        def get_users(db: Session = Depends(get_db)):
-            return db.query(User).all()
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+__all__ = [
+    "Base",
+    "engine",
+    "SessionLocal",
+    "get_db",
+    "async_engine",
+    "AsyncSessionLocal",
+    "get_async_db"
+]
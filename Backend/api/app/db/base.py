@@ -1,10 +1,18 @@
 """
 Base de datos - Declarative Base y configuración base
 """
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import DeclarativeBase
 
-# Base para todos los modelos SQLAlchemy
-Base = declarative_base()
+from app.config import get_settings
+
+# Estrategia para relaciones "frías" (no deberían cargarse en caminos
+# calientes): en debug cualquier lazy load emite error para detectar N+1.
+COLD_LAZY = "raise_on_sql" if get_settings().API_DEBUG else "select"
+
+
+class Base(DeclarativeBase):
+    """Base para todos los modelos SQLAlchemy (estilo 2.0 con Mapped[])."""
+    pass
 
 # Metadata estará disponible en Base.metadata
 # Esto se usa para crear/eliminar todas las tablas
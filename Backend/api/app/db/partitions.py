@@ -0,0 +1,113 @@
+"""
+Mantenimiento de particiones mensuales (audit_logs)
+
+audit_logs está particionada por RANGE sobre `timestamp`. Este módulo
+crea las particiones de los próximos meses y, opcionalmente, elimina las
+más viejas que la retención configurada (DROP de una partición es O(1),
+a diferencia de un DELETE masivo).
+
+Uso (cron diario):
+    python -m app.db.partitions
+"""
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PARTITIONED_TABLES = ("audit_logs",)
+
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def _add_months(d: date, months: int) -> date:
+    """Primer día del mes desplazado `months` meses."""
+    month = d.year * 12 + d.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Nombre de la partición mensual (ej. audit_logs_y2026m10)."""
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def create_partition(conn: Connection, table: str, month: date) -> None:
+    """Crea la partición del mes `month` si no existe."""
+    start = date(month.year, month.month, 1)
+    end = _add_months(start, 1)
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" '
+        f'PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn: Connection, table: str, months_ahead: int = 3, today: Optional[date] = None) -> None:
+    """Crea las particiones del mes actual y los `months_ahead` siguientes."""
+    current = _add_months(today or datetime.now(timezone.utc).date(), 0)
+    for i in range(months_ahead + 1):
+        create_partition(conn, table, _add_months(current, i))
+
+
+def drop_partitions_before(conn: Connection, table: str, cutoff: date) -> List[str]:
+    """
+    Elimina las particiones mensuales anteriores a `cutoff`.
+
+    Returns:
+        Nombres de las particiones eliminadas
+    """
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": table}).scalars()
+
+    dropped = []
+    for name in rows:
+        match = _PARTITION_SUFFIX.search(name)
+        if match is None:
+            continue  # partición DEFAULT u otra no mensual
+        if date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+            conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+            conn.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+
+    return dropped
+
+
+def rotate_partitions(months_ahead: int = 3, retention_months: Optional[int] = None) -> None:
+    """
+    Crea las particiones futuras y aplica la retención en todas las tablas.
+
+    Args:
+        months_ahead: Meses futuros a pre-crear
+        retention_months: Meses a conservar (None usa PARTITION_RETENTION_MONTHS; 0 = sin límite)
+    """
+    from app.db.session import engine
+
+    if retention_months is None:
+        retention_months = settings.PARTITION_RETENTION_MONTHS
+
+    today = datetime.now(timezone.utc).date()
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            ensure_partitions(conn, table, months_ahead, today)
+            if retention_months > 0:
+                dropped = drop_partitions_before(conn, table, _add_months(today, -retention_months))
+                for name in dropped:
+                    logger.info(f"🗑️ Partición eliminada: {name}")
+
+    logger.info(f"✅ Particiones rotadas ({', '.join(PARTITIONED_TABLES)})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    rotate_partitions()
@@ -2,8 +2,10 @@
 Configuración de sesión de base de datos con connection pooling
 """
 from sqlalchemy import create_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from app.config import get_settings
 
@@ -12,9 +14,12 @@ settings = get_settings()
 # Motor de base de datos con pool de conexiones
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verifica que la conexión esté activa antes de usarla
-    pool_size=10,        # Número de conexiones en el pool
-    max_overflow=20,     # Conexiones adicionales si el pool se llena
+    poolclass=QueuePool,
+    pool_size=settings.DATABASE_POOL_SIZE,          # Número de conexiones en el pool
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,    # Conexiones adicionales si el pool se llena
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,  # SELECT 1 por checkout (opt-in)
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,    # Recicla conexiones viejas (segundos)
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,    # Espera máxima por una conexión libre
     echo=settings.API_DEBUG  # Log de queries SQL en modo debug
 )
 
@@ -26,6 +31,35 @@ SessionLocal = sessionmaker(
 )
 
 
+def _async_database_url(url: str) -> str:
+    """Convierte DATABASE_URL al driver asyncpg."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# Motor async (endpoints FastAPI): las queries no bloquean el event loop
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.DATABASE_POOL_SIZE,
+    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    pool_recycle=settings.DATABASE_POOL_RECYCLE,
+    pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+    echo=settings.API_DEBUG
+)
+
+# Factory de sesiones async
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+
 def get_db() -> Generator[Session, None, None]:
     """
     Dependency para obtener una sesión de base de datos en endpoints FastAPI.
@@ -33,7 +67,7 @@ def get_db() -> Generator[Session, None, None]:
     Uso:
         @app.get("/users")
         def get_users(db: Session = Depends(get_db)):
-            users = db.query(User).all()
+            users = db.scalars(select(User)).all()
             return users
     
     La sesión se cierra automáticamente después de la petición.
@@ -43,3 +77,17 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency para obtener una sesión async en endpoints FastAPI.
+    
+    Uso:
+        @app.get("/users")
+        async def get_users(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(User))
+            return result.scalars().all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
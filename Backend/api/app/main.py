@@ -1,19 +1,66 @@
 """
 TwinSec Studio API - Main application entry point.
 """
+import asyncio
+import sys
+import time
+
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from app.config import get_settings
 from app.core.logging import get_logger
+from app.core.responses import ORJSONResponse
+from app.connectors.llm.clients import close_http_client, warmup_http_client
+from app.db.session import async_engine
+from app.services.audit_writer import get_audit_writer
 
 # Import routers
 from app.routers import models, attacks, simulations, websocket, auth
+from app.routers.websocket import manager as ws_manager
 # from app.routers import logs
 
 settings = get_settings()
 logger = get_logger(__name__)
+access_logger = get_logger("access")
+
+
+class AccessLogMiddleware:
+    """
+    Minimal ASGI access log through the structured logger.
+    
+    Replaces uvicorn's access_log (disabled in the entrypoint).
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        t0 = time.perf_counter_ns()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            access_logger.info(
+                "%s %s %d %.1fms",
+                scope["method"],
+                scope["path"],
+                status_code,
+                (time.perf_counter_ns() - t0) / 1_000_000
+            )
 
 
 @asynccontextmanager
@@ -24,9 +71,26 @@ async def lifespan(app: FastAPI):
         "version": settings.VERSION,
         "debug": settings.API_DEBUG
     })
+    # Background task: startup does not wait on the LLM provider
+    warmup = asyncio.create_task(warmup_http_client(), name="llm-warmup")
+    get_audit_writer().start()
+    await ws_manager.start(settings.REDIS_URL)
+    # Shared client for short outbound calls (OAuth token/userinfo)
+    app.state.http = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    )
     yield
     # Shutdown
     logger.info("Shutting down TwinSec Studio API")
+    warmup.cancel()
+    with suppress(asyncio.CancelledError, Exception):
+        await warmup
+    await get_audit_writer().stop()
+    await ws_manager.stop()
+    await app.state.http.aclose()
+    await close_http_client()
+    await async_engine.dispose()
 
 
 # Create FastAPI application
@@ -37,6 +101,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,  # orjson also handles NumPy arrays (SHAP)
     lifespan=lifespan
 )
 
@@ -48,6 +113,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(AccessLogMiddleware)
 
 
 # Root endpoint
@@ -87,5 +153,10 @@ if __name__ == "__main__":
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.API_DEBUG,
+        # uvicorn ignores workers with reload: debug is always a single process
+        workers=None if settings.API_DEBUG else settings.API_WORKERS,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        access_log=False,  # AccessLogMiddleware logs requests
         log_level=settings.LOG_LEVEL.lower()
     )
@@ -1,17 +1,34 @@
 """
 Modelo SQLAlchemy para ataques ejecutados en simulaciones
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, Boolean, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Boolean, JSON, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
-import uuid
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Optional
 
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.simulation import SimulationRun
+    from app.models.user import User
 
-def generate_uuid():
-    """Genera un UUID como string"""
-    return str(uuid.uuid4())
+# Campos serializados por Attack.to_dict (created_at se formatea aparte)
+_DICT_FIELDS = (
+    "id",
+    "attack_id",
+    "attack_type",
+    "target_component",
+    "target_signal",
+    "status",
+    "parameters",
+    "trigger_time",
+    "duration",
+    "severity",
+    "success",
+)
+_get_dict_fields = attrgetter(*_DICT_FIELDS)
 
 
 class Attack(Base):
@@ -27,77 +44,79 @@ class Attack(Base):
         - created_by_user: Usuario que configuró/activó el ataque
     """
     __tablename__ = "attacks"
+    __mapper_args__ = {"eager_defaults": True}  # attack_id vuelve en el RETURNING del INSERT
+    __table_args__ = (
+        # Timeline de ataques de una simulación
+        Index("ix_attacks_sim_trigger", "simulation_run_id", "trigger_time"),
+        # Ataques activos de un tipo (también cubre filtros solo por attack_type)
+        Index("ix_attacks_type_status", "attack_type", "status"),
+        Index("ix_attacks_created_by", "created_by"),
+    )
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
-    attack_id = Column(String(36), unique=True, default=generate_uuid, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    attack_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        unique=True,
+        server_default=func.gen_random_uuid(),  # Generado por PostgreSQL (pgcrypto)
+        nullable=False,
+        index=True
+    )
     
     # Relación con simulación
-    simulation_run_id = Column(Integer, ForeignKey("simulation_runs.id"), nullable=False)
-    simulation_run = relationship("SimulationRun", back_populates="attacks")
+    simulation_run_id: Mapped[int] = mapped_column(Integer, ForeignKey("simulation_runs.id"), nullable=False)
+    simulation_run: Mapped["SimulationRun"] = relationship("SimulationRun", back_populates="attacks")
     
     # Tipo y objetivo del ataque
-    attack_type = Column(
+    attack_type: Mapped[str] = mapped_column(
         String(50), 
-        nullable=False,
-        index=True
+        nullable=False
     )  # 'fdi' (False Data Injection), 'dos' (Denial of Service), 'mitm', 'replay', etc.
     
-    target_component = Column(String(100), nullable=False)  # ID del componente afectado (ej. "V_in", "T1")
-    target_signal = Column(String(100), nullable=True)  # Señal específica afectada (ej. "h", "q_in")
+    target_component: Mapped[str] = mapped_column(String(100), nullable=False)  # ID del componente afectado (ej. "V_in", "T1")
+    target_signal: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)  # Señal específica afectada (ej. "h", "q_in")
     
     # Estado del ataque
-    status = Column(
+    status: Mapped[str] = mapped_column(
         String(20),
         nullable=False,
         default="armed"
     )  # 'armed', 'active', 'stopped', 'completed', 'failed'
     
     # Parámetros del ataque (JSON con configuración específica)
-    parameters = Column(JSON, nullable=False)
+    parameters: Mapped[Any] = mapped_column(JSON, nullable=False)
     # Ejemplo para FDI: {"bias": 0.5, "noise_amplitude": 0.1, "drift_rate": 0.01}
     # Ejemplo para DoS: {"packet_loss_rate": 0.8, "burst_duration": 5.0}
     
     # Ventana temporal del ataque
-    trigger_time = Column(Float, nullable=False)  # Tiempo de simulación en que inicia (segundos)
-    duration = Column(Float, nullable=True)  # Duración del ataque (segundos), null = indefinido
+    trigger_time: Mapped[float] = mapped_column(Float, nullable=False)  # Tiempo de simulación en que inicia (segundos)
+    duration: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # Duración del ataque (segundos), null = indefinido
     
     # Tiempos reales de ejecución
-    started_at = Column(DateTime, nullable=True)  # Cuando realmente comenzó
-    ended_at = Column(DateTime, nullable=True)    # Cuando realmente terminó
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # Cuando realmente comenzó
+    ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)    # Cuando realmente terminó
     
     # Resultados y métricas
-    success = Column(Boolean, nullable=True)  # Si el ataque se ejecutó correctamente
-    error_message = Column(String(500), nullable=True)  # Si falló, el mensaje de error
+    success: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)  # Si el ataque se ejecutó correctamente
+    error_message: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)  # Si falló, el mensaje de error
     
     # Metadata adicional
-    description = Column(String(500), nullable=True)  # Descripción del ataque
-    severity = Column(String(20), default="medium")  # 'low', 'medium', 'high', 'critical'
+    description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)  # Descripción del ataque
+    severity: Mapped[Optional[str]] = mapped_column(String(20), default="medium")  # 'low', 'medium', 'high', 'critical'
     
     # Usuario que configuró el ataque
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_by_user = relationship("User")
+    created_by: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    created_by_user: Mapped["User"] = relationship("User")
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<Attack(id={self.id}, type='{self.attack_type}', target='{self.target_component}', status='{self.status}')>"
     
     def to_dict(self):
         """Convierte el ataque a diccionario para serialización"""
-        return {
-            "id": self.id,
-            "attack_id": self.attack_id,
-            "attack_type": self.attack_type,
-            "target_component": self.target_component,
-            "target_signal": self.target_signal,
-            "status": self.status,
-            "parameters": self.parameters,
-            "trigger_time": self.trigger_time,
-            "duration": self.duration,
-            "severity": self.severity,
-            "success": self.success,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
+        data = dict(zip(_DICT_FIELDS, _get_dict_fields(self)))
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        return data
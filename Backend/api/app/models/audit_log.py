@@ -1,12 +1,18 @@
 """
 Modelo SQLAlchemy para logs de auditoría
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, Index, insert, select, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+from app.core.cef import CEF_EXTENSION_ESCAPE, CEF_HEADER_ESCAPE
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.user import User
+
 
 class AuditLog(Base):
     """
@@ -25,46 +31,75 @@ class AuditLog(Base):
         - user: Usuario que realizó la acción (nullable para eventos del sistema)
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Trazabilidad por usuario ordenada por tiempo (sin sort explícito)
+        Index("ix_audit_logs_user_ts", "user_id", "timestamp"),
+        # Filtros por tipo de evento + rango de tiempo (también cubre solo event_type)
+        Index("ix_audit_logs_event_ts", "event_type", "timestamp"),
+        # Particiones mensuales (ver app/db/partitions.py)
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
+    # Primary Key (id, timestamp): la clave de partición debe estar en la PK
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
     
     # Tipo de evento
-    event_type = Column(
+    event_type: Mapped[str] = mapped_column(
         String(50), 
-        nullable=False, 
-        index=True
+        nullable=False
     )  # "login", "logout", "model_created", "simulation_started", "attack_executed", etc.
     
     # Severidad (compatible con syslog/CEF)
-    severity = Column(
+    severity: Mapped[str] = mapped_column(
         String(20), 
         nullable=False, 
         default="info"
     )  # "debug", "info", "warning", "error", "critical"
     
     # Descripción del evento
-    message = Column(Text, nullable=False)
+    message: Mapped[str] = mapped_column(Text, nullable=False)
     
     # Contexto adicional (JSON con detalles específicos del evento)
-    details = Column(JSON, nullable=True)
+    details: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
     
     # Usuario relacionado (nullable para eventos del sistema)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    user = relationship("User")  # back_populates="audit_logs" cuando se habilite
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
+    user: Mapped[Optional["User"]] = relationship("User")  # back_populates="audit_logs" cuando se habilite
     
     # Información de la petición HTTP
-    ip_address = Column(String(45), nullable=True)  # IPv4 o IPv6
-    user_agent = Column(String(500), nullable=True)
-    endpoint = Column(String(255), nullable=True)  # Ruta del endpoint llamado
-    method = Column(String(10), nullable=True)     # GET, POST, PUT, DELETE
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45), nullable=True)  # IPv4 o IPv6
+    user_agent: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    endpoint: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)  # Ruta del endpoint llamado
+    method: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)     # GET, POST, PUT, DELETE
     
     # IDs de recursos relacionados (para facilitar búsqueda)
-    model_id = Column(Integer, nullable=True)
-    simulation_run_id = Column(Integer, nullable=True)
+    model_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    simulation_run_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Timestamp
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False, index=True)
+    
+    @classmethod
+    def bulk_insert(cls, session: Session, rows: List[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Inserta muchos logs con executemany (un INSERT preparado por lote).
+        
+        Usa el bulk INSERT del ORM, que agrupa las filas por conjunto de
+        claves: los eventos encolados no necesitan traer todas las columnas.
+        No hace commit: el llamador controla la transacción.
+        
+        Args:
+            session: Sesión síncrona (o `AsyncSession.run_sync`)
+            rows: Diccionarios con las columnas de audit_logs
+            batch_size: Filas por executemany (≤1000 en PostgreSQL)
+        
+        Returns:
+            Número de filas insertadas
+        """
+        stmt = insert(cls)
+        for start in range(0, len(rows), batch_size):
+            session.execute(stmt, rows[start:start + batch_size])
+        return len(rows)
     
     def __repr__(self):
         return f"<AuditLog(id={self.id}, event_type='{self.event_type}', severity='{self.severity}', user_id={self.user_id})>"
@@ -79,35 +114,140 @@ class AuditLog(Base):
         Ejemplo:
         CEF:0|TwinSec|Studio|1.0.0|1|User Login|5|src=192.168.1.100 suser=jhon msg=User logged in successfully
         """
-        extensions = []
-        
-        if self.ip_address:
-            extensions.append(f"src={self.ip_address}")
-        
-        if self.user_id:
-            extensions.append(f"suid={self.user_id}")
-        
-        if self.endpoint:
-            extensions.append(f"request={self.endpoint}")
-        
-        if self.method:
-            extensions.append(f"requestMethod={self.method}")
-        
-        extensions.append(f"msg={self.message}")
-        
-        # Mapeo de severidad a CEF (0-10)
-        severity_map = {
-            "debug": "2",
-            "info": "5",
-            "warning": "7",
-            "error": "8",
-            "critical": "10"
-        }
-        cef_severity = severity_map.get(self.severity, "5")
-        
-        cef_string = (
-            f"CEF:0|TwinSec|Studio|1.0.0|{self.id}|{self.event_type}|{cef_severity}|"
-            f"{' '.join(extensions)}"
+        return _format_cef(
+            self.id, self.event_type, self.severity, self.message,
+            self.ip_address, self.user_id, self.endpoint, self.method
         )
+    
+    @classmethod
+    def to_cef_batch(cls, session: Session, *criteria) -> List[str]:
+        """
+        Exporta logs a CEF leyendo solo las columnas necesarias como tuplas
+        (sin materializar objetos ORM).
         
-        return cef_string
+        Args:
+            session: Sesión síncrona
+            *criteria: Filtros opcionales para el WHERE
+        """
+        return list(iter_cef(session, *criteria))
+
+
+# Mapeo de severidad a CEF (0-10)
+_SEVERITY_CEF = {
+    "debug": "2",
+    "info": "5",
+    "warning": "7",
+    "error": "8",
+    "critical": "10"
+}
+
+# Columnas que usa la línea CEF, en el orden que espera _format_cef
+CEF_COLS = (
+    AuditLog.id,
+    AuditLog.event_type,
+    AuditLog.severity,
+    AuditLog.message,
+    AuditLog.ip_address,
+    AuditLog.user_id,
+    AuditLog.endpoint,
+    AuditLog.method,
+)
+
+
+class AuditLogDTO(NamedTuple):
+    """
+    Log de auditoría de solo lectura (sin estado ORM ni __dict__).
+    
+    Para exports y listados; el modelo mapeado queda para los caminos que
+    modifican filas.
+    """
+    id: int
+    event_type: str
+    severity: str
+    message: str
+    ip_address: Optional[str]
+    user_id: Optional[int]
+    endpoint: Optional[str]
+    method: Optional[str]
+    timestamp: datetime
+
+
+_AUDIT_COLS = tuple(getattr(AuditLog, name) for name in AuditLogDTO._fields)
+
+
+def iter_audit_logs(session: Session, *criteria, yield_per: int = 5000, **filters) -> Iterator[AuditLogDTO]:
+    """
+    Recorre logs como AuditLogDTO leyendo con cursor del lado del servidor.
+    
+    Args:
+        session: Sesión síncrona
+        *criteria: Filtros opcionales para el WHERE
+        yield_per: Filas por fetch del cursor
+        **filters: Igualdades por columna (filter_by)
+    """
+    stmt = (
+        select(*_AUDIT_COLS)
+        .where(*criteria)
+        .filter_by(**filters)
+        .order_by(AuditLog.id)
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    make = AuditLogDTO._make
+    for row in session.execute(stmt):
+        yield make(row)
+
+
+def iter_cef(session: Session, *criteria, yield_per: int = 5000) -> Iterator[str]:
+    """
+    Genera líneas CEF para exportar a Wazuh sin cargar toda la tabla.
+    
+    Usa un cursor del lado del servidor (stream_results) y lee de a
+    `yield_per` filas, así la memoria queda acotada en exports de millones
+    de logs.
+    
+    Args:
+        session: Sesión síncrona
+        *criteria: Filtros opcionales para el WHERE
+        yield_per: Filas por fetch del cursor
+    """
+    stmt = (
+        select(*CEF_COLS)
+        .where(*criteria)
+        .order_by(AuditLog.id)
+        .execution_options(stream_results=True, yield_per=yield_per)
+    )
+    for row in session.execute(stmt):
+        yield _cef_from_row(row)
+
+
+def write_cef(writer: BinaryIO, session: Session, *criteria, yield_per: int = 5000) -> int:
+    """
+    Escribe el export CEF (una línea por log) directo a un writer binario.
+    
+    Returns:
+        Número de líneas escritas
+    """
+    write = writer.write
+    count = 0
+    for line in iter_cef(session, *criteria, yield_per=yield_per):
+        write(f"{line}\n".encode("utf-8"))
+        count += 1
+    return count
+
+
+def _cef_from_row(row: Tuple) -> str:
+    """Arma la línea CEF desde una fila de CEF_COLS."""
+    return _format_cef(*row)
+
+
+def _format_cef(id, event_type, severity, message, ip_address, user_id, endpoint, method) -> str:
+    """Arma la línea CEF en un solo f-string (sin lista intermedia)."""
+    return (
+        f"CEF:0|TwinSec|Studio|1.0.0|{id}|{event_type.translate(CEF_HEADER_ESCAPE)}|"
+        f"{_SEVERITY_CEF.get(severity, '5')}|"
+        f"{f'src={ip_address} ' if ip_address else ''}"
+        f"{f'suid={user_id} ' if user_id else ''}"
+        f"{f'request={endpoint.translate(CEF_EXTENSION_ESCAPE)} ' if endpoint else ''}"
+        f"{f'requestMethod={method} ' if method else ''}"
+        f"msg={message.translate(CEF_EXTENSION_ESCAPE)}"
+    )
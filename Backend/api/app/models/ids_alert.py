@@ -1,17 +1,35 @@
 """
 Modelo SQLAlchemy para alertas del sistema de detección de intrusiones (IDS)
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, Boolean, JSON, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Boolean, Index, Text, Uuid, func, select, text
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 import uuid
 
-from app.db.base import Base
+from app.db.base import Base, COLD_LAZY
 
+if TYPE_CHECKING:
+    from app.models.attack import Attack
+    from app.models.simulation import SimulationRun
+    from app.models.user import User
 
-def generate_uuid():
-    """Genera un UUID como string"""
-    return str(uuid.uuid4())
+# Campos serializados por IDSAlert.to_dict / list_to_dicts
+_DICT_KEYS = (
+    "id",
+    "alert_id",
+    "severity",
+    "anomaly_score",
+    "detected_attack_type",
+    "confidence",
+    "affected_signals",
+    "status",
+    "timestamp",
+    "simulation_time",
+    "false_positive",
+    "true_positive",
+)
 
 
 class IDSAlert(Base):
@@ -27,79 +45,114 @@ class IDSAlert(Base):
         - related_attack: Ataque real que causó la alerta (si se conoce)
     """
     __tablename__ = "ids_alerts"
+    __table_args__ = (
+        # Dedup de la misma ventana de detección (ver IDSAlert.bulk_ingest);
+        # COALESCE para que las alertas sin tipo también choquen entre sí
+        Index(
+            "uq_ids_alert_dedup",
+            "simulation_run_id", "simulation_time", func.coalesce(text("detected_attack_type"), ""),
+            unique=True
+        ),
+        # Búsquedas por contención (affected_signals @> '["T1.h"]')
+        Index(
+            "ix_ids_alerts_affected_signals",
+            "affected_signals",
+            postgresql_using="gin",
+            postgresql_ops={"affected_signals": "jsonb_path_ops"}
+        ),
+    )
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
-    alert_id = Column(String(36), unique=True, default=generate_uuid, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True, index=True)
+    # UUID nativo en PostgreSQL (16 bytes); CHAR(32) hex en otros motores
+    alert_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), default=uuid.uuid4, unique=True, index=True, nullable=False)
     
     # Relación con simulación
-    simulation_run_id = Column(Integer, ForeignKey("simulation_runs.id"), nullable=False)
-    simulation_run = relationship("SimulationRun", back_populates="ids_alerts")
+    simulation_run_id: Mapped[int] = mapped_column(Integer, ForeignKey("simulation_runs.id"), nullable=False)
+    simulation_run: Mapped["SimulationRun"] = relationship("SimulationRun", back_populates="ids_alerts", lazy="selectin")
     
     # Tiempo de la detección
-    timestamp = Column(DateTime, nullable=False, index=True)
-    simulation_time = Column(Float, nullable=False)  # Tiempo de simulación (segundos)
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    simulation_time: Mapped[float] = mapped_column(Float, nullable=False)  # Tiempo de simulación (segundos)
     
     # Severidad de la alerta
-    severity = Column(
+    severity: Mapped[str] = mapped_column(
         String(20),
         nullable=False,
         index=True
     )  # 'low', 'medium', 'high', 'critical'
     
     # Score de anomalía del Autoencoder
-    anomaly_score = Column(Float, nullable=False)  # 0.0 - 1.0 (mayor = más anómalo)
-    threshold_used = Column(Float, nullable=False)  # Umbral que se superó
+    anomaly_score: Mapped[float] = mapped_column(Float, nullable=False)  # 0.0 - 1.0 (mayor = más anómalo)
+    threshold_used: Mapped[float] = mapped_column(Float, nullable=False)  # Umbral que se superó
     
     # Clasificación del tipo de ataque (si el modelo pudo identificarlo)
-    detected_attack_type = Column(String(50), nullable=True)  # 'fdi', 'dos', 'unknown'
-    confidence = Column(Float, nullable=True)  # Confianza en la clasificación (0.0 - 1.0)
+    detected_attack_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # 'fdi', 'dos', 'unknown'
+    confidence: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # Confianza en la clasificación (0.0 - 1.0)
     
     # Señales afectadas
-    affected_signals = Column(JSON, nullable=False)
+    affected_signals: Mapped[Any] = mapped_column(JSONB, nullable=False)
     # Ejemplo: ["T1.h", "V_in.q", "L_sens.value"]
     
     # Explicación SHAP (feature importance)
-    shap_explanation = Column(JSON, nullable=True)
+    shap_explanation: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
     # Ejemplo: {"T1.h": 0.85, "V_in.q": 0.65, "T2.h": 0.23}
     
     # Detalles adicionales de la anomalía
-    anomaly_details = Column(JSON, nullable=True)
+    anomaly_details: Mapped[Optional[Any]] = mapped_column(JSONB, nullable=True)
     # Ejemplo: {"reconstruction_error": 0.245, "affected_components": ["T1", "V_in"]}
     
     # Ground truth (para entrenamiento y evaluación)
-    related_attack_id = Column(Integer, ForeignKey("attacks.id"), nullable=True)
-    related_attack = relationship("Attack")
+    related_attack_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("attacks.id"), nullable=True)
+    related_attack: Mapped[Optional["Attack"]] = relationship("Attack", lazy=COLD_LAZY)
     
-    false_positive = Column(Boolean, nullable=True)  # Si se confirmó que fue falso positivo
-    true_positive = Column(Boolean, nullable=True)   # Si se confirmó que fue verdadero positivo
+    false_positive: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)  # Si se confirmó que fue falso positivo
+    true_positive: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)   # Si se confirmó que fue verdadero positivo
     
     # Estado de la alerta
-    status = Column(
+    status: Mapped[str] = mapped_column(
         String(20),
         nullable=False,
         default="new"
     )  # 'new', 'investigating', 'confirmed', 'false_alarm', 'resolved'
     
     # Respuesta y resolución
-    investigated_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    investigated_by_user = relationship("User", foreign_keys=[investigated_by])
+    investigated_by: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
+    investigated_by_user: Mapped[Optional["User"]] = relationship("User", foreign_keys=[investigated_by], lazy=COLD_LAZY)
     
-    investigation_notes = Column(Text, nullable=True)
-    resolved_at = Column(DateTime, nullable=True)
+    investigation_notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    resolved_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<IDSAlert(id={self.id}, severity='{self.severity}', score={self.anomaly_score:.3f}, status='{self.status}')>"
     
+    @classmethod
+    def bulk_ingest(cls, session: Session, rows: List[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """
+        Inserta alertas del IDS ignorando duplicados (ON CONFLICT DO NOTHING).
+        
+        La base de datos descarta las alertas repetidas (alert_id o ventana
+        de detección ya registrada) sin un SELECT previo ni carreras entre
+        workers. No hace commit.
+        
+        Returns:
+            Número de alertas nuevas insertadas
+        """
+        inserted = 0
+        for start in range(0, len(rows), batch_size):
+            stmt = insert(cls).values(rows[start:start + batch_size]).on_conflict_do_nothing()
+            inserted += session.execute(stmt).rowcount
+        return inserted
+    
     def to_dict(self):
         """Convierte la alerta a diccionario para serialización"""
         return {
             "id": self.id,
-            "alert_id": self.alert_id,
+            "alert_id": str(self.alert_id),
             "severity": self.severity,
             "anomaly_score": self.anomaly_score,
             "detected_attack_type": self.detected_attack_type,
@@ -112,6 +165,26 @@ class IDSAlert(Base):
             "true_positive": self.true_positive
         }
     
+    @classmethod
+    def list_to_dicts(cls, session: Session, *criteria) -> List[Dict[str, Any]]:
+        """
+        Lista alertas como dicts desde un select de columnas (sin objetos ORM).
+        
+        A diferencia de to_dict, alert_id (UUID) y timestamp (datetime) se
+        dejan nativos: ORJSONResponse los serializa directamente.
+        
+        Args:
+            session: Sesión síncrona
+            *criteria: Filtros opcionales para el WHERE
+        """
+        stmt = (
+            select(*_DICT_COLS)
+            .where(*criteria)
+            .order_by(cls.timestamp.desc())
+            .execution_options(yield_per=1000)
+        )
+        return [dict(zip(_DICT_KEYS, row)) for row in session.execute(stmt)]
+    
     def calculate_metrics(self) -> dict:
         """
         Calcula métricas de efectividad del IDS.
@@ -128,3 +201,6 @@ class IDSAlert(Base):
             "precision_contribution": 1 if is_tp else (0 if is_fp else None),
             "recall_contribution": 1 if is_tp else (0 if is_fn else None)
         }
+
+
+_DICT_COLS = tuple(getattr(IDSAlert, key) for key in _DICT_KEYS)
@@ -1,17 +1,60 @@
 """
 Modelo SQLAlchemy para historial de peticiones a LLMs
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, Boolean, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Boolean, LargeBinary, Text, JSON, Uuid, select, update, func
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+from types import MappingProxyType
 import uuid
 
+import numpy as np
+import zstandard
+
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.model import Model
+    from app.models.user import User
+
+
+# Tarifas por (provider, model) en USD por token: (input, output)
+_RATES = MappingProxyType({
+    ("openai", "gpt-4o-mini"): (0.150e-6, 0.600e-6),
+    ("openai", "gpt-4o"): (2.50e-6, 10.00e-6),
+    ("openai", "gpt-4"): (30.00e-6, 60.00e-6),
+    ("openai", "gpt-4-turbo"): (10.00e-6, 30.00e-6),
+    ("anthropic", "claude-3-opus-20240229"): (15.00e-6, 75.00e-6),
+    ("anthropic", "claude-3-sonnet-20240229"): (3.00e-6, 15.00e-6),
+    ("anthropic", "claude-3-haiku-20240307"): (0.25e-6, 1.25e-6),
+    ("anthropic", "claude-sonnet-4.5"): (3.00e-6, 15.00e-6),
+    # Azure usa las mismas tarifas que OpenAI
+    ("azure_openai", "gpt-4o-mini"): (0.150e-6, 0.600e-6),
+    ("azure_openai", "gpt-4"): (30.00e-6, 60.00e-6),
+})
+
+# Modelo desconocido: tarifa genérica conservadora
+_DEFAULT_RATE = (5.00e-6, 15.00e-6)
+
+# Misma tabla en arrays para calculate_costs_bulk (la última fila es _DEFAULT_RATE)
+_RATE_IDX = MappingProxyType({key: i for i, key in enumerate(_RATES)})
+_DEFAULT_IDX = len(_RATES)
+_RATE_TABLE_IN = np.array([r[0] for r in _RATES.values()] + [_DEFAULT_RATE[0]])
+_RATE_TABLE_OUT = np.array([r[1] for r in _RATES.values()] + [_DEFAULT_RATE[1]])
+
+# Prompts/respuestas (10-100 KB de JSON/texto) se guardan comprimidos
+_ZSTD_LEVEL = 6
+PROMPT_PREFIX_LEN = 256
 
-def generate_uuid():
-    """Genera un UUID como string"""
-    return str(uuid.uuid4())
+
+def compress_text(value: str) -> bytes:
+    """Comprime texto UTF-8 con zstd."""
+    return zstandard.compress(value.encode("utf-8"), _ZSTD_LEVEL)
+
+
+def decompress_text(blob: bytes) -> str:
+    """Inverso de compress_text."""
+    return zstandard.decompress(blob).decode("utf-8")
 
 
 class LLMRequest(Base):
@@ -31,87 +74,108 @@ class LLMRequest(Base):
     __tablename__ = "llm_requests"
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(String(36), unique=True, default=generate_uuid, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # UUID nativo en PostgreSQL (16 bytes); CHAR(32) hex en otros motores
+    request_id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), unique=True, default=uuid.uuid4, nullable=False, index=True)
     
     # Usuario que realizó la petición
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    user = relationship("User", back_populates="llm_requests")
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    user: Mapped["User"] = relationship("User", back_populates="llm_requests")
     
     # Modelo generado (si tuvo éxito)
-    model_id = Column(Integer, ForeignKey("models.id"), nullable=True)
-    generated_model = relationship("Model")
+    model_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("models.id"), nullable=True)
+    generated_model: Mapped[Optional["Model"]] = relationship("Model")
     
     # Proveedor y modelo de LLM
-    provider = Column(
+    provider: Mapped[str] = mapped_column(
         String(50),
         nullable=False,
         index=True
     )  # 'openai', 'anthropic', 'azure_openai', 'local'
     
-    model_name = Column(String(100), nullable=False)
+    model_name: Mapped[str] = mapped_column(String(100), nullable=False)
     # Ejemplos: 'gpt-4o-mini', 'gpt-4', 'claude-3-opus-20240229', 'claude-sonnet-4.5'
     
-    # Contenido de la petición
-    prompt = Column(Text, nullable=False)
-    system_prompt = Column(Text, nullable=True)  # System prompt si se usó
+    # Contenido de la petición (zstd, deferred: no viaja en queries de metadata)
+    prompt_zstd: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+    prompt_prefix: Mapped[Optional[str]] = mapped_column(String(PROMPT_PREFIX_LEN), nullable=True)  # Para búsquedas/listados
+    system_prompt: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # System prompt si se usó
     
     # Parámetros de generación
-    temperature = Column(Float, nullable=True)
-    max_tokens = Column(Integer, nullable=True)
-    top_p = Column(Float, nullable=True)
-    other_params = Column(JSON, nullable=True)  # Otros parámetros específicos del provider
+    temperature: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    max_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    top_p: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    other_params: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)  # Otros parámetros específicos del provider
     
-    # Respuesta del LLM
-    response = Column(Text, nullable=True)  # El JSON generado (crudo)
-    finish_reason = Column(String(50), nullable=True)  # 'stop', 'length', 'content_filter'
+    # Respuesta del LLM: el JSON generado (crudo, zstd, deferred)
+    response_zstd: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    finish_reason: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # 'stop', 'length', 'content_filter'
     
     # Métricas de uso
-    prompt_tokens = Column(Integer, nullable=True)
-    completion_tokens = Column(Integer, nullable=True)
-    total_tokens = Column(Integer, nullable=True)
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    completion_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    total_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Costos (calculados según tarifas del provider)
-    cost_usd = Column(Float, nullable=True)
+    cost_usd: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     # Ejemplo: OpenAI GPT-4o-mini ~$0.15/1M input tokens, ~$0.60/1M output tokens
     
     # Performance
-    latency_ms = Column(Integer, nullable=True)  # Tiempo de respuesta en milisegundos
+    latency_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Tiempo de respuesta en milisegundos
     
     # Estado de la petición
-    success = Column(Boolean, nullable=False, default=False)
-    error_message = Column(Text, nullable=True)
-    error_code = Column(String(50), nullable=True)  # 'rate_limit', 'invalid_request', etc.
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error_code: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # 'rate_limit', 'invalid_request', etc.
     
     # Validación del JSON generado
-    validation_passed = Column(Boolean, nullable=True)
-    validation_errors = Column(JSON, nullable=True)  # Errores de validación contra el schema
+    validation_passed: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    validation_errors: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)  # Errores de validación contra el schema
     
     # Contexto adicional
-    model_type_requested = Column(String(50), nullable=True)  # 'tank', 'microgrid', 'hvac', etc.
-    user_metadata = Column(JSON, nullable=True)  # Metadata adicional del contexto
+    model_type_requested: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # 'tank', 'microgrid', 'hvac', etc.
+    user_metadata: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)  # Metadata adicional del contexto
     
     # IP y User Agent (para seguridad)
-    ip_address = Column(String(45), nullable=True)
-    user_agent = Column(String(500), nullable=True)
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45), nullable=True)
+    user_agent: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
-    completed_at = Column(DateTime, nullable=True)  # Cuando terminó la petición
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # Cuando terminó la petición
     
     def __repr__(self):
         status = "✓" if self.success else "✗"
         return f"<LLMRequest(id={self.id}, {status}, provider='{self.provider}', model='{self.model_name}', tokens={self.total_tokens})>"
     
+    @property
+    def prompt(self) -> str:
+        """Prompt completo (descomprime; carga la columna deferred)."""
+        return decompress_text(self.prompt_zstd)
+    
+    @prompt.setter
+    def prompt(self, value: str) -> None:
+        self.prompt_zstd = compress_text(value)
+        self.prompt_prefix = value[:PROMPT_PREFIX_LEN]
+    
+    @property
+    def response(self) -> Optional[str]:
+        """Respuesta completa del LLM (descomprime; carga la columna deferred)."""
+        return decompress_text(self.response_zstd) if self.response_zstd is not None else None
+    
+    @response.setter
+    def response(self, value: Optional[str]) -> None:
+        self.response_zstd = compress_text(value) if value is not None else None
+    
     def to_dict(self):
         """Convierte la petición a diccionario para serialización"""
         return {
             "id": self.id,
-            "request_id": self.request_id,
+            "request_id": str(self.request_id),
             "provider": self.provider,
             "model_name": self.model_name,
             "success": self.success,
-            "prompt": self.prompt[:200] + "..." if self.prompt and len(self.prompt) > 200 else self.prompt,
+            "prompt": self.prompt_prefix[:200] + "..." if self.prompt_prefix and len(self.prompt_prefix) > 200 else self.prompt_prefix,
             "total_tokens": self.total_tokens,
             "cost_usd": self.cost_usd,
             "latency_ms": self.latency_ms,
@@ -133,38 +197,52 @@ class LLMRequest(Base):
         if not self.prompt_tokens or not self.completion_tokens:
             return None
         
-        # Tarifas por provider/model (USD por millón de tokens)
-        rates = {
-            "openai": {
-                "gpt-4o-mini": {"input": 0.150, "output": 0.600},
-                "gpt-4o": {"input": 2.50, "output": 10.00},
-                "gpt-4": {"input": 30.00, "output": 60.00},
-                "gpt-4-turbo": {"input": 10.00, "output": 30.00},
-            },
-            "anthropic": {
-                "claude-3-opus-20240229": {"input": 15.00, "output": 75.00},
-                "claude-3-sonnet-20240229": {"input": 3.00, "output": 15.00},
-                "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25},
-                "claude-sonnet-4.5": {"input": 3.00, "output": 15.00},
-            },
-            "azure_openai": {
-                # Usar las mismas tarifas que OpenAI
-                "gpt-4o-mini": {"input": 0.150, "output": 0.600},
-                "gpt-4": {"input": 30.00, "output": 60.00},
-            }
-        }
-        
-        provider_rates = rates.get(self.provider, {})
-        model_rates = provider_rates.get(self.model_name)
+        rate = _RATES.get((self.provider, self.model_name), _DEFAULT_RATE)
         
-        if not model_rates:
-            # Modelo desconocido, usar tarifa genérica conservadora
-            model_rates = {"input": 5.00, "output": 15.00}
-        
-        input_cost = (self.prompt_tokens / 1_000_000) * model_rates["input"]
-        output_cost = (self.completion_tokens / 1_000_000) * model_rates["output"]
+        input_cost = self.prompt_tokens * rate[0]
+        output_cost = self.completion_tokens * rate[1]
         
         total_cost = input_cost + output_cost
         self.cost_usd = round(total_cost, 6)  # 6 decimales para precisión
         
         return self.cost_usd
+    
+    @classmethod
+    def calculate_costs_bulk(cls, session: Session, request_ids: Iterable[int]) -> int:
+        """
+        Calcula y guarda `cost_usd` para muchas peticiones a la vez.
+        
+        Versión vectorizada de calculate_cost para reportes/rollups: lee
+        solo las columnas necesarias, calcula todos los costos con NumPy y
+        escribe con un único UPDATE por lotes. No hace commit.
+        
+        Returns:
+            Número de peticiones actualizadas
+        """
+        stmt = select(
+            cls.id, cls.provider, cls.model_name, cls.prompt_tokens, cls.completion_tokens
+        ).where(
+            cls.id.in_(list(request_ids)),
+            cls.prompt_tokens > 0,
+            cls.completion_tokens > 0
+        )
+        rows = session.execute(stmt).all()
+        if not rows:
+            return 0
+        
+        ids, providers, model_names, prompt_tokens, completion_tokens = zip(*rows)
+        idx = np.fromiter(
+            (_RATE_IDX.get(key, _DEFAULT_IDX) for key in zip(providers, model_names)),
+            dtype=np.intp,
+            count=len(rows)
+        )
+        costs = (
+            np.asarray(prompt_tokens, dtype=np.float64) * _RATE_TABLE_IN[idx]
+            + np.asarray(completion_tokens, dtype=np.float64) * _RATE_TABLE_OUT[idx]
+        ).round(6)
+        
+        session.execute(
+            update(cls),
+            [{"id": i, "cost_usd": c} for i, c in zip(ids, costs.tolist())]
+        )
+        return len(rows)
@@ -1,12 +1,18 @@
 """
 Modelo SQLAlchemy para modelos de simulación guardados
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, Text, JSON, func, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, List, Optional
 
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.simulation import SimulationRun
+    from app.models.threshold import Threshold
+    from app.models.user import User
+
 
 class Model(Base):
     """
@@ -20,37 +26,47 @@ class Model(Base):
         - simulation_runs: Lista de ejecuciones de este modelo
     """
     __tablename__ = "models"
+    __table_args__ = (
+        # Listado por dueño con paginación keyset sobre (created_at, id)
+        Index("ix_models_owner_created", "owner_id", "created_at", "id"),
+        # Mismo listado filtrado por model_type, ya en el orden de la página
+        Index(
+            "ix_models_owner_type_created",
+            "owner_id", "model_type", text("created_at DESC"), text("id DESC"),
+            postgresql_include=["name", "version"]
+        ),
+    )
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Identificación
-    name = Column(String(100), nullable=False, index=True)
-    description = Column(Text, nullable=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
+    description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Metadata del modelo
-    model_type = Column(String(50), nullable=False)  # "tank", "microgrid", "drone", "hvac", "custom"
-    version = Column(String(20), default="1.0.0")
+    model_type: Mapped[str] = mapped_column(String(50), nullable=False)  # "tank", "microgrid", "drone", "hvac", "custom"
+    version: Mapped[Optional[str]] = mapped_column(String(20), default="1.0.0")
     
     # Contenido del modelo (JSON completo según twinsec_model_v1.json)
-    content = Column(JSON, nullable=False)
+    content: Mapped[Any] = mapped_column(JSON, nullable=False)
     
     # Generación vía LLM
-    llm_prompt = Column(Text, nullable=True)  # Prompt original usado para generar el modelo
-    llm_provider = Column(String(50), nullable=True)  # "openai", "anthropic", "azure_openai"
-    llm_model = Column(String(50), nullable=True)  # "gpt-4", "claude-3-opus", etc.
+    llm_prompt: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Prompt original usado para generar el modelo
+    llm_provider: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # "openai", "anthropic", "azure_openai"
+    llm_model: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # "gpt-4", "claude-3-opus", etc.
     
     # Relación con usuario
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    owner = relationship("User", back_populates="models")
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    owner: Mapped["User"] = relationship("User", back_populates="models")
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relaciones
-    simulation_runs = relationship("SimulationRun", back_populates="model", cascade="all, delete-orphan")
-    thresholds = relationship("Threshold", back_populates="model", cascade="all, delete-orphan")
+    simulation_runs: Mapped[List["SimulationRun"]] = relationship("SimulationRun", back_populates="model", cascade="all, delete-orphan")
+    thresholds: Mapped[List["Threshold"]] = relationship("Threshold", back_populates="model", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Model(id={self.id}, name='{self.name}', type='{self.model_type}', owner_id={self.owner_id})>"
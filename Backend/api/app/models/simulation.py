@@ -1,12 +1,20 @@
 """
 Modelo SQLAlchemy para ejecuciones de simulación
 """
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Float, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Index, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, List, Optional
 
+from app.core.ids import uuid7
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.attack import Attack
+    from app.models.ids_alert import IDSAlert
+    from app.models.model import Model
+    from app.models.user import User
+
 
 class SimulationRun(Base):
     """
@@ -20,54 +28,59 @@ class SimulationRun(Base):
         - model: Modelo de simulación usado
     """
     __tablename__ = "simulation_runs"
+    __table_args__ = (
+        # Runs de un usuario filtrados por estado
+        Index("ix_simulation_runs_user_status", "user_id", "status"),
+    )
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Identificación
-    run_id = Column(String(50), unique=True, index=True, nullable=False)  # UUID generado
-    name = Column(String(100), nullable=True)
+    # UUID v7: ordenado por tiempo, los inserts van al final del índice único
+    run_id: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False, default=lambda: str(uuid7()))
+    name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     # Estado de la simulación
-    status = Column(
+    status: Mapped[str] = mapped_column(
         String(20), 
         nullable=False, 
         default="pending"
     )  # "pending", "running", "paused", "completed", "failed", "stopped"
     
     # Parámetros de ejecución
-    duration = Column(Float, nullable=False)  # Duración en segundos
-    time_step = Column(Float, nullable=False)  # dt en segundos
+    duration: Mapped[float] = mapped_column(Float, nullable=False)  # Duración en segundos
+    time_step: Mapped[float] = mapped_column(Float, nullable=False)  # dt en segundos
     
     # Configuración de ataques (si aplica)
-    attack_config = Column(JSON, nullable=True)
+    attack_config: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
     
     # Resultados
-    progress = Column(Float, default=0.0)  # Porcentaje de completado (0.0 - 1.0)
-    error_message = Column(String(500), nullable=True)  # Si falló, el mensaje de error
+    progress: Mapped[Optional[float]] = mapped_column(Float, default=0.0)  # Porcentaje de completado (0.0 - 1.0)
+    error_message: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)  # Si falló, el mensaje de error
     
     # Métricas de ejecución
-    start_time = Column(DateTime, nullable=True)  # Cuándo empezó la simulación
-    end_time = Column(DateTime, nullable=True)    # Cuándo terminó
-    execution_time = Column(Float, nullable=True)  # Tiempo real de ejecución (segundos)
+    start_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)  # Cuándo empezó la simulación
+    end_time: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)    # Cuándo terminó
+    execution_time: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # Tiempo real de ejecución (segundos)
     
     # Resultados guardados (resumen)
-    results_summary = Column(JSON, nullable=True)  # Estadísticas, alertas, etc.
+    results_summary: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)  # Estadísticas, alertas, etc.
     
     # Relaciones con usuario y modelo
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    user = relationship("User", back_populates="simulation_runs")
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    user: Mapped["User"] = relationship("User", back_populates="simulation_runs")
     
-    model_id = Column(Integer, ForeignKey("models.id"), nullable=False)
-    model = relationship("Model", back_populates="simulation_runs")
+    model_id: Mapped[int] = mapped_column(Integer, ForeignKey("models.id"), nullable=False)
+    model: Mapped["Model"] = relationship("Model", back_populates="simulation_runs")
     
     # Relaciones con ataques y alertas IDS
-    attacks = relationship("Attack", back_populates="simulation_run", cascade="all, delete-orphan")
-    ids_alerts = relationship("IDSAlert", back_populates="simulation_run", cascade="all, delete-orphan")
+    attacks: Mapped[List["Attack"]] = relationship("Attack", back_populates="simulation_run", cascade="all, delete-orphan")
+    ids_alerts: Mapped[List["IDSAlert"]] = relationship("IDSAlert", back_populates="simulation_run", cascade="all, delete-orphan")
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<SimulationRun(id={self.id}, run_id='{self.run_id}', status='{self.status}', user_id={self.user_id})>"
@@ -1,13 +1,35 @@
 """
 Modelo SQLAlchemy para umbrales de alarma en señales
 """
-from sqlalchemy import Column, String, Integer, ForeignKey, Float, Boolean, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Computed, String, Integer, DateTime, ForeignKey, Float, Boolean, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
-from sqlalchemy import DateTime
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import numpy as np
 
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.model import Model
+    from app.models.user import User
+
+
+# Kernels vectorizados: retornan el exceso por muestra (0.0 = sin violación)
+def batch_check_upper(current: np.ndarray, threshold: float) -> np.ndarray:
+    """Exceso sobre un límite superior para un bloque de muestras."""
+    return np.maximum(current - threshold, 0.0)
+
+
+def batch_check_lower(current: np.ndarray, threshold: float) -> np.ndarray:
+    """Déficit bajo un límite inferior para un bloque de muestras."""
+    return np.maximum(threshold - current, 0.0)
+
+
+def batch_check_rate(current: np.ndarray, previous: np.ndarray, dt: float, threshold: float) -> np.ndarray:
+    """Exceso de tasa de cambio (|Δ|/dt) para un bloque de muestras."""
+    return np.maximum(np.abs(current - previous) / dt - threshold, 0.0)
+
 
 class Threshold(Base):
     """
@@ -24,62 +46,67 @@ class Threshold(Base):
     __tablename__ = "thresholds"
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Relación con modelo
-    model_id = Column(Integer, ForeignKey("models.id"), nullable=False)
-    model = relationship("Model", back_populates="thresholds")
+    model_id: Mapped[int] = mapped_column(Integer, ForeignKey("models.id"), nullable=False)
+    # selectin: las verificaciones iteran muchos umbrales, un solo IN para todos
+    model: Mapped["Model"] = relationship("Model", back_populates="thresholds", lazy="selectin")
     
     # Señal objetivo
-    signal_name = Column(String(100), nullable=False, index=True)
-    # Formato: "component_id.signal_id" (ej. "T1.h", "V_in.q")
+    component_id: Mapped[str] = mapped_column(String(100), nullable=False)  # "T1", "V_in"
+    signal_id: Mapped[str] = mapped_column(String(100), nullable=False)     # "h", "q"
     
-    component_id = Column(String(100), nullable=False)  # "T1", "V_in"
-    signal_id = Column(String(100), nullable=False)     # "h", "q"
+    # Formato: "component_id.signal_id" (ej. "T1.h", "V_in.q"); columna generada por la BD
+    signal_name: Mapped[str] = mapped_column(
+        String(201),
+        Computed("component_id || '.' || signal_id", persisted=True),
+        index=True
+    )
     
     # Tipo de umbral
-    threshold_type = Column(
+    threshold_type: Mapped[str] = mapped_column(
         String(30),
         nullable=False
     )  # 'upper' (límite superior), 'lower' (límite inferior), 'rate_of_change' (derivada)
     
     # Valor del umbral
-    value = Column(Float, nullable=False)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
     # Para 'upper' o 'lower': valor absoluto
     # Para 'rate_of_change': cambio máximo permitido por segundo
     
     # Configuración de histéresis (evita alarmas oscilantes)
-    hysteresis = Column(Float, nullable=True, default=0.0)
+    hysteresis: Mapped[Optional[float]] = mapped_column(Float, nullable=True, default=0.0)
     # Banda muerta: la señal debe volver a value ± hysteresis antes de desactivar alarma
     
     # Severidad de la alarma
-    severity = Column(
+    severity: Mapped[str] = mapped_column(
         String(20),
         nullable=False,
         default="warning"
     )  # 'info', 'warning', 'critical'
     
     # Estado del umbral
-    enabled = Column(Boolean, nullable=False, default=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     
     # Descripción y metadata
-    description = Column(String(500), nullable=True)
-    alarm_message = Column(String(200), nullable=True)  # Mensaje a mostrar en HMI
+    description: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    alarm_message: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)  # Mensaje a mostrar en HMI
     
     # Color para visualización en HMI
-    color = Column(String(7), nullable=True)  # Hex color (ej. "#FF0000" para rojo)
+    color: Mapped[Optional[str]] = mapped_column(String(7), nullable=True)  # Hex color (ej. "#FF0000" para rojo)
     
     # Acciones automatizadas (JSON)
-    auto_actions = Column(JSON, nullable=True)
+    auto_actions: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
     # Ejemplo: {"stop_simulation": true, "send_notification": true, "log_event": true}
     
     # Usuario que creó el umbral
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_by_user = relationship("User")
+    created_by: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    created_by_user: Mapped["User"] = relationship("User")
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     def __repr__(self):
         return f"<Threshold(id={self.id}, signal='{self.signal_name}', type='{self.threshold_type}', value={self.value})>"
@@ -138,6 +165,65 @@ class Threshold(Base):
         
         return {"violated": False, "details": {"reason": "unknown_threshold_type"}}
     
+    def make_checker(self) -> Callable[[float, Optional[float], Optional[float]], float]:
+        """
+        Compila la verificación del umbral para el loop de simulación.
+        
+        El tipo de umbral se resuelve una sola vez; el checker retornado solo
+        hace aritmética y retorna el exceso (0.0 si no hay violación). Usar
+        check_violation solo cuando el checker reporta una violación, para
+        armar los detalles.
+        
+        Returns:
+            checker(current_value, previous_value, dt) -> exceso
+        """
+        value = self.value
+        
+        if not self.enabled:
+            return lambda current, previous=None, dt=None: 0.0
+        
+        if self.threshold_type == "upper":
+            return lambda current, previous=None, dt=None: max(current - value, 0.0)
+        
+        if self.threshold_type == "lower":
+            return lambda current, previous=None, dt=None: max(value - current, 0.0)
+        
+        if self.threshold_type == "rate_of_change":
+            def check_rate(current, previous=None, dt=None):
+                if previous is None or dt is None:
+                    return 0.0
+                return max(abs(current - previous) / dt - value, 0.0)
+            return check_rate
+        
+        return lambda current, previous=None, dt=None: 0.0
+    
+    def check_block(self, current: np.ndarray, previous: Optional[np.ndarray] = None, dt: Optional[float] = None) -> np.ndarray:
+        """
+        Verifica un bloque de muestras de la señal (p. ej. 1000 pasos).
+        
+        Args:
+            current: Valores de la señal
+            previous: Valores del paso anterior (para rate_of_change)
+            dt: Delta de tiempo (para rate_of_change)
+        
+        Returns:
+            Índices de las muestras que violan el umbral (np.nonzero)
+        """
+        current = np.asarray(current, dtype=np.float64)
+        
+        if not self.enabled:
+            excess = np.zeros_like(current)
+        elif self.threshold_type == "upper":
+            excess = batch_check_upper(current, self.value)
+        elif self.threshold_type == "lower":
+            excess = batch_check_lower(current, self.value)
+        elif self.threshold_type == "rate_of_change" and previous is not None and dt is not None:
+            excess = batch_check_rate(current, np.asarray(previous, dtype=np.float64), dt, self.value)
+        else:
+            excess = np.zeros_like(current)
+        
+        return np.nonzero(excess)[0]
+    
     def to_dict(self):
         """Convierte el umbral a diccionario para serialización"""
         return {
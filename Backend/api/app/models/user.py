@@ -1,12 +1,19 @@
 """
 Modelo SQLAlchemy para usuarios
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Integer
-from sqlalchemy.orm import relationship
+from sqlalchemy import String, Boolean, DateTime, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import TYPE_CHECKING, List, Optional
 
 from app.db.base import Base
 
+if TYPE_CHECKING:
+    from app.models.audit_log import AuditLog
+    from app.models.llm_request import LLMRequest
+    from app.models.model import Model
+    from app.models.simulation import SimulationRun
+
 
 class User(Base):
     """
@@ -20,32 +27,32 @@ class User(Base):
     __tablename__ = "users"
     
     # Primary Key
-    id = Column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     
     # Identificación
-    username = Column(String(50), unique=True, index=True, nullable=False)
-    email = Column(String(255), unique=True, index=True, nullable=False)
-    full_name = Column(String(100))
+    username: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True, nullable=False)
+    full_name: Mapped[Optional[str]] = mapped_column(String(100))
     
     # Autenticación
-    hashed_password = Column(String(255), nullable=False)
-    is_active = Column(Boolean, default=True)
-    is_superuser = Column(Boolean, default=False)
+    hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
+    is_active: Mapped[Optional[bool]] = mapped_column(Boolean, default=True)
+    is_superuser: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
     
     # OAuth (para futura integración con Google, Facebook, LinkedIn)
-    oauth_provider = Column(String(50), nullable=True)  # "google", "facebook", "linkedin"
-    oauth_id = Column(String(255), nullable=True)
+    oauth_provider: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # "google", "facebook", "linkedin"
+    oauth_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    last_login = Column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    last_login: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
     # Relaciones
-    models = relationship("Model", back_populates="owner", cascade="all, delete-orphan")
-    simulation_runs = relationship("SimulationRun", back_populates="user", cascade="all, delete-orphan")
-    audit_logs = relationship("AuditLog", back_populates="user")
-    llm_requests = relationship("LLMRequest", back_populates="user")
+    models: Mapped[List["Model"]] = relationship("Model", back_populates="owner", cascade="all, delete-orphan")
+    simulation_runs: Mapped[List["SimulationRun"]] = relationship("SimulationRun", back_populates="user", cascade="all, delete-orphan")
+    audit_logs: Mapped[List["AuditLog"]] = relationship("AuditLog", back_populates="user")
+    llm_requests: Mapped[List["LLMRequest"]] = relationship("LLMRequest", back_populates="user")
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
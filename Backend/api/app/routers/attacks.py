@@ -4,23 +4,38 @@ API Router para gestión de ataques cibernéticos
 Endpoints para inyectar, listar y gestionar ataques en simulaciones OT.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload, raiseload
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 import logging
 
-from app.database import get_db
-from app.models import User, Attack, SimulationRun
+import orjson
+
+from app.config import get_settings
+from app.core.responses import ORJSONResponse
+from app.database import AsyncSessionLocal, get_async_db
+from app.models import Attack, SimulationRun, Model
+from app.routers.auth import UserDTO
 from app.routers.models import get_current_user  # Mock auth temporal
 from app.services.attack_service import get_attack_service, AttackType, AttackStatus
+from app.services.audit_writer import get_audit_writer, request_context
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# En debug, cualquier lazy load no declarado en la query falla (detecta N+1)
+_STRICT_LOADING = [raiseload("*")] if settings.API_DEBUG else []
 
 router = APIRouter(
     prefix="/attacks",
-    tags=["attacks"]
+    tags=["attacks"],
+    default_response_class=ORJSONResponse
 )
 
 
@@ -30,16 +45,10 @@ router = APIRouter(
 
 class AttackCreateRequest(BaseModel):
     """Request para crear/inyectar un ataque."""
-    run_id: int = Field(..., description="ID de la simulación donde inyectar el ataque")
-    attack_type: AttackType = Field(..., description="Tipo de ataque (dos, false_data_injection, etc.)")
-    target_signal: str = Field(..., description="Señal objetivo (ej: 'tank.level', 'valve.position')")
-    start_time: float = Field(..., description="Tiempo de inicio del ataque (segundos desde t=0)", ge=0)
-    duration: Optional[float] = Field(None, description="Duración del ataque en segundos (None = indefinido)", ge=0)
-    parameters: Dict[str, Any] = Field(default_factory=dict, description="Parámetros específicos del ataque")
-    description: Optional[str] = Field(None, description="Descripción del ataque")
-    
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="forbid",
+        str_strip_whitespace=True,
+        json_schema_extra={
             "example": {
                 "run_id": 1,
                 "attack_type": "false_data_injection",
@@ -52,19 +61,88 @@ class AttackCreateRequest(BaseModel):
                 "description": "Inyectar nivel falso de 8.5m en el sensor"
             }
         }
+    )
+    
+    run_id: int = Field(..., description="ID de la simulación donde inyectar el ataque")
+    attack_type: AttackType = Field(..., description="Tipo de ataque (dos, false_data_injection, etc.)")
+    target_signal: str = Field(..., description="Señal objetivo (ej: 'tank.level', 'valve.position')")
+    start_time: float = Field(..., description="Tiempo de inicio del ataque (segundos desde t=0)", ge=0)
+    duration: Optional[float] = Field(None, description="Duración del ataque en segundos (None = indefinido)", ge=0)
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Parámetros específicos del ataque")
+    description: Optional[str] = Field(None, description="Descripción del ataque")
+
+
+class AttackRead(BaseModel):
+    """Detalle de un ataque (construido desde filas de BD ya validadas)."""
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+    
+    id: int
+    attack_id: str
+    run_id: int
+    attack_type: str
+    target_signal: Optional[str]
+    target_component: str
+    start_time: float
+    duration: Optional[float]
+    parameters: Dict[str, Any]
+    description: Optional[str]
+    status: str
+    severity: Optional[str]
+    success: Optional[bool]
+    created_at: datetime
+    started_at: Optional[datetime]
+    ended_at: Optional[datetime]
+    
+    @classmethod
+    def from_attack(cls, attack: Attack) -> "AttackRead":
+        """Construye sin validar: los datos vienen de la BD."""
+        return cls.model_construct(
+            id=attack.id,
+            attack_id=attack.attack_id,
+            run_id=attack.simulation_run_id,
+            attack_type=attack.attack_type,
+            target_signal=attack.target_signal,
+            target_component=attack.target_component,
+            start_time=attack.trigger_time,
+            duration=attack.duration,
+            parameters=attack.parameters,
+            description=attack.description,
+            status=attack.status,
+            severity=attack.severity,
+            success=attack.success,
+            created_at=attack.created_at,
+            started_at=attack.started_at,
+            ended_at=attack.ended_at
+        )
+
+
+class AttackItem(BaseModel):
+    """Ataque en el listado (validado directo desde el objeto ORM)."""
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+    
+    id: int
+    attack_id: str
+    run_id: int = Field(validation_alias="simulation_run_id")
+    attack_type: str
+    target_signal: Optional[str]
+    start_time: float = Field(validation_alias="trigger_time")
+    duration: Optional[float]
+    status: str
+    detected: bool = False  # Placeholder hasta implementar IDS
+    created_at: datetime
 
 
 class AttackResponse(BaseModel):
     """Response de un ataque."""
     success: bool
-    attack: Dict
+    attack: AttackRead
     attack_id: int
 
 
 class AttackListResponse(BaseModel):
     """Response para listado de ataques."""
     success: bool
-    attacks: List[Dict]
+    attacks: List[AttackItem]
     total: int
 
 
@@ -75,8 +153,9 @@ class AttackListResponse(BaseModel):
 @router.post("/", response_model=AttackResponse)
 async def create_attack(
     request: AttackCreateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Crea e inyecta un ataque en una simulación.
@@ -142,9 +221,10 @@ async def create_attack(
         logger.info(f"Creando ataque '{request.attack_type}' en señal '{request.target_signal}'")
         
         # Verificar que la simulación existe y pertenece al usuario
-        run = db.query(SimulationRun).filter(
-            SimulationRun.id == request.run_id
-        ).first()
+        run = await db.get(
+            SimulationRun, request.run_id,
+            options=[joinedload(SimulationRun.model)]
+        )
         
         if not run:
             raise HTTPException(
@@ -193,8 +273,8 @@ async def create_attack(
         )
         
         db.add(attack)
-        db.commit()
-        db.refresh(attack)
+        await db.commit()
+        await db.refresh(attack)
         
         # Registrar en el servicio de ataques (para ejecución en tiempo real)
         # Combinar target_signal con parameters
@@ -209,21 +289,20 @@ async def create_attack(
         
         logger.info(f"✅ Ataque creado: {attack.attack_id} (ID BD: {attack.id})")
         
+        await get_audit_writer().put({
+            "event_type": "attack_enabled",
+            "severity": "warning",
+            "message": f"Ataque {attack.attack_type} armado sobre {attack.target_signal}",
+            "details": {"attack_id": attack.attack_id, "parameters": attack.parameters},
+            "user_id": current_user.id,
+            "model_id": run.model_id,
+            "simulation_run_id": run.id,
+            **request_context(http_request)
+        })
+        
         return AttackResponse(
             success=True,
-            attack={
-                "id": attack.id,
-                "attack_id": attack.attack_id,
-                "attack_type": attack.attack_type,
-                "target_signal": attack.target_signal,
-                "target_component": attack.target_component,
-                "start_time": attack.trigger_time,
-                "duration": attack.duration,
-                "parameters": attack.parameters,
-                "status": attack.status,
-                "severity": attack.severity,
-                "created_at": attack.created_at.isoformat()
-            },
+            attack=AttackRead.from_attack(attack),
             attack_id=attack.id
         )
     
@@ -237,65 +316,90 @@ async def create_attack(
         )
 
 
-@router.get("/", response_model=AttackListResponse)
+@router.get("/", responses={200: {"model": AttackListResponse}})
 async def list_attacks(
     run_id: Optional[int] = None,
     attack_type: Optional[AttackType] = None,
-    skip: int = 0,
-    limit: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Lista los ataques del usuario actual.
     
+    La respuesta se emite en streaming (un ataque a la vez desde un cursor
+    del servidor), así la memoria no crece con `limit`.
+    
     **Filtros:**
     - `run_id`: Filtrar por simulación
     - `attack_type`: Filtrar por tipo de ataque
     - `skip`, `limit`: Paginación
     """
     # Construir query base
-    query = db.query(Attack).join(SimulationRun).join(SimulationRun.model).filter(
-        SimulationRun.model.has(owner_id=current_user.id)
+    query = select(Attack).join(Attack.simulation_run).join(SimulationRun.model).where(
+        Model.owner_id == current_user.id
     )
     
     if run_id is not None:
-        query = query.filter(Attack.simulation_run_id == run_id)
+        query = query.where(Attack.simulation_run_id == run_id)
     
     if attack_type is not None:
-        query = query.filter(Attack.attack_type == attack_type)
+        query = query.where(Attack.attack_type == attack_type)
     
-    total = query.count()
-    attacks = query.order_by(Attack.created_at.desc()).offset(skip).limit(limit).all()
+    # Reusar el JOIN para poblar simulation_run/model; cualquier otro lazy load falla
+    page = query.options(
+        contains_eager(Attack.simulation_run).contains_eager(SimulationRun.model),
+        raiseload("*")
+    ).order_by(Attack.created_at.desc()).offset(skip).limit(limit).execution_options(yield_per=100)
     
-    return AttackListResponse(
-        success=True,
-        attacks=[{
-            "id": a.id,
-            "attack_id": a.attack_id,
-            "run_id": a.simulation_run_id,
-            "attack_type": a.attack_type,
-            "target_signal": a.target_signal,
-            "start_time": a.trigger_time,
-            "duration": a.duration,
-            "status": a.status,
-            "detected": False,  # Placeholder hasta implementar IDS
-            "created_at": a.created_at.isoformat()
-        } for a in attacks],
-        total=total
-    )
+    # Sesión propia: la de la dependencia se cierra antes de enviar el body.
+    # La query se ejecuta antes de responder: si falla, el cliente recibe un
+    # error HTTP normal y no un 200 con el JSON cortado.
+    db = AsyncSessionLocal()
+    try:
+        attacks = await db.stream_scalars(page)
+    except Exception:
+        await db.close()
+        raise
+    
+    async def _stream():
+        try:
+            yield b'{"success":true,"attacks":['
+            
+            count = 0
+            async for attack in attacks:
+                if count:
+                    yield b","
+                yield AttackItem.model_validate(attack).model_dump_json().encode()
+                count += 1
+            
+            # Página incompleta (y no vacía más allá del inicio): el total ya se conoce sin COUNT
+            if count < limit and (count or skip == 0):
+                total = skip + count
+            else:
+                total = await db.scalar(query.with_only_columns(func.count(Attack.id)))
+            
+            yield b'],"total":' + str(total).encode() + b"}"
+        finally:
+            await db.close()
+    
+    # Cierre también si el body nunca llega a iterarse (close() es idempotente)
+    return StreamingResponse(_stream(), media_type="application/json", background=BackgroundTask(db.close))
 
 
 @router.get("/{attack_id}")
 async def get_attack(
     attack_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Obtiene un ataque por ID.
     """
-    attack = db.query(Attack).filter(Attack.id == attack_id).first()
+    attack = await db.get(
+        Attack, attack_id,
+        options=[joinedload(Attack.simulation_run).joinedload(SimulationRun.model), *_STRICT_LOADING]
+    )
     
     if not attack:
         raise HTTPException(
@@ -310,39 +414,27 @@ async def get_attack(
             detail="No tienes permisos para ver este ataque"
         )
     
-    return {
+    # Sin response_model: se devuelve la respuesta ya armada para saltar jsonable_encoder
+    return ORJSONResponse({
         "success": True,
-        "attack": {
-            "id": attack.id,
-            "attack_id": attack.attack_id,
-            "run_id": attack.simulation_run_id,
-            "attack_type": attack.attack_type,
-            "target_signal": attack.target_signal,
-            "target_component": attack.target_component,
-            "start_time": attack.trigger_time,
-            "duration": attack.duration,
-            "parameters": attack.parameters,
-            "description": attack.description,
-            "status": attack.status,
-            "severity": attack.severity,
-            "success": attack.success,
-            "created_at": attack.created_at.isoformat(),
-            "started_at": attack.started_at.isoformat() if attack.started_at else None,
-            "ended_at": attack.ended_at.isoformat() if attack.ended_at else None
-        }
-    }
+        "attack": AttackRead.from_attack(attack).model_dump()
+    })
 
 
 @router.delete("/{attack_id}")
 async def delete_attack(
     attack_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    http_request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Elimina un ataque (solo si está en estado pending).
     """
-    attack = db.query(Attack).filter(Attack.id == attack_id).first()
+    attack = await db.get(
+        Attack, attack_id,
+        options=[joinedload(Attack.simulation_run).joinedload(SimulationRun.model), *_STRICT_LOADING]
+    )
     
     if not attack:
         raise HTTPException(
@@ -364,82 +456,96 @@ async def delete_attack(
             detail=f"No se puede eliminar un ataque en estado '{attack.status}'"
         )
     
-    db.delete(attack)
-    db.commit()
+    await db.delete(attack)
+    await db.commit()
     
     logger.info(f"Ataque {attack_id} eliminado por usuario {current_user.id}")
     
-    return {"success": True, "message": "Ataque eliminado"}
+    await get_audit_writer().put({
+        "event_type": "attack_disabled",
+        "message": f"Ataque {attack_id} eliminado",
+        "details": {"attack_id": attack.attack_id},
+        "user_id": current_user.id,
+        "simulation_run_id": attack.simulation_run_id,
+        **request_context(http_request)
+    })
+    
+    return ORJSONResponse({"success": True, "message": "Ataque eliminado"})
 
 
-@router.get("/types/list")
-async def list_attack_types():
-    """
-    Lista los tipos de ataques soportados con descripción y parámetros requeridos.
-    """
-    return {
-        "success": True,
-        "attack_types": [
-            {
-                "type": "dos",
-                "name": "Denial of Service",
-                "description": "Bloquea completamente una señal",
-                "parameters": {
-                    "blocked_value": {
-                        "type": "float",
-                        "required": False,
-                        "default": 0.0,
-                        "description": "Valor al que se bloquea la señal"
-                    }
+# Payload constante: se serializa una sola vez al importar el módulo
+_ATTACK_TYPES_PAYLOAD = {
+    "success": True,
+    "attack_types": [
+        {
+            "type": "dos",
+            "name": "Denial of Service",
+            "description": "Bloquea completamente una señal",
+            "parameters": {
+                "blocked_value": {
+                    "type": "float",
+                    "required": False,
+                    "default": 0.0,
+                    "description": "Valor al que se bloquea la señal"
                 }
-            },
-            {
-                "type": "false_data_injection",
-                "name": "False Data Injection",
-                "description": "Inyecta un valor falso en un sensor/señal",
-                "parameters": {
-                    "false_value": {
-                        "type": "float",
-                        "required": True,
-                        "description": "Valor falso a inyectar"
-                    }
+            }
+        },
+        {
+            "type": "false_data_injection",
+            "name": "False Data Injection",
+            "description": "Inyecta un valor falso en un sensor/señal",
+            "parameters": {
+                "false_value": {
+                    "type": "float",
+                    "required": True,
+                    "description": "Valor falso a inyectar"
                 }
-            },
-            {
-                "type": "replay_attack",
-                "name": "Replay Attack",
-                "description": "Repite valores grabados previamente",
-                "parameters": {
-                    "replay_buffer": {
-                        "type": "array<float>",
-                        "required": True,
-                        "description": "Lista de valores grabados a repetir"
-                    }
+            }
+        },
+        {
+            "type": "replay_attack",
+            "name": "Replay Attack",
+            "description": "Repite valores grabados previamente",
+            "parameters": {
+                "replay_buffer": {
+                    "type": "array<float>",
+                    "required": True,
+                    "description": "Lista de valores grabados a repetir"
                 }
-            },
-            {
-                "type": "ramp_attack",
-                "name": "Ramp Attack",
-                "description": "Incrementa/decrementa gradualmente el valor",
-                "parameters": {
-                    "rate": {
-                        "type": "float",
-                        "required": True,
-                        "description": "Tasa de cambio por segundo (positivo o negativo)"
-                    }
+            }
+        },
+        {
+            "type": "ramp_attack",
+            "name": "Ramp Attack",
+            "description": "Incrementa/decrementa gradualmente el valor",
+            "parameters": {
+                "rate": {
+                    "type": "float",
+                    "required": True,
+                    "description": "Tasa de cambio por segundo (positivo o negativo)"
                 }
-            },
-            {
-                "type": "random_noise",
-                "name": "Random Noise",
-                "description": "Añade ruido aleatorio gaussiano",
-                "parameters": {
-                    "noise_std": {
-                        "type": "float",
-                        "required": True,
-                        "description": "Desviación estándar del ruido"
-                    }
+            }
+        },
+        {
+            "type": "random_noise",
+            "name": "Random Noise",
+            "description": "Añade ruido aleatorio gaussiano",
+            "parameters": {
+                "noise_std": {
+                    "type": "float",
+                    "required": True,
+                    "description": "Desviación estándar del ruido"
                 }
             }
-        ]
-    }
+        }
+    ]
+}
+_ATTACK_TYPES_PAYLOAD_BYTES = orjson.dumps(_ATTACK_TYPES_PAYLOAD)
+
+
+@router.get("/types/list")
+async def list_attack_types():
+    """
+    Lista los tipos de ataques soportados con descripción y parámetros requeridos.
+    """
+    return Response(content=_ATTACK_TYPES_PAYLOAD_BYTES, media_type="application/json")
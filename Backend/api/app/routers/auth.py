@@ -2,17 +2,23 @@
 API Router para autenticación con JWT y OAuth (Google, Facebook)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import NamedTuple, Optional
 from datetime import timedelta
+from functools import lru_cache
+from hashlib import sha256
+from urllib.parse import urlencode
+import asyncio
 import logging
-import httpx
+import time
+from cachetools import TTLCache
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_async_db
 from app.models import User
 from app.core.security import (
     verify_password,
@@ -22,6 +28,7 @@ from app.core.security import (
     decode_access_token,
 )
 from app.config import get_settings
+from app.services.audit_writer import get_audit_writer, request_context
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -33,6 +40,37 @@ router = APIRouter(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+# URLs de OAuth fijas por proceso (solo `state` cambia por request)
+GOOGLE_REDIRECT_URI = f"{settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/google/callback"
+FACEBOOK_REDIRECT_URI = f"{settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/facebook/callback"
+
+_GOOGLE_AUTH_PARAMS = {
+    "client_id": settings.GOOGLE_CLIENT_ID,
+    "redirect_uri": GOOGLE_REDIRECT_URI,
+    "response_type": "code",
+    "scope": "openid email profile",
+}
+_FACEBOOK_AUTH_PARAMS = {
+    "client_id": settings.FACEBOOK_APP_ID,
+    "redirect_uri": FACEBOOK_REDIRECT_URI,
+    "response_type": "code",
+    "scope": "email,public_profile",
+}
+
+
+@lru_cache(maxsize=64)
+def _build_google_oauth_url(redirect_uri: str) -> str:
+    """URL de autorización de Google (cached: los orígenes del frontend son pocos)."""
+    query = urlencode({**_GOOGLE_AUTH_PARAMS, "state": redirect_uri})
+    return f"https://accounts.google.com/o/oauth2/v2/auth?{query}"
+
+
+@lru_cache(maxsize=64)
+def _build_facebook_oauth_url(redirect_uri: str) -> str:
+    """URL de autorización de Facebook (cached)."""
+    query = urlencode({**_FACEBOOK_AUTH_PARAMS, "state": redirect_uri})
+    return f"https://www.facebook.com/v18.0/dialog/oauth?{query}"
+
 
 # ========================================
 # SCHEMAS
@@ -76,19 +114,81 @@ class PasswordResetRequest(BaseModel):
 # DEPENDENCIAS
 # ========================================
 
+class UserDTO(NamedTuple):
+    """Usuario autenticado (solo lectura, sin estado ORM)."""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    is_active: bool
+    is_superuser: bool
+
+
+# sha256(token) -> (UserDTO, exp): JWT + SELECT una vez por token por minuto
+_user_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+
+
+# Consultas armadas una vez por proceso: cada request solo pasa los
+# parámetros y reutiliza el SQL compilado del statement cache
+_CURRENT_USER_STMT = select(
+    User.id, User.email, User.username, User.full_name, User.is_active, User.is_superuser
+).where(User.id == bindparam("user_id"))
+
+_REGISTER_CONFLICTS_STMT = (
+    select(User.email, User.username)
+    .where(or_(User.email == bindparam("email"), User.username == bindparam("username")))
+    .limit(2)
+)
+
+# Email o username: UNION ALL de dos búsquedas por índice único (un OR
+# entre columnas distintas puede terminar en seq scan)
+_LOGIN_USER_STMT = select(User).from_statement(
+    union_all(
+        select(User).where(User.email == bindparam("login")),
+        select(User).where(User.username == bindparam("login"))
+    ).limit(1)
+)
+
+_USER_BY_EMAIL_STMT = select(User).where(User.email == bindparam("email"))
+
+_USER_ID_BY_EMAIL_STMT = select(User.id).where(User.email == bindparam("email"))
+
+
+def _token_key(token: str) -> bytes:
+    return sha256(token.encode()).digest()
+
+
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> UserDTO:
     """
     Obtiene el usuario actual desde el token JWT.
+
+    El resultado queda en `request.state.user`, así otras dependencias o
+    middlewares de la misma request no repiten el decode ni el SELECT.
     """
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    key = _token_key(token)
+    cached = _user_cache.get(key)
+    if cached is not None:
+        user, exp = cached
+        if exp > time.time():
+            request.state.user = user
+            return user
+        _user_cache.pop(key, None)
+        raise credentials_exception
+    
     payload = decode_access_token(token)
     if payload is None:
         raise credentials_exception
@@ -97,16 +197,19 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    row = (await db.execute(_CURRENT_USER_STMT, {"user_id": user_id})).first()
+    if row is None:
         raise credentials_exception
     
+    user = UserDTO._make(row)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User is inactive"
         )
     
+    _user_cache[key] = (user, payload["exp"])
+    request.state.user = user
     return user
 
 
@@ -117,20 +220,25 @@ async def get_current_user(
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserRegisterRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Registra un nuevo usuario.
     """
-    # Verificar si el email ya existe
-    if db.query(User).filter(User.email == user_data.email).first():
+    # Verificar email y username en una sola consulta (máx. 2 filas: una por cada unique)
+    existing = (await db.execute(
+        _REGISTER_CONFLICTS_STMT,
+        {"email": user_data.email, "username": user_data.username}
+    )).all()
+    
+    if any(row.email == user_data.email for row in existing):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Verificar si el username ya existe
-    if db.query(User).filter(User.username == user_data.username).first():
+    if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -140,36 +248,50 @@ async def register(
     user = User(
         email=user_data.email,
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await asyncio.to_thread(get_password_hash, user_data.password),
         full_name=user_data.full_name,
         is_active=True,
         is_superuser=False
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     logger.info(f"New user registered: {user.email}")
     
+    await get_audit_writer().put({
+        "event_type": "user_registered",
+        "message": f"User registered: {user.username}",
+        "user_id": user.id,
+        **request_context(request)
+    })
+    
     return user
 
 
 @router.post("/login", response_model=TokenResponse)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Login con email/username y password.
     Retorna access_token y refresh_token.
     """
     # Buscar usuario por email o username
-    user = db.query(User).filter(
-        (User.email == form_data.username) | (User.username == form_data.username)
-    ).first()
-    
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(_LOGIN_USER_STMT, {"login": form_data.username})
+    
+    # bcrypt es CPU-bound: fuera del event loop
+    if not user or not await asyncio.to_thread(verify_password, form_data.password, user.hashed_password):
+        await get_audit_writer().put({
+            "event_type": "auth_failed",
+            "severity": "warning",
+            "message": f"Failed login for: {form_data.username}",
+            "user_id": user.id if user else None,
+            **request_context(request)
+        })
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password",
@@ -194,6 +316,13 @@ async def login(
     
     logger.info(f"User logged in: {user.email}")
     
+    await get_audit_writer().put({
+        "event_type": "user_login",
+        "message": f"User logged in: {user.username}",
+        "user_id": user.id,
+        **request_context(request)
+    })
+    
     return TokenResponse(
         access_token=access_token,
         refresh_token=refresh_token,
@@ -203,7 +332,7 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Obtiene información del usuario autenticado.
@@ -211,10 +340,29 @@ async def get_current_user_info(
     return current_user
 
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    current_user: UserDTO = Depends(get_current_user)
+):
+    """
+    Logout: invalida el usuario cacheado para este token.
+    """
+    _user_cache.pop(_token_key(token), None)
+    
+    await get_audit_writer().put({
+        "event_type": "user_logout",
+        "message": f"User logged out: {current_user.username}",
+        "user_id": current_user.id,
+        **request_context(request)
+    })
+
+
 @router.post("/refresh", response_model=TokenResponse)
 async def refresh_token(
     refresh_token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Refresh del access token usando el refresh token.
@@ -227,7 +375,7 @@ async def refresh_token(
         )
     
     user_id: int = payload.get("sub")
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -248,19 +396,33 @@ async def refresh_token(
     )
 
 
+async def _process_password_reset(email: str) -> None:
+    """
+    Busca al usuario y envía el email de reset (corre después de responder).
+    TODO: Implementar envío de email.
+    """
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(_USER_ID_BY_EMAIL_STMT, {"email": email})
+    
+    if user_id is None:
+        return
+    
+    logger.info(f"Password reset email queued for user {user_id}")
+
+
 @router.post("/reset-password")
 async def reset_password(
     reset_data: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks
 ):
     """
     Envía email para reset de contraseña.
-    TODO: Implementar envío de email.
-    """
-    user = db.query(User).filter(User.email == reset_data.email).first()
     
-    # No revelar si el email existe o no (seguridad)
+    La búsqueda del usuario se hace en background: la respuesta no toca la
+    DB, así su latencia no revela si el email existe.
+    """
     logger.info(f"Password reset requested for: {reset_data.email}")
+    background_tasks.add_task(_process_password_reset, reset_data.email)
     
     return {
         "message": "If the email exists, a password reset link has been sent"
@@ -286,23 +448,15 @@ async def oauth_google(request: Request, redirect_uri: Optional[str] = None):
     redirect_uri = redirect_uri or f"{request.base_url}"
     
     # URL de autorización de Google
-    google_auth_url = (
-        "https://accounts.google.com/o/oauth2/v2/auth"
-        f"?client_id={settings.GOOGLE_CLIENT_ID}"
-        f"&redirect_uri={settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/google/callback"
-        "&response_type=code"
-        "&scope=openid email profile"
-        f"&state={redirect_uri}"
-    )
-    
-    return RedirectResponse(url=google_auth_url)
+    return RedirectResponse(url=_build_google_oauth_url(redirect_uri))
 
 
 @router.get("/oauth/google/callback")
 async def oauth_google_callback(
+    request: Request,
     code: str,
     state: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Callback de Google OAuth.
@@ -316,37 +470,41 @@ async def oauth_google_callback(
     
     try:
         # Intercambiar código por token
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://oauth2.googleapis.com/token",
-                data={
-                    "code": code,
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "redirect_uri": f"{settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/google/callback",
-                    "grant_type": "authorization_code",
-                }
-            )
-            token_data = token_response.json()
-            
-            # Obtener información del usuario
-            user_response = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {token_data['access_token']}"}
+        client = request.app.state.http
+        token_response = await client.post(
+            "https://oauth2.googleapis.com/token",
+            data={
+                "code": code,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "redirect_uri": GOOGLE_REDIRECT_URI,
+                "grant_type": "authorization_code",
+            }
+        )
+        token_data = token_response.json()
+        if token_response.is_error or "access_token" not in token_data:
+            logger.warning(f"Google OAuth token exchange failed: {token_response.status_code}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Google OAuth token exchange failed"
             )
-            user_info = user_response.json()
+        
+        # Obtener información del usuario
+        user_response = await client.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {token_data['access_token']}"}
+        )
+        user_info = user_response.json()
         
         # Buscar o crear usuario
-        user = db.query(User).filter(
-            User.email == user_info["email"]
-        ).first()
+        user = await db.scalar(_USER_BY_EMAIL_STMT, {"email": user_info["email"]})
         
         if not user:
             # Crear nuevo usuario desde Google
             user = User(
                 email=user_info["email"],
                 username=user_info["email"].split("@")[0],
-                hashed_password=get_password_hash(f"oauth_google_{user_info['id']}"),  # Password temporal
+                hashed_password=await asyncio.to_thread(get_password_hash, f"oauth_google_{user_info['id']}"),  # Password temporal
                 full_name=user_info.get("name"),
                 oauth_provider="google",
                 oauth_id=user_info["id"],
@@ -354,8 +512,8 @@ async def oauth_google_callback(
                 is_superuser=False
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
             logger.info(f"New user created via Google OAuth: {user.email}")
         
         # Crear tokens
@@ -374,6 +532,8 @@ async def oauth_google_callback(
             url=f"{redirect_url}?token={access_token}&refresh_token={refresh_token}"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Google OAuth error: {str(e)}")
         raise HTTPException(
@@ -400,23 +560,15 @@ async def oauth_facebook(request: Request, redirect_uri: Optional[str] = None):
     redirect_uri = redirect_uri or f"{request.base_url}"
     
     # URL de autorización de Facebook
-    facebook_auth_url = (
-        "https://www.facebook.com/v18.0/dialog/oauth"
-        f"?client_id={settings.FACEBOOK_APP_ID}"
-        f"&redirect_uri={settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/facebook/callback"
-        "&response_type=code"
-        "&scope=email,public_profile"
-        f"&state={redirect_uri}"
-    )
-    
-    return RedirectResponse(url=facebook_auth_url)
+    return RedirectResponse(url=_build_facebook_oauth_url(redirect_uri))
 
 
 @router.get("/oauth/facebook/callback")
 async def oauth_facebook_callback(
+    request: Request,
     code: str,
     state: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Callback de Facebook OAuth.
@@ -430,27 +582,33 @@ async def oauth_facebook_callback(
     
     try:
         # Intercambiar código por token
-        async with httpx.AsyncClient() as client:
-            token_response = await client.get(
-                "https://graph.facebook.com/v18.0/oauth/access_token",
-                params={
-                    "client_id": settings.FACEBOOK_APP_ID,
-                    "client_secret": settings.FACEBOOK_APP_SECRET,
-                    "redirect_uri": f"{settings.API_BASE_URL}{settings.API_V1_STR}/auth/oauth/facebook/callback",
-                    "code": code,
-                }
-            )
-            token_data = token_response.json()
-            
-            # Obtener información del usuario
-            user_response = await client.get(
-                "https://graph.facebook.com/me",
-                params={
-                    "fields": "id,name,email",
-                    "access_token": token_data["access_token"]
-                }
+        client = request.app.state.http
+        token_response = await client.get(
+            "https://graph.facebook.com/v18.0/oauth/access_token",
+            params={
+                "client_id": settings.FACEBOOK_APP_ID,
+                "client_secret": settings.FACEBOOK_APP_SECRET,
+                "redirect_uri": FACEBOOK_REDIRECT_URI,
+                "code": code,
+            }
+        )
+        token_data = token_response.json()
+        if token_response.is_error or "access_token" not in token_data:
+            logger.warning(f"Facebook OAuth token exchange failed: {token_response.status_code}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Facebook OAuth token exchange failed"
             )
-            user_info = user_response.json()
+        
+        # Obtener información del usuario
+        user_response = await client.get(
+            "https://graph.facebook.com/me",
+            params={
+                "fields": "id,name,email",
+                "access_token": token_data["access_token"]
+            }
+        )
+        user_info = user_response.json()
         
         if not user_info.get("email"):
             raise HTTPException(
@@ -459,16 +617,14 @@ async def oauth_facebook_callback(
             )
         
         # Buscar o crear usuario
-        user = db.query(User).filter(
-            User.email == user_info["email"]
-        ).first()
+        user = await db.scalar(_USER_BY_EMAIL_STMT, {"email": user_info["email"]})
         
         if not user:
             # Crear nuevo usuario desde Facebook
             user = User(
                 email=user_info["email"],
                 username=user_info["email"].split("@")[0],
-                hashed_password=get_password_hash(f"oauth_facebook_{user_info['id']}"),
+                hashed_password=await asyncio.to_thread(get_password_hash, f"oauth_facebook_{user_info['id']}"),
                 full_name=user_info.get("name"),
                 oauth_provider="facebook",
                 oauth_id=user_info["id"],
@@ -476,8 +632,8 @@ async def oauth_facebook_callback(
                 is_superuser=False
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
             logger.info(f"New user created via Facebook OAuth: {user.email}")
         
         # Crear tokens
@@ -496,6 +652,8 @@ async def oauth_facebook_callback(
             url=f"{redirect_url}?token={access_token}&refresh_token={refresh_token}"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Facebook OAuth error: {str(e)}")
         raise HTTPException(
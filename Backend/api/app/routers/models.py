@@ -2,15 +2,26 @@
 API Router para generación de modelos con LLM
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from sqlalchemy import Text, cast, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from pydantic import BaseModel, Field
-from typing import Optional, Dict
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Optional, Dict, Tuple
 import logging
 
-from app.database import get_db
+import msgspec
+import orjson
+
+from app.database import get_async_db
 from app.models import User, Model
 # from app.routers.auth import get_current_user  # TODO: Implementar auth
+from app.routers.auth import UserDTO
+from app.routers.websocket import receive_fast, send_fast
 from app.services.llm_service import get_llm_service
 
 logger = logging.getLogger(__name__)
@@ -19,10 +30,19 @@ logger = logging.getLogger(__name__)
 # ========================================
 # TEMPORAL: Mock auth para pruebas
 # ========================================
-async def get_current_user(db: Session = Depends(get_db)) -> User:
+# El usuario de prueba se busca (o crea) una vez por proceso
+_test_user: Optional[UserDTO] = None
+
+
+async def get_current_user(db: AsyncSession = Depends(get_async_db)) -> UserDTO:
     """TEMPORAL: Retorna usuario mock para pruebas sin auth"""
+    global _test_user
+    
+    if _test_user is not None:
+        return _test_user
+    
     # Buscar o crear usuario de prueba
-    user = db.query(User).filter(User.email == "test@twinsec.com").first()
+    user = await db.scalar(select(User).where(User.email == "test@twinsec.com"))
     if not user:
         user = User(
             username="test_user",
@@ -31,9 +51,18 @@ async def get_current_user(db: Session = Depends(get_db)) -> User:
             full_name="Test User"
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
-    return user
+        await db.commit()
+        await db.refresh(user)
+    
+    _test_user = UserDTO(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        is_superuser=user.is_superuser
+    )
+    return _test_user
 
 router = APIRouter(
     prefix="/models",
@@ -91,7 +120,49 @@ class ModelListResponse(BaseModel):
     """Response para listado de modelos"""
     success: bool
     models: list
-    total: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+def _encode_cursor(created_at: datetime, model_id: int) -> str:
+    """Cursor opaco con la posición (created_at, id) de la última fila."""
+    raw = f"{created_at.isoformat()}|{model_id}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inversa de _encode_cursor; 400 si el cursor no es válido."""
+    try:
+        created_at, model_id = urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(model_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+async def _save_model(db: AsyncSession, request: ModelGenerateRequest, result: Dict, owner_id: int) -> Model:
+    """Guarda en BD el modelo generado por el LLM."""
+    model = Model(
+        name=f"{request.model_type}_{result['llm_request_id']}",
+        description=request.prompt[:200],  # Truncar descripción
+        model_type=request.model_type,
+        version="1.0",
+        content=result["model"],  # Corregido: content, no json_content
+        llm_prompt=request.prompt,
+        llm_provider=result["metadata"].get("provider"),
+        llm_model=result["metadata"].get("model"),
+        owner_id=owner_id  # Corregido: owner_id, no created_by
+    )
+    
+    # El INSERT trae el id con RETURNING; sin refresh (expire_on_commit=False)
+    db.add(model)
+    await db.commit()
+    
+    logger.info(f"✅ Modelo guardado en BD (ID: {model.id})")
+    
+    return model
 
 
 # ========================================
@@ -101,8 +172,8 @@ class ModelListResponse(BaseModel):
 @router.post("/generate", response_model=ModelGenerateResponse)
 async def generate_model(
     request: ModelGenerateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Genera un modelo OT completo usando LLM + RAG.
@@ -144,23 +215,7 @@ async def generate_model(
         )
         
         # Guardar modelo en BD
-        model = Model(
-            name=f"{request.model_type}_{result['llm_request_id']}",
-            description=request.prompt[:200],  # Truncar descripción
-            model_type=request.model_type,
-            version="1.0",
-            content=result["model"],  # Corregido: content, no json_content
-            llm_prompt=request.prompt,
-            llm_provider=result["metadata"].get("provider"),
-            llm_model=result["metadata"].get("model"),
-            owner_id=current_user.id  # Corregido: owner_id, no created_by
-        )
-        
-        db.add(model)
-        db.commit()
-        db.refresh(model)
-        
-        logger.info(f"✅ Modelo guardado en BD (ID: {model.id})")
+        model = await _save_model(db, request, result, current_user.id)
         
         return ModelGenerateResponse(
             success=True,
@@ -178,58 +233,169 @@ async def generate_model(
         )
 
 
+@router.websocket("/ws/generate")
+async def generate_model_websocket(
+    websocket: WebSocket,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
+):
+    """
+    Genera un modelo como POST /generate, emitiendo el texto del LLM a medida que llega.
+    
+    El cliente envía un único mensaje con el mismo body que /generate:
+        {"prompt": "...", "model_type": "tank", "use_rag": true}
+    
+    Recibe:
+        {"delta": "{\"metadata\": {"}            (uno por fragmento)
+        {"done": true, "success": true, "model": {...}, "model_id": 123,
+         "llm_request_id": 456, "metadata": {...}}
+    o, si falla:
+        {"done": true, "success": false, "error": "..."}
+    """
+    await websocket.accept()
+    
+    try:
+        request = ModelGenerateRequest.model_validate(await receive_fast(websocket))
+    except (ValidationError, ValueError, msgspec.DecodeError) as e:
+        await send_fast(websocket, {"done": True, "success": False, "error": f"Request inválido: {str(e)}"})
+        await websocket.close(code=1003)
+        return
+    except WebSocketDisconnect:
+        return
+    
+    try:
+        logger.info(f"Generando modelo '{request.model_type}' (WebSocket) para usuario {current_user.id}")
+        
+        result = None
+        async for event in get_llm_service().generate_model_stream(
+            user_prompt=request.prompt,
+            model_type=request.model_type,
+            user_id=current_user.id,
+            db=db,
+            use_rag=request.use_rag
+        ):
+            if "delta" in event:
+                await send_fast(websocket, event)
+            else:
+                result = event["result"]
+        
+        model = await _save_model(db, request, result, current_user.id)
+        
+        await send_fast(websocket, ModelGenerateResponse(
+            success=True,
+            model=result["model"],
+            model_id=model.id,
+            llm_request_id=result["llm_request_id"],
+            metadata=result["metadata"]
+        ).model_dump() | {"done": True})
+        await websocket.close()
+    
+    except WebSocketDisconnect:
+        logger.info("Cliente desconectado durante la generación del modelo")
+    
+    except Exception as e:
+        logger.error(f"❌ Error al generar modelo: {str(e)}")
+        await send_fast(websocket, {"done": True, "success": False, "error": f"Error al generar modelo: {str(e)}"})
+        await websocket.close(code=1011)
+
+
 @router.get("/", response_model=ModelListResponse)
 async def list_models(
-    skip: int = 0,
-    limit: int = 50,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     model_type: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
-    Lista los modelos del usuario actual.
+    Lista los modelos del usuario actual (más recientes primero).
     
     **Filtros:**
     - `model_type`: Filtrar por tipo (tank, microgrid, hvac, etc.)
-    - `skip`, `limit`: Paginación
+    - `cursor`, `limit`: Paginación keyset; pasar el `next_cursor` de la
+      respuesta anterior para obtener la siguiente página
+    - `with_total`: Incluir el total (requiere un COUNT adicional)
     """
-    query = db.query(Model).filter(Model.owner_id == current_user.id)
-    
+    # Página keyset con una fila extra (solo indica que hay otra página);
+    # solo las columnas del listado (content puede pesar cientos de KB por fila)
+    filters = [Model.owner_id == current_user.id]
     if model_type:
-        query = query.filter(Model.model_type == model_type)
+        filters.append(Model.model_type == model_type)
+    
+    total = await db.scalar(select(func.count(Model.id)).where(*filters)) if with_total else None
+    
+    if cursor:
+        filters.append(tuple_(Model.created_at, Model.id) < _decode_cursor(cursor))
+    
+    page = (
+        select(
+            Model.id, Model.name, Model.description, Model.model_type, Model.version, Model.created_at,
+            func.row_number().over(order_by=(Model.created_at.desc(), Model.id.desc())).label("rn")
+        )
+        .where(*filters)
+        .order_by(Model.created_at.desc(), Model.id.desc())
+        .limit(limit + 1)
+        .subquery()
+    )
+    in_page = page.c.rn <= limit
+    
+    # Postgres arma el array JSON de la página: sin instanciar Model ni dicts por fila.
+    # El cast a text evita que el driver lo decodifique.
+    row = (await db.execute(
+        select(
+            func.coalesce(
+                cast(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object(
+                                literal("id"), page.c.id,
+                                literal("name"), page.c.name,
+                                literal("description"), page.c.description,
+                                literal("model_type"), page.c.model_type,
+                                literal("version"), page.c.version,
+                                literal("created_at"), page.c.created_at
+                            ),
+                            page.c.rn
+                        )
+                    ).filter(in_page),
+                    Text
+                ),
+                "[]"
+            ),
+            func.count(),
+            func.max(page.c.created_at).filter(page.c.rn == limit),
+            func.max(page.c.id).filter(page.c.rn == limit)
+        )
+    )).one()
+    models_json, fetched, last_created_at, last_id = row
     
-    total = query.count()
-    models = query.offset(skip).limit(limit).all()
+    next_cursor = _encode_cursor(last_created_at, last_id) if fetched > limit else None
     
-    return ModelListResponse(
-        success=True,
-        models=[{
-            "id": m.id,
-            "name": m.name,
-            "description": m.description,
-            "model_type": m.model_type,
-            "version": m.version,
-            "created_at": m.created_at.isoformat()
-        } for m in models],
-        total=total
+    return Response(
+        content=orjson.dumps({
+            "success": True,
+            "models": orjson.Fragment(models_json),
+            "next_cursor": next_cursor,
+            "total": total
+        }),
+        media_type="application/json"
     )
 
 
 @router.get("/{model_id}")
 async def get_model(
     model_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Obtiene un modelo por ID.
     """
-    model = db.query(Model).filter(
-        Model.id == model_id,
-        Model.owner_id == current_user.id
-    ).first()
+    model = await db.get(Model, model_id, options=[raiseload("*")])
     
-    if not model:
+    # 404 también si es de otro usuario (no se revela que existe)
+    if not model or model.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Modelo no encontrado"
@@ -244,7 +410,7 @@ async def get_model(
             "model_type": model.model_type,
             "version": model.version,
             "content": model.content,  # Corregido: content, no json_content
-            "created_at": model.created_at.isoformat()
+            "created_at": model.created_at
         }
     }
 
@@ -252,25 +418,22 @@ async def get_model(
 @router.delete("/{model_id}")
 async def delete_model(
     model_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Elimina un modelo.
     """
-    model = db.query(Model).filter(
-        Model.id == model_id,
-        Model.owner_id == current_user.id
-    ).first()
+    model = await db.get(Model, model_id)
     
-    if not model:
+    if not model or model.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Modelo no encontrado"
         )
     
-    db.delete(model)
-    db.commit()
+    await db.delete(model)
+    await db.commit()
     
     logger.info(f"Modelo {model_id} eliminado por usuario {current_user.id}")
     
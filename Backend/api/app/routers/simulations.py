@@ -4,21 +4,39 @@ API Router para gestión de simulaciones
 Endpoints para iniciar, monitorear y obtener resultados de simulaciones OT.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, List, Any
-from datetime import datetime
+from typing import Optional, Dict, List, Any, Tuple
+from datetime import datetime, timezone
 import logging
 import asyncio
 import json
 
-from app.database import get_db
-from app.models import User, Model, SimulationRun
+from app.database import get_async_db
+from app.models import Model, SimulationRun
+from app.routers.auth import UserDTO
 from app.routers.models import get_current_user  # Mock auth temporal
+from app.routers.websocket import (
+    encode_frame,
+    publish_telemetry,
+    send_frame,
+    subscribe_run,
+    unsubscribe_run,
+    wants_msgpack,
+)
+from app.schemas.telemetry import TelemetryFrame, TelemetrySample
 
 logger = logging.getLogger(__name__)
 
+# Telemetría: muestras cada 20 ms agrupadas en frames de hasta 5 muestras / 100 ms
+TELEMETRY_SAMPLE_DT = 0.02
+TELEMETRY_BATCH_SIZE = 5
+TELEMETRY_FLUSH_INTERVAL_S = 0.1
+
+# Productor de telemetría de ejemplo por run (uno para todas sus conexiones)
+_demo_producers: Dict[int, asyncio.Task] = {}
+
 router = APIRouter(
     prefix="/simulations",
     tags=["simulations"]
@@ -75,6 +93,14 @@ class SimulationStatusResponse(BaseModel):
     error_message: Optional[str] = None
 
 
+async def _launch_simulation(run_id: int) -> None:
+    """
+    Arranca el motor de simulación para un run ya creado (corre después de responder).
+    TODO: Instanciar engine.core.Simulator con el modelo y ejecutarlo.
+    """
+    logger.info(f"Simulación {run_id} encolada para ejecución")
+
+
 # ========================================
 # ENDPOINTS
 # ========================================
@@ -82,8 +108,9 @@ class SimulationStatusResponse(BaseModel):
 @router.post("/start", response_model=SimulationStatusResponse)
 async def start_simulation(
     request: SimulationStartRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Inicia una nueva simulación con el modelo especificado.
@@ -93,7 +120,7 @@ async def start_simulation(
     """
     try:
         # Verificar que el modelo existe
-        model = db.query(Model).filter(Model.id == request.model_id).first()
+        model = await db.get(Model, request.model_id)
         
         if not model:
             raise HTTPException(
@@ -108,30 +135,26 @@ async def start_simulation(
                 detail="No tienes permisos para simular este modelo"
             )
         
-        # Crear SimulationRun
-        import uuid
+        # Crear SimulationRun (ya como "running": un solo commit)
         run = SimulationRun(
-            run_id=str(uuid.uuid4()),
-            name=f"Sim-{model.name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}",
+            name=f"Sim-{model.name}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}",
             model_id=request.model_id,
             user_id=current_user.id,
-            status="pending",
+            status="running",
             duration=request.duration,
             time_step=request.time_step,
-            start_time=datetime.utcnow(),
+            start_time=datetime.now(timezone.utc),
             progress=0.0
         )
         
+        # El INSERT trae el id con RETURNING; sin refresh (expire_on_commit=False)
         db.add(run)
-        db.commit()
-        db.refresh(run)
+        await db.commit()
         
         logger.info(f"✅ SimulationRun creado: {run.id} (run_id: {run.run_id})")
         
-        # TODO: Iniciar simulación en background con motor
-        # Por ahora solo marcamos como "running" para testing
-        run.status = "running"
-        db.commit()
+        # El motor arranca después de enviar la respuesta
+        background_tasks.add_task(_launch_simulation, run.id)
         
         return SimulationStatusResponse(
             success=True,
@@ -155,13 +178,13 @@ async def start_simulation(
 @router.get("/{run_id}", response_model=SimulationStatusResponse)
 async def get_simulation_status(
     run_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Obtiene el estado actual de una simulación.
     """
-    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    run = await db.get(SimulationRun, run_id)
     
     if not run:
         raise HTTPException(
@@ -190,13 +213,13 @@ async def get_simulation_status(
 @router.post("/{run_id}/stop")
 async def stop_simulation(
     run_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Detiene una simulación en ejecución.
     """
-    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    run = await db.get(SimulationRun, run_id)
     
     if not run:
         raise HTTPException(
@@ -218,8 +241,8 @@ async def stop_simulation(
     
     # TODO: Detener simulador
     run.status = "stopped"
-    run.end_time = datetime.utcnow()
-    db.commit()
+    run.end_time = datetime.now(timezone.utc)
+    await db.commit()
     
     logger.info(f"Simulación {run_id} detenida por usuario {current_user.id}")
     
@@ -229,15 +252,15 @@ async def stop_simulation(
 @router.get("/{run_id}/results")
 async def get_simulation_results(
     run_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserDTO = Depends(get_current_user)
 ):
     """
     Obtiene los resultados de una simulación completada.
     
     Retorna series temporales de todas las señales, estados de ataques, etc.
     """
-    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    run = await db.get(SimulationRun, run_id)
     
     if not run:
         raise HTTPException(
@@ -270,47 +293,98 @@ async def get_simulation_results(
     }
 
 
+async def _demo_telemetry(run_id: int) -> None:
+    """
+    Publica telemetría de ejemplo en las colas del run (10 s de simulación).
+    TODO: Reemplazar por el simulador real, que publica cada step.
+    """
+    step = 0
+    t = 0.0
+    while t < 10.0:
+        publish_telemetry(run_id, TelemetrySample(
+            timestamp=t,
+            signals={
+                "tank.level": 5.0 + (t * 0.1),
+                "inlet_valve.flow": 0.5
+            }
+        ))
+        await asyncio.sleep(TELEMETRY_SAMPLE_DT)
+        
+        step += 1
+        t = step * TELEMETRY_SAMPLE_DT
+    
+    publish_telemetry(run_id, None)
+
+
+async def _next_batch(queue: asyncio.Queue) -> Tuple[List[TelemetrySample], bool]:
+    """
+    Espera el próximo step y junta los que lleguen en TELEMETRY_FLUSH_INTERVAL_S.
+    
+    Returns:
+        (muestras del frame, True si la simulación terminó)
+    """
+    loop = asyncio.get_running_loop()
+    samples: List[TelemetrySample] = []
+    
+    item = await queue.get()
+    deadline = loop.time() + TELEMETRY_FLUSH_INTERVAL_S
+    
+    while item is not None:
+        samples.append(item)
+        timeout = deadline - loop.time()
+        if len(samples) >= TELEMETRY_BATCH_SIZE or timeout <= 0:
+            return samples, False
+        try:
+            item = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return samples, False
+    
+    return samples, True
+
+
 @router.websocket("/ws/{run_id}")
 async def simulation_websocket(
     websocket: WebSocket,
-    run_id: int,
-    db: Session = Depends(get_db)
+    run_id: int
 ):
     """
     WebSocket para streaming en tiempo real de telemetría de simulación.
     
-    El cliente recibe actualizaciones cada step de simulación con:
-    - Estado actual de todas las señales
-    - Ataques activos
-    - Alertas del IDS
+    Cada conexión tiene su propia cola, donde el productor del run publica
+    todos los steps (sin polling), y cada frame agrupa hasta
+    TELEMETRY_BATCH_SIZE de ellos:
+        {"status": "running", "samples": [{"timestamp", "signals", "attacks"}, ...]}
+    
+    con el estado de las señales y los ataques activos de cada step. Los
+    frames van en JSON o, con `?format=msgpack`, en MessagePack binario.
     """
+    binary = wants_msgpack(websocket)
     await websocket.accept()
     logger.info(f"WebSocket conectado para simulación {run_id}")
     
+    queue = subscribe_run(run_id)
+    # TODO: Conectar con el simulador real; por ahora datos de ejemplo
+    producer = _demo_producers.get(run_id)
+    if producer is None or producer.done():
+        _demo_producers[run_id] = asyncio.create_task(_demo_telemetry(run_id))
+    
     try:
-        # TODO: Conectar con el simulador real
-        # Por ahora enviamos datos de ejemplo
-        
-        t = 0.0
-        while t < 10.0:  # Simulación de ejemplo de 10 segundos
-            data = {
-                "timestamp": t,
-                "signals": {
-                    "tank.level": 5.0 + (t * 0.1),
-                    "inlet_valve.flow": 0.5
-                },
-                "attacks": [],
-                "status": "running"
-            }
-            
-            await websocket.send_json(data)
-            await asyncio.sleep(0.1)  # 10 Hz
-            t += 0.1
+        finished = False
+        while not finished:
+            samples, finished = await _next_batch(queue)
+            if samples:
+                await send_frame(websocket, encode_frame(TelemetryFrame("running", samples), binary))
         
-        await websocket.send_json({"status": "completed"})
+        await send_frame(websocket, encode_frame(TelemetryFrame("completed"), binary))
         
     except WebSocketDisconnect:
         logger.info(f"WebSocket desconectado para simulación {run_id}")
     except Exception as e:
         logger.error(f"Error en WebSocket: {str(e)}")
         await websocket.close()
+    finally:
+        # El productor se detiene con la última conexión del run
+        if unsubscribe_run(run_id, queue):
+            producer = _demo_producers.pop(run_id, None)
+            if producer is not None:
+                producer.cancel()
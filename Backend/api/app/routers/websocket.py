@@ -3,6 +3,13 @@ WebSocket Router - Telemetría en tiempo real
 
 Endpoints:
     - ws/runs/{run_id}/telemetry: Telemetría de simulación en tiempo real
+
+Los clientes reciben JSON (texto) por defecto; con `?format=msgpack` reciben
+frames binarios MessagePack (más chicos y más baratos de codificar).
+
+Con REDIS_URL configurado, los broadcasts se publican en el canal Redis
+`run:{run_id}` y cada worker reenvía a sus propios clientes, así un
+publicador en un worker llega a suscriptores de cualquier otro.
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
@@ -12,7 +19,10 @@ import logging
 import json
 import sys
 from pathlib import Path
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Optional, Union
+
+import msgspec
+from pydantic import ValidationError
 
 # Agregar el directorio Backend al path para importar engine
 # Path actual: Backend/api/app/routers/websocket.py
@@ -20,8 +30,10 @@ from typing import Dict, Any
 backend_path = Path(__file__).parent.parent.parent.parent
 sys.path.insert(0, str(backend_path))
 
+from ..config import get_settings
 from ..database import get_db
 from ..models import SimulationRun
+from ..schemas.simulation import SIM_COMMAND_ADAPTER, CommandType
 
 try:
     from engine.core.simulator import Simulator
@@ -31,24 +43,220 @@ except ImportError:
         def __init__(self, *args, **kwargs):
             pass
 
+if TYPE_CHECKING:
+    import redis.asyncio
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
+def _enc_hook(obj: Any) -> Any:
+    """Tipos extra para los encoders: escalares y arrays de NumPy del simulador."""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise NotImplementedError(f"Tipo no serializable: {type(obj)}")
+
+
+_json_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+_json_decoder = msgspec.json.Decoder()
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_enc_hook)
+_msgpack_decoder = msgspec.msgpack.Decoder()
+
+# Canales Redis de telemetría: run:{run_id}
+_RUN_CHANNEL_PREFIX = "run:"
+
+# Espera entre reintentos de la suscripción a Redis (backoff exponencial)
+PUBSUB_RETRY_MIN_S = 0.5
+PUBSUB_RETRY_MAX_S = 30.0
+
+
+def wants_msgpack(websocket: WebSocket) -> bool:
+    """True si el cliente pidió frames binarios (`?format=msgpack`)."""
+    return websocket.query_params.get("format") == "msgpack"
+
+
+def encode_frame(data: Any, binary: bool) -> Union[bytes, str]:
+    """
+    Codifica un frame: MessagePack (bytes) o JSON (texto).
+    
+    `data` puede ser un dict o un msgspec.Struct (ej. TelemetryFrame).
+    """
+    if binary:
+        return _msgpack_encoder.encode(data)
+    return _json_encoder.encode(data).decode()
+
+
+async def send_frame(websocket: WebSocket, frame: Union[bytes, str]) -> None:
+    """Envía un frame ya codificado con encode_frame."""
+    if isinstance(frame, bytes):
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def send_fast(websocket: WebSocket, data: Any) -> None:
+    """Reemplazo de websocket.send_json (json.dumps) con el encoder de msgspec."""
+    await websocket.send_text(_json_encoder.encode(data).decode())
+
+
+async def receive_fast(websocket: WebSocket) -> Any:
+    """Reemplazo de websocket.receive_json con el decoder de msgspec."""
+    return _json_decoder.decode(await websocket.receive_text())
+
+
+def _put_drop_oldest(queue: asyncio.Queue, item: Any) -> None:
+    """put_nowait que, con la cola llena, descarta el elemento más viejo."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+# Colas de telemetría por run: una por conexión suscrita; el simulador
+# publica cada step en todas (fan-out) y cada WebSocket espera la suya
+RUN_QUEUE_MAX_SIZE = 64
+
+run_queues: Dict[int, set[asyncio.Queue]] = {}
+
+
+def subscribe_run(run_id: int) -> asyncio.Queue:
+    """Crea y registra la cola de telemetría de una conexión al run."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=RUN_QUEUE_MAX_SIZE)
+    run_queues.setdefault(run_id, set()).add(queue)
+    return queue
+
+
+def publish_telemetry(run_id: int, item: Any) -> None:
+    """
+    Encola un step de telemetría en cada conexión del run sin bloquear al simulador.
+    
+    Si la cola de una conexión está llena (cliente lento) se descarta su
+    step más viejo. `None` marca el fin de la simulación.
+    """
+    for queue in run_queues.get(run_id, ()):
+        _put_drop_oldest(queue, item)
+
+
+def unsubscribe_run(run_id: int, queue: asyncio.Queue) -> bool:
+    """
+    Quita la cola de una conexión que se cerró.
+    
+    Returns:
+        True si el run quedó sin conexiones
+    """
+    queues = run_queues.get(run_id)
+    if queues is not None:
+        queues.discard(queue)
+        if queues:
+            return False
+        del run_queues[run_id]
+    return True
+
+
+# Frames pendientes por conexión del ConnectionManager
+OUTBOX_MAX_SIZE = 32
+
 
 class ConnectionManager:
     """
     Gestor de conexiones WebSocket.
     
-    Mantiene un registro de conexiones activas y permite broadcast.
+    Mantiene un registro de las conexiones activas de este worker y permite
+    broadcast. Con Redis, send_to_run publica en el canal del run y un
+    listener por worker reenvía cada mensaje a las conexiones locales.
+    
+    Cada conexión tiene su cola de salida y una task que escribe en el
+    socket: el broadcast solo encola, así un cliente lento no frena al
+    simulador (pierde los frames más viejos).
     """
     
     def __init__(self):
         self.active_connections: Dict[int, list[WebSocket]] = {}
+        # Conexiones que reciben MessagePack en lugar de JSON
+        self.binary_connections: set[WebSocket] = set()
+        # Cola de salida y task escritora de cada conexión
+        self._outboxes: Dict[WebSocket, asyncio.Queue] = {}
+        self._writers: Dict[WebSocket, asyncio.Task] = {}
+        
+        self._redis: Optional["redis.asyncio.Redis"] = None
+        self._listener: Optional[asyncio.Task] = None
+        # True mientras publish falla (para avisar una sola vez)
+        self._publish_failing = False
+    
+    async def start(self, redis_url: Optional[str] = None) -> None:
+        """Conecta a Redis y lanza el listener (sin URL, broadcast solo en proceso)."""
+        if not redis_url or self._listener is not None:
+            return
+        
+        import redis.asyncio
+        
+        self._redis = redis.asyncio.from_url(redis_url)
+        self._listener = asyncio.create_task(self._listen(), name="telemetry-pubsub")
+        logger.info("✅ Broadcast de telemetría vía Redis pub/sub")
+    
+    async def stop(self) -> None:
+        """Detiene el listener y cierra la conexión a Redis."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"❌ Listener de Redis terminó con error: {e}")
+            self._listener = None
+        
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+    
+    async def _listen(self) -> None:
+        """
+        Reenvía a las conexiones locales lo publicado en run:* por cualquier worker.
+        
+        Si Redis no está disponible o la conexión se cae, se vuelve a
+        suscribir con backoff exponencial (PUBSUB_RETRY_MIN_S a
+        PUBSUB_RETRY_MAX_S) en lugar de terminar.
+        """
+        delay = PUBSUB_RETRY_MIN_S
+        
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{_RUN_CHANNEL_PREFIX}*")
+                if delay > PUBSUB_RETRY_MIN_S:
+                    logger.info("✅ Suscripción a Redis pub/sub restablecida")
+                delay = PUBSUB_RETRY_MIN_S
+                
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    
+                    run_id = int(message["channel"][len(_RUN_CHANNEL_PREFIX):])
+                    if run_id in self.active_connections:
+                        self._send_local(run_id, _msgpack_decoder.decode(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Redis pub/sub no disponible: {e}; reintentando en {delay:.1f}s")
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PUBSUB_RETRY_MAX_S)
     
-    async def connect(self, websocket: WebSocket, run_id: int):
+    async def connect(self, websocket: WebSocket, run_id: int, binary: bool = False):
         """Acepta una nueva conexión."""
         await websocket.accept()
         
+        if binary:
+            self.binary_connections.add(websocket)
+        
+        self._outboxes[websocket] = asyncio.Queue(maxsize=OUTBOX_MAX_SIZE)
+        self._writers[websocket] = asyncio.create_task(self._write(websocket, run_id))
+        
         if run_id not in self.active_connections:
             self.active_connections[run_id] = []
         
@@ -57,8 +265,16 @@ class ConnectionManager:
     
     def disconnect(self, websocket: WebSocket, run_id: int):
         """Remueve una conexión."""
-        if run_id in self.active_connections:
-            self.active_connections[run_id].remove(websocket)
+        self.binary_connections.discard(websocket)
+        self._outboxes.pop(websocket, None)
+        
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+        
+        connections = self.active_connections.get(run_id)
+        if connections is not None and websocket in connections:
+            connections.remove(websocket)
             
             if len(self.active_connections[run_id]) == 0:
                 del self.active_connections[run_id]
@@ -66,22 +282,58 @@ class ConnectionManager:
         logger.info(f"WebSocket desconectado: run_id={run_id}")
     
     async def send_to_run(self, run_id: int, data: dict):
-        """Envía datos a todos los clientes conectados a un run."""
+        """
+        Envía datos a todos los clientes conectados a un run (en cualquier worker).
+        
+        Si publicar en Redis falla, se entrega al menos a los clientes de
+        este worker.
+        """
+        if self._redis is not None:
+            try:
+                await self._redis.publish(f"{_RUN_CHANNEL_PREFIX}{run_id}", _msgpack_encoder.encode(data))
+                if self._publish_failing:
+                    self._publish_failing = False
+                    logger.info("✅ Publicación en Redis restablecida")
+                return
+            except Exception as e:
+                if not self._publish_failing:
+                    self._publish_failing = True
+                    logger.warning(f"⚠️ No se pudo publicar en Redis ({e}); entregando solo a clientes locales")
+        
+        self._send_local(run_id, data)
+    
+    def _send_local(self, run_id: int, data: Any):
+        """
+        Encola datos para los clientes de un run conectados a este worker.
+        
+        No espera a ningún socket: cada task escritora envía a su ritmo.
+        """
         if run_id not in self.active_connections:
             return
         
-        dead_connections = []
-        
+        # Cada formato se codifica una sola vez por broadcast
+        frames: Dict[bool, Union[bytes, str]] = {}
         for websocket in self.active_connections[run_id]:
-            try:
-                await websocket.send_json(data)
-            except Exception as e:
-                logger.error(f"Error enviando a WebSocket: {str(e)}")
-                dead_connections.append(websocket)
+            binary = websocket in self.binary_connections
+            if binary not in frames:
+                frames[binary] = encode_frame(data, binary)
+            
+            outbox = self._outboxes.get(websocket)
+            if outbox is not None:
+                _put_drop_oldest(outbox, frames[binary])
+    
+    async def _write(self, websocket: WebSocket, run_id: int):
+        """Task escritora de una conexión: vacía su cola de salida en el socket."""
+        outbox = self._outboxes[websocket]
         
-        # Limpiar conexiones muertas
-        for ws in dead_connections:
-            self.disconnect(ws, run_id)
+        try:
+            while True:
+                await send_frame(websocket, await outbox.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error enviando a WebSocket: {str(e)}")
+            self.disconnect(websocket, run_id)
 
 
 manager = ConnectionManager()
@@ -97,7 +349,7 @@ async def telemetry_websocket(
     WebSocket para telemetría en tiempo real.
     
     El frontend se conecta a:
-        ws://localhost:8001/ws/runs/{run_id}/telemetry
+        ws://localhost:8001/ws/runs/{run_id}/telemetry[?format=msgpack]
     
     Recibe:
         {
@@ -140,46 +392,52 @@ async def telemetry_websocket(
         }
     """
     # Verificar que existe el run
-    run = db.query(SimulationRun).filter(SimulationRun.id == run_id).first()
+    run = db.get(SimulationRun, run_id)
     if not run:
         await websocket.close(code=4004, reason="Run not found")
         return
     
     # Conectar WebSocket
-    await manager.connect(websocket, run_id)
+    await manager.connect(websocket, run_id, binary=wants_msgpack(websocket))
     
     try:
         # Si la simulación ya está corriendo, solo escuchar comandos
         # Si no, podríamos iniciarla aquí
         
         while True:
-            # Recibir comandos del cliente
-            data = await websocket.receive_json()
+            # Recibir comandos del cliente (JSON crudo -> SimulationCommand, sin json.loads)
+            try:
+                data = SIM_COMMAND_ADAPTER.validate_json(await websocket.receive_text())
+            except ValidationError as e:
+                logger.warning(f"Comando inválido para run_id={run_id}: {e.error_count()} errores")
+                continue
             
-            command = data.get("command")
+            command = data.command
             
-            if command == "pause":
+            if command == CommandType.PAUSE:
                 # TODO: Pausar simulación
                 logger.info(f"Pausa solicitada para run_id={run_id}")
             
-            elif command == "resume":
+            elif command == CommandType.RESUME:
                 # TODO: Reanudar simulación
                 logger.info(f"Reanudación solicitada para run_id={run_id}")
             
-            elif command == "stop":
+            elif command == CommandType.STOP:
                 # TODO: Detener simulación
                 logger.info(f"Detención solicitada para run_id={run_id}")
                 break
             
             else:
-                logger.warning(f"Comando desconocido: {command}")
+                logger.warning(f"Comando no soportado: {command.value}")
     
     except WebSocketDisconnect:
-        manager.disconnect(websocket, run_id)
         logger.info(f"Cliente desconectado de run_id={run_id}")
     
     except Exception as e:
         logger.error(f"Error en WebSocket: {str(e)}", exc_info=True)
+    
+    finally:
+        # También tras "stop": libera la cola de salida y la task escritora
         manager.disconnect(websocket, run_id)
 
 
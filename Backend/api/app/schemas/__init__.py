@@ -29,6 +29,12 @@ from .simulation import (
     ErrorMessage,
 )
 
+# Telemetry streaming structs (msgspec)
+from .telemetry import (
+    TelemetrySample,
+    TelemetryFrame,
+)
+
 # Auth schemas
 from .auth import (
     UserBase,
@@ -77,6 +83,9 @@ __all__ = [
     "TelemetryMessage",
     "EventMessage",
     "ErrorMessage",
+    # Telemetry
+    "TelemetrySample",
+    "TelemetryFrame",
     # Auth
     "UserBase",
     "UserCreate",
@@ -7,6 +7,22 @@ from pydantic import BaseModel, EmailStr, Field, field_validator
 import re
 
 
+# Compiled once; length limits are enforced by the Field constraints
+_USERNAME_RE = re.compile(r"[A-Za-z0-9_-]+")
+_PASSWORD_RE = re.compile(r"(?=.*[a-z])(?=.*[A-Z])(?=.*\d)", re.DOTALL)
+
+
+def _check_password(v: str) -> str:
+    """Password complexity: one regex pass, per-rule message only on failure."""
+    if _PASSWORD_RE.match(v):
+        return v
+    if not re.search(r"[A-Z]", v):
+        raise ValueError("Password must contain at least one uppercase letter")
+    if not re.search(r"[a-z]", v):
+        raise ValueError("Password must contain at least one lowercase letter")
+    raise ValueError("Password must contain at least one digit")
+
+
 class UserBase(BaseModel):
     """Base user schema."""
     email: EmailStr
@@ -16,7 +32,7 @@ class UserBase(BaseModel):
     @field_validator('username')
     @classmethod
     def validate_username(cls, v: str) -> str:
-        if not re.match(r"^[a-zA-Z0-9_-]+$", v):
+        if not _USERNAME_RE.fullmatch(v):
             raise ValueError("Username must contain only alphanumeric characters, hyphens, and underscores")
         return v
 
@@ -28,15 +44,7 @@ class UserCreate(UserBase):
     @field_validator('password')
     @classmethod
     def validate_password(cls, v: str) -> str:
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters long")
-        if not any(c.isupper() for c in v):
-            raise ValueError("Password must contain at least one uppercase letter")
-        if not any(c.islower() for c in v):
-            raise ValueError("Password must contain at least one lowercase letter")
-        if not any(c.isdigit() for c in v):
-            raise ValueError("Password must contain at least one digit")
-        return v
+        return _check_password(v)
 
 
 class UserLogin(BaseModel):
@@ -79,15 +87,7 @@ class PasswordChange(BaseModel):
     @field_validator('new_password')
     @classmethod
     def validate_password(cls, v: str) -> str:
-        if len(v) < 8:
-            raise ValueError("Password must be at least 8 characters long")
-        if not any(c.isupper() for c in v):
-            raise ValueError("Password must contain at least one uppercase letter")
-        if not any(c.islower() for c in v):
-            raise ValueError("Password must contain at least one lowercase letter")
-        if not any(c.isdigit() for c in v):
-            raise ValueError("Password must contain at least one digit")
-        return v
+        return _check_password(v)
 
 
 class PasswordReset(BaseModel):
@@ -6,6 +6,8 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
 
+from app.core.cef import CEF_EXTENSION_ESCAPE, CEF_HEADER_ESCAPE
+
 
 class EventType(str, Enum):
     """Types of auditable events."""
@@ -107,24 +109,12 @@ class CEFLog(BaseModel):
 
     def to_cef_string(self) -> str:
         """Convert to CEF format string."""
-        # Build extension string
-        ext_parts = []
-        for key, value in self.extension.items():
-            ext_parts.append(f"{key}={value}")
-        extension_str = " ".join(ext_parts)
-        
-        # Build CEF string
-        cef_parts = [
-            f"CEF:{self.version}",
-            self.device_vendor,
-            self.device_product,
-            self.device_version,
-            self.signature_id,
-            self.name,
-            str(self.severity),
-            extension_str
-        ]
-        return "|".join(cef_parts)
+        return (
+            f"CEF:{self.version}|{self.device_vendor.translate(CEF_HEADER_ESCAPE)}|"
+            f"{self.device_product.translate(CEF_HEADER_ESCAPE)}|{self.device_version.translate(CEF_HEADER_ESCAPE)}|"
+            f"{self.signature_id.translate(CEF_HEADER_ESCAPE)}|{self.name.translate(CEF_HEADER_ESCAPE)}|{self.severity}|"
+            + " ".join(f"{key}={str(value).translate(CEF_EXTENSION_ESCAPE)}" for key, value in self.extension.items())
+        )
 
     class Config:
         json_schema_extra = {
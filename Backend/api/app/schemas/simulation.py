@@ -3,7 +3,7 @@ Pydantic schemas for simulation execution and real-time data.
 """
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from enum import Enum
 
 
@@ -117,3 +117,7 @@ class ErrorMessage(BaseModel):
     run_id: str
     error: str
     details: Optional[str] = None
+
+
+# Validator built once at import; validate_json parses raw frames without json.loads
+SIM_COMMAND_ADAPTER = TypeAdapter(SimulationCommand)
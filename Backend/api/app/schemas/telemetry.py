@@ -0,0 +1,22 @@
+"""
+msgspec structs for telemetry streamed over WebSocket.
+
+Internal streaming payloads skip Pydantic validation: msgspec encodes these
+structs straight to JSON or MessagePack. Public REST schemas stay in Pydantic.
+"""
+from typing import Any, Dict, List
+
+import msgspec
+
+
+class TelemetrySample(msgspec.Struct):
+    """One simulation step."""
+    timestamp: float
+    signals: Dict[str, float]
+    attacks: List[Dict[str, Any]] = []
+
+
+class TelemetryFrame(msgspec.Struct, omit_defaults=True):
+    """One WebSocket frame: a batch of simulation steps plus the run status."""
+    status: str
+    samples: List[TelemetrySample] = []
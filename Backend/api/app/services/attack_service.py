@@ -12,14 +12,26 @@ Tipos de ataques:
 5. Random Noise - Ruido aleatorio sobre la señal real
 """
 
+import heapq
 import logging
+from functools import lru_cache
+
 import numpy as np
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from enum import Enum
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
+# Generador compartido (PCG64) y tamaño del buffer de ruido pre-muestreado por ataque
+rng = np.random.default_rng()
+NOISE_BUFFER_SIZE = 65536
+
 
 class AttackType(str, Enum):
     """Tipos de ataques soportados."""
@@ -39,6 +51,66 @@ class AttackStatus(str, Enum):
     FAILED = "failed"
 
 
+# Reglas de validación por tipo: (nombre, parámetros requeridos, parámetros que deben ser lista no vacía)
+_PARAM_RULES: Dict[AttackType, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {
+    AttackType.DOS: ("DoS", ("target_signal",), ()),
+    AttackType.FALSE_DATA: ("False Data Injection", ("target_signal", "false_value"), ()),
+    AttackType.REPLAY: ("Replay Attack", ("target_signal", "replay_buffer"), ("replay_buffer",)),
+    AttackType.RAMP: ("Ramp Attack", ("target_signal", "rate"), ()),
+    AttackType.RANDOM_NOISE: ("Random Noise", ("target_signal", "noise_std"), ()),
+}
+
+# Prefijo de los arrays SoA de cada tipo en AttackService._soa
+_SOA_PREFIX: Dict[AttackType, str] = {
+    AttackType.DOS: "dos",
+    AttackType.FALSE_DATA: "fdi",
+    AttackType.REPLAY: "replay",
+    AttackType.RAMP: "ramp",
+    AttackType.RANDOM_NOISE: "noise",
+}
+
+
+# Kernels de apply_attacks_batch. Reciben los arrays ya filtrados por la
+# ventana temporal y escriben sobre `out` in-place. Con numba se compilan a
+# bucles nativos; sin numba se usa la versión NumPy equivalente.
+if njit is not None:
+    @njit(cache=True, parallel=False)
+    def _ramp_kernel(out, indices, rates, start_times, t):
+        for i in range(indices.shape[0]):
+            out[indices[i]] += rates[i] * (t - start_times[i])
+
+    @njit(cache=True, parallel=False)
+    def _replay_kernel(out, indices, buffers, buffer_lens, step):
+        for i in range(indices.shape[0]):
+            out[indices[i]] = buffers[i, step % buffer_lens[i]]
+
+    @njit(cache=True, parallel=False)
+    def _noise_kernel(out, indices, stds, noise_samples):
+        for i in range(indices.shape[0]):
+            out[indices[i]] += noise_samples[i] * stds[i]
+else:
+    def _ramp_kernel(out, indices, rates, start_times, t):
+        out[indices] += rates * (t - start_times)
+
+    def _replay_kernel(out, indices, buffers, buffer_lens, step):
+        out[indices] = buffers[np.arange(len(indices)), step % buffer_lens]
+
+    def _noise_kernel(out, indices, stds, noise_samples):
+        out[indices] += noise_samples * stds
+
+
+def _warmup_kernels() -> None:
+    """Compila los kernels con una llamada de 1 elemento (no-op sin numba)."""
+    if njit is None:
+        return
+    out = np.zeros(1, dtype=np.float64)
+    indices = np.zeros(1, dtype=np.int32)
+    values = np.zeros(1, dtype=np.float64)
+    _ramp_kernel(out, indices, values, values, 0.0)
+    _replay_kernel(out, indices, np.zeros((1, 1), dtype=np.float64), np.ones(1, dtype=np.int32), 0)
+    _noise_kernel(out, indices, values, values)
+
+
 class AttackService:
     """
     Servicio de inyección de ataques en simulaciones.
@@ -50,6 +122,21 @@ class AttackService:
     def __init__(self):
         """Inicializar servicio de ataques."""
         self.active_attacks: Dict[str, Dict] = {}
+        
+        # Layout de señales del vector de apply_attacks_batch y arrays SoA por
+        # tipo de ataque, reconstruidos cuando cambia _version
+        self._signal_index: Dict[str, int] = {}
+        self._version = 0
+        self._soa_version = -1
+        self._soa: Dict[str, np.ndarray] = {}
+        
+        # Agenda de ventanas: heaps (tiempo, attack_id) de inicios y fines
+        # pendientes y, por señal, las vistas de los ataques activos en _clock
+        self._start_heap: List[Tuple[float, str]] = []
+        self._end_heap: List[Tuple[float, str]] = []
+        self._active_now: Dict[str, List[Dict]] = {}
+        self._clock = -np.inf
+        _warmup_kernels()
         logger.info("✅ AttackService inicializado")
     
     def validate_attack_params(
@@ -67,47 +154,21 @@ class AttackService:
         Returns:
             (válido, mensaje_error)
         """
-        if attack_type == AttackType.DOS:
-            # DoS: solo necesita target_signal
-            if "target_signal" not in params:
-                return False, "DoS requiere 'target_signal'"
-            return True, None
-        
-        elif attack_type == AttackType.FALSE_DATA:
-            # False Data Injection: valor falso a inyectar
-            required = ["target_signal", "false_value"]
-            missing = [k for k in required if k not in params]
-            if missing:
-                return False, f"False Data Injection requiere: {', '.join(missing)}"
-            return True, None
-        
-        elif attack_type == AttackType.REPLAY:
-            # Replay: necesita buffer de valores grabados
-            required = ["target_signal", "replay_buffer"]
-            missing = [k for k in required if k not in params]
-            if missing:
-                return False, f"Replay Attack requiere: {', '.join(missing)}"
-            if not isinstance(params.get("replay_buffer"), list):
-                return False, "replay_buffer debe ser una lista"
-            return True, None
-        
-        elif attack_type == AttackType.RAMP:
-            # Ramp: incremento gradual
-            required = ["target_signal", "rate"]
-            missing = [k for k in required if k not in params]
-            if missing:
-                return False, f"Ramp Attack requiere: {', '.join(missing)}"
-            return True, None
-        
-        elif attack_type == AttackType.RANDOM_NOISE:
-            # Random Noise: ruido gaussiano
-            required = ["target_signal", "noise_std"]
-            missing = [k for k in required if k not in params]
-            if missing:
-                return False, f"Random Noise requiere: {', '.join(missing)}"
-            return True, None
-        
-        return False, f"Tipo de ataque no soportado: {attack_type}"
+        rule = _PARAM_RULES.get(attack_type)
+        if rule is None:
+            return False, f"Tipo de ataque no soportado: {attack_type}"
+        
+        label, required, list_params = rule
+        missing = [k for k in required if k not in params]
+        if missing:
+            return False, f"{label} requiere: {', '.join(missing)}"
+        
+        for key in list_params:
+            # Vacía no: el replay indexa con step % len(buffer)
+            if not isinstance(params[key], list) or not params[key]:
+                return False, f"{key} debe ser una lista no vacía"
+        
+        return True, None
     
     def apply_dos_attack(
         self,
@@ -127,7 +188,7 @@ class AttackService:
             Valor atacado (típicamente 0)
         """
         blocked_value = params.get("blocked_value", 0.0)
-        logger.debug(f"DoS: {signal_value} -> {blocked_value}")
+        logger.debug("DoS: %s -> %s", signal_value, blocked_value)
         return blocked_value
     
     def apply_false_data_injection(
@@ -148,7 +209,7 @@ class AttackService:
             Valor falso inyectado
         """
         false_value = params["false_value"]
-        logger.debug(f"False Data Injection: {signal_value} -> {false_value}")
+        logger.debug("False Data Injection: %s -> %s", signal_value, false_value)
         return false_value
     
     def apply_replay_attack(
@@ -176,7 +237,7 @@ class AttackService:
         index = current_step % len(replay_buffer)
         replayed_value = replay_buffer[index]
         
-        logger.debug(f"Replay Attack: {signal_value} -> {replayed_value} (step {current_step})")
+        logger.debug("Replay Attack: %s -> %s (step %s)", signal_value, replayed_value, current_step)
         return replayed_value
     
     def apply_ramp_attack(
@@ -202,7 +263,7 @@ class AttackService:
         offset = rate * elapsed_time
         attacked_value = signal_value + offset
         
-        logger.debug(f"Ramp Attack: {signal_value} -> {attacked_value} (offset={offset:.2f})")
+        logger.debug("Ramp Attack: %s -> %s (offset=%.2f)", signal_value, attacked_value, offset)
         return attacked_value
     
     def apply_random_noise(
@@ -213,7 +274,9 @@ class AttackService:
         """
         Aplica ruido aleatorio.
         
-        Añade ruido gaussiano al valor real.
+        Añade ruido gaussiano al valor real. Las muestras N(0, 1) salen del
+        buffer pre-muestreado del ataque (ver register_attack), que se
+        rellena in-place al agotarse.
         
         Args:
             signal_value: Valor original
@@ -223,10 +286,21 @@ class AttackService:
             Valor con ruido añadido
         """
         noise_std = params["noise_std"]
-        noise = np.random.normal(0, noise_std)
+        buf = params.get("_noise_buffer")
+        if buf is None:
+            sample = rng.standard_normal()
+        else:
+            idx = params["_noise_idx"]
+            if idx >= len(buf):
+                rng.standard_normal(dtype=np.float32, out=buf)
+                idx = 0
+            sample = buf[idx]
+            params["_noise_idx"] = idx + 1
+        
+        noise = float(sample) * noise_std
         attacked_value = signal_value + noise
         
-        logger.debug(f"Random Noise: {signal_value} -> {attacked_value} (noise={noise:.3f})")
+        logger.debug("Random Noise: %s -> %s (noise=%.3f)", signal_value, attacked_value, noise)
         return attacked_value
     
     def inject_attack(
@@ -275,13 +349,127 @@ class AttackService:
                 return self.apply_random_noise(signal_value, params)
             
             else:
-                logger.warning(f"Tipo de ataque no implementado: {attack_type}")
+                logger.warning("Tipo de ataque no implementado: %s", attack_type)
                 return signal_value
         
         except Exception as e:
-            logger.error(f"Error al inyectar ataque {attack_id}: {e}")
+            logger.error("Error al inyectar ataque %s: %s", attack_id, e)
             return signal_value
     
+    def set_signal_layout(self, signal_names: List[str]) -> None:
+        """
+        Fija el orden de las señales en el vector de apply_attacks_batch.
+        
+        Args:
+            signal_names: Nombres de señal; la posición es el índice en el vector
+        """
+        self._signal_index = {name: i for i, name in enumerate(signal_names)}
+        self._version += 1
+    
+    def _rebuild_soa(self) -> None:
+        """
+        Reconstruye los arrays SoA (índices de señal, ventana temporal y
+        parámetros por tipo de ataque) a partir de active_attacks.
+        
+        Los ataques sobre señales fuera del layout se ignoran.
+        """
+        groups: Dict[AttackType, List[Tuple[int, float, float, Dict[str, Any]]]] = {
+            attack_type: [] for attack_type in _PARAM_RULES
+        }
+        for attack in self.active_attacks.values():
+            index = self._signal_index.get(attack["target_signal"])
+            attack_type = AttackType(attack["type"])
+            if index is None or attack_type not in groups:
+                continue
+            start = attack["start_time"]
+            end = np.inf if attack["duration"] is None else start + attack["duration"]
+            groups[attack_type].append((index, start, end, attack["params"]))
+        
+        soa: Dict[str, np.ndarray] = {}
+        for attack_type, prefix in _SOA_PREFIX.items():
+            rows = groups[attack_type]
+            soa[f"{prefix}_indices"] = np.array([r[0] for r in rows], dtype=np.int32)
+            soa[f"{prefix}_start_times"] = np.array([r[1] for r in rows], dtype=np.float64)
+            soa[f"{prefix}_end_times"] = np.array([r[2] for r in rows], dtype=np.float64)
+        
+        soa["dos_values"] = np.array(
+            [r[3].get("blocked_value", 0.0) for r in groups[AttackType.DOS]], dtype=np.float64
+        )
+        soa["fdi_values"] = np.array(
+            [r[3]["false_value"] for r in groups[AttackType.FALSE_DATA]], dtype=np.float64
+        )
+        soa["ramp_rates"] = np.array(
+            [r[3]["rate"] for r in groups[AttackType.RAMP]], dtype=np.float64
+        )
+        soa["noise_stds"] = np.array(
+            [r[3]["noise_std"] for r in groups[AttackType.RANDOM_NOISE]], dtype=np.float64
+        )
+        
+        # Buffers de replay en una matriz (relleno con 0 hasta el más largo)
+        buffers = [r[3]["replay_buffer"] for r in groups[AttackType.REPLAY]]
+        lengths = np.array([len(b) for b in buffers], dtype=np.int32)
+        padded = np.zeros((len(buffers), int(lengths.max(initial=1))), dtype=np.float64)
+        for row, buffer in enumerate(buffers):
+            padded[row, :len(buffer)] = buffer
+        soa["replay_buffers"] = padded
+        soa["replay_lens"] = lengths
+        
+        self._soa = soa
+        self._soa_version = self._version
+    
+    def apply_attacks_batch(
+        self,
+        signal_values: np.ndarray,
+        step: int,
+        t: float
+    ) -> np.ndarray:
+        """
+        Aplica todos los ataques registrados a un vector de señales.
+        
+        Equivalente vectorizado de inject_attack: una operación NumPy por
+        tipo de ataque en lugar de una llamada por señal y ataque. Las
+        posiciones del vector siguen el orden de set_signal_layout.
+        
+        Args:
+            signal_values: Valores reales de las señales
+            step: Paso actual de simulación (índice del replay)
+            t: Tiempo actual de simulación
+        
+        Returns:
+            Nuevo vector con los ataques aplicados
+        """
+        if self._soa_version != self._version:
+            self._rebuild_soa()
+        soa = self._soa
+        out = np.array(signal_values, dtype=np.float64)
+        
+        def live(prefix: str) -> np.ndarray:
+            return (soa[f"{prefix}_start_times"] <= t) & (t <= soa[f"{prefix}_end_times"])
+        
+        mask = live("dos")
+        out[soa["dos_indices"][mask]] = soa["dos_values"][mask]
+        
+        mask = live("fdi")
+        out[soa["fdi_indices"][mask]] = soa["fdi_values"][mask]
+        
+        mask = live("ramp")
+        _ramp_kernel(
+            out, soa["ramp_indices"][mask], soa["ramp_rates"][mask],
+            soa["ramp_start_times"][mask], float(t)
+        )
+        
+        mask = live("noise")
+        stds = soa["noise_stds"][mask]
+        _noise_kernel(out, soa["noise_indices"][mask], stds, rng.standard_normal(len(stds)))
+        
+        mask = live("replay")
+        _replay_kernel(
+            out, soa["replay_indices"][mask], soa["replay_buffers"][mask],
+            soa["replay_lens"][mask], int(step)
+        )
+        
+        return out
+    
     def register_attack(
         self,
         attack_id: str,
@@ -302,6 +490,15 @@ class AttackService:
             duration: Duración del ataque (None = indefinido)
             params: Parámetros del ataque
         """
+        if attack_type == AttackType.RANDOM_NOISE:
+            # Copia para no mezclar el estado del buffer con los parámetros del caller
+            params = {
+                **params,
+                "_noise_buffer": rng.standard_normal(NOISE_BUFFER_SIZE, dtype=np.float32),
+                "_noise_idx": 0,
+            }
+        
+        replaced = attack_id in self.active_attacks
         self.active_attacks[attack_id] = {
             "type": attack_type,
             "target_signal": target_signal,
@@ -311,12 +508,68 @@ class AttackService:
             "status": AttackStatus.PENDING,
             "registered_at": datetime.utcnow()
         }
+        self._version += 1
+        
+        if replaced:
+            self._reset_schedule()
+        else:
+            heapq.heappush(self._start_heap, (start_time, attack_id))
+            if start_time <= self._clock:
+                self.advance_time(self._clock)
         
         logger.info(
-            f"✅ Ataque registrado: {attack_id} "
-            f"({attack_type} en '{target_signal}', t={start_time}s)"
+            "✅ Ataque registrado: %s (%s en '%s', t=%ss)",
+            attack_id, attack_type, target_signal, start_time
         )
     
+    def _reset_schedule(self) -> None:
+        """Reconstruye la agenda desde cero (todos los ataques vuelven a PENDING)."""
+        self._start_heap = [(a["start_time"], attack_id) for attack_id, a in self.active_attacks.items()]
+        heapq.heapify(self._start_heap)
+        self._end_heap = []
+        self._active_now = {}
+        for attack in self.active_attacks.values():
+            attack["status"] = AttackStatus.PENDING
+        clock, self._clock = self._clock, -np.inf
+        if clock > -np.inf:
+            self.advance_time(clock)
+    
+    def advance_time(self, current_time: float) -> None:
+        """
+        Avanza la agenda de ataques hasta `current_time`.
+        
+        Promueve a ACTIVE los ataques cuyo inicio ya pasó y marca COMPLETED
+        los que terminaron, actualizando las listas por señal. Si el tiempo
+        retrocede (nueva simulación) la agenda se reconstruye.
+        
+        Args:
+            current_time: Tiempo actual de simulación
+        """
+        if current_time < self._clock:
+            self._clock = -np.inf
+            self._reset_schedule()
+        self._clock = current_time
+        
+        while self._start_heap and self._start_heap[0][0] <= current_time:
+            _, attack_id = heapq.heappop(self._start_heap)
+            attack = self.active_attacks[attack_id]
+            attack["status"] = AttackStatus.ACTIVE
+            self._active_now.setdefault(attack["target_signal"], []).append({
+                "id": attack_id,
+                "type": attack["type"],
+                "params": attack["params"],
+                "start_time": attack["start_time"]
+            })
+            if attack["duration"] is not None:
+                heapq.heappush(self._end_heap, (attack["start_time"] + attack["duration"], attack_id))
+        
+        while self._end_heap and self._end_heap[0][0] < current_time:
+            _, attack_id = heapq.heappop(self._end_heap)
+            attack = self.active_attacks[attack_id]
+            attack["status"] = AttackStatus.COMPLETED
+            signal = attack["target_signal"]
+            self._active_now[signal] = [a for a in self._active_now[signal] if a["id"] != attack_id]
+    
     def get_active_attacks_for_signal(
         self,
         signal_name: str,
@@ -325,6 +578,8 @@ class AttackService:
         """
         Obtiene los ataques activos para una señal en un tiempo dado.
         
+        La lista retornada es la de la agenda (no copiarla por paso, no mutarla).
+        
         Args:
             signal_name: Nombre de la señal
             current_time: Tiempo actual de simulación
@@ -332,50 +587,19 @@ class AttackService:
         Returns:
             Lista de ataques activos
         """
-        active = []
-        
-        for attack_id, attack in self.active_attacks.items():
-            # Verificar si el ataque afecta a esta señal
-            if attack["target_signal"] != signal_name:
-                continue
-            
-            # Verificar si el ataque está en el tiempo correcto
-            start_time = attack["start_time"]
-            duration = attack["duration"]
-            
-            if current_time < start_time:
-                continue  # Aún no ha empezado
-            
-            if duration is not None and current_time > start_time + duration:
-                attack["status"] = AttackStatus.COMPLETED
-                continue  # Ya terminó
-            
-            # Ataque activo
-            attack["status"] = AttackStatus.ACTIVE
-            active.append({
-                "id": attack_id,
-                "type": attack["type"],
-                "params": attack["params"],
-                "start_time": start_time
-            })
-        
-        return active
+        if current_time != self._clock:
+            self.advance_time(current_time)
+        return self._active_now.get(signal_name, [])
     
     def clear_attacks(self):
         """Limpia todos los ataques registrados."""
         self.active_attacks.clear()
+        self._version += 1
+        self._reset_schedule()
         logger.info("🗑️ Ataques limpiados")
 
 
-# Singleton global
-_attack_service: Optional[AttackService] = None
-
-
+@lru_cache(maxsize=1)
 def get_attack_service() -> AttackService:
     """Obtiene la instancia singleton del servicio de ataques."""
-    global _attack_service
-    
-    if _attack_service is None:
-        _attack_service = AttackService()
-    
-    return _attack_service
+    return AttackService()
@@ -0,0 +1,273 @@
+"""
+Audit Writer Service
+
+Escritor en segundo plano para los logs de auditoría.
+
+Los routers encolan eventos con `await get_audit_writer().put({...})` (sin
+round-trip a la DB) y una task del lifespan los inserta en lote con COPY
+(asyncpg.copy_records_to_table) cada FLUSH_INTERVAL_S o al llegar a
+FLUSH_MAX_ROWS eventos encolados. Los eventos "critical" se escriben en el
+momento (con reintentos; si fallan, el error llega al llamador) para que sean
+durables aunque el proceso caiga.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import Request
+
+from app.db.session import async_engine
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_S = 0.1
+FLUSH_MAX_ROWS = 1000
+QUEUE_MAX_SIZE = 10_000
+CRITICAL_RETRIES = 3
+CRITICAL_RETRY_DELAY_S = 0.1
+
+# Marca de fin encolada por stop(): el writer escribe su lote y termina
+_STOP = object()
+
+# Columnas que escribe el COPY (id toma su DEFAULT)
+COPY_COLUMNS = (
+    "event_type",
+    "severity",
+    "message",
+    "details",
+    "user_id",
+    "ip_address",
+    "user_agent",
+    "endpoint",
+    "method",
+    "model_id",
+    "simulation_run_id",
+    "timestamp",
+)
+
+# Ancho de las columnas VARCHAR: un valor más largo haría fallar el COPY entero
+_MAX_LENGTHS = {
+    column: AuditLog.__table__.c[column].type.length
+    for column in COPY_COLUMNS
+    if getattr(AuditLog.__table__.c[column].type, "length", None)
+}
+
+
+def _clip(column: str, value: Any) -> Any:
+    """Recorta un valor de texto al ancho de su columna."""
+    limit = _MAX_LENGTHS.get(column)
+    if limit is not None and isinstance(value, str) and len(value) > limit:
+        return value[:limit]
+    return value
+
+
+def request_context(request: Request) -> Dict[str, Any]:
+    """Campos HTTP de un evento de auditoría (ip, user agent, endpoint, método), recortados al ancho de cada columna."""
+    return {
+        "ip_address": _clip("ip_address", request.client.host if request.client else None),
+        "user_agent": _clip("user_agent", request.headers.get("user-agent")),
+        "endpoint": _clip("endpoint", request.url.path),
+        "method": _clip("method", request.method),
+    }
+
+
+def _to_record(event: Dict[str, Any]) -> Tuple:
+    """
+    Convierte un evento a la tupla de COPY_COLUMNS.
+
+    COPY no aplica defaults de Python ni recorta: los textos se ajustan aquí
+    al ancho de su columna.
+    """
+    details = event.get("details")
+    return (
+        _clip("event_type", event["event_type"]),
+        _clip("severity", event.get("severity", "info")),
+        event["message"],
+        orjson.dumps(details, default=str).decode() if details is not None else None,
+        event.get("user_id"),
+        _clip("ip_address", event.get("ip_address")),
+        _clip("user_agent", event.get("user_agent")),
+        _clip("endpoint", event.get("endpoint")),
+        _clip("method", event.get("method")),
+        event.get("model_id"),
+        event.get("simulation_run_id"),
+        event.get("timestamp") or datetime.now(timezone.utc),
+    )
+
+
+class AuditWriter:
+    """
+    Cola asíncrona de eventos de auditoría con flush por lotes vía COPY.
+    """
+
+    def __init__(self):
+        """Inicializar cola y task (la task arranca con start())."""
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_MAX_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def put(self, event: Dict[str, Any]) -> None:
+        """
+        Registra un evento (columnas de audit_logs como dict).
+
+        Los eventos no críticos se encolan y se escriben en el siguiente
+        flush; si la cola está llena se espera (backpressure). Los críticos
+        se escriben antes de retornar y, si la escritura falla tras
+        CRITICAL_RETRIES intentos, se propaga el error.
+        """
+        if event.get("severity") == "critical":
+            await self._write_critical(_to_record(event))
+            return
+
+        try:
+            self.queue.put_nowait(_to_record(event))
+        except asyncio.QueueFull:
+            await self.queue.put(_to_record(event))
+
+    def start(self) -> None:
+        """Lanza la task de escritura (idempotente)."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(), name="audit-writer")
+            logger.info("✅ AuditWriter iniciado")
+
+    async def stop(self) -> None:
+        """Detiene la task (sin cancelarla: termina su lote) y escribe lo que quede en la cola."""
+        if self._task is not None:
+            if not self._task.done():
+                await self.queue.put(_STOP)
+                await self._task
+            self._task = None
+
+        while not self.queue.empty():
+            await self._flush(self._drain([]))
+        logger.info("AuditWriter detenido")
+
+    def _drain(self, batch: List[Tuple]) -> List[Tuple]:
+        """Mueve a `batch` los eventos ya encolados (hasta FLUSH_MAX_ROWS o la marca de fin)."""
+        while len(batch) < FLUSH_MAX_ROWS:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is _STOP:
+                self._stopping = True
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self) -> None:
+        """
+        Bucle: espera el primer evento y junta más durante FLUSH_INTERVAL_S.
+
+        Termina al recibir la marca de fin de stop(), después de escribir el
+        lote en curso.
+        """
+        loop = asyncio.get_running_loop()
+
+        while not self._stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + FLUSH_INTERVAL_S
+
+            while len(batch) < FLUSH_MAX_ROWS and not self._stopping:
+                self._drain(batch)
+                timeout = deadline - loop.time()
+                if self._stopping or len(batch) >= FLUSH_MAX_ROWS or timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    self._stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _write_critical(self, record: Tuple) -> None:
+        """Escribe un evento crítico con reintentos; el último error se propaga."""
+        for attempt in range(1, CRITICAL_RETRIES + 1):
+            try:
+                await self._copy([record])
+                return
+            except Exception as e:
+                if attempt == CRITICAL_RETRIES:
+                    logger.error(f"❌ Evento crítico de auditoría no escrito tras {attempt} intentos: {e}")
+                    raise
+                logger.warning(f"⚠️ Reintentando evento crítico de auditoría ({attempt}/{CRITICAL_RETRIES}): {e}")
+                await asyncio.sleep(CRITICAL_RETRY_DELAY_S * attempt)
+
+    async def _flush(self, records: List[Tuple]) -> None:
+        """
+        Escribe el lote con un único COPY.
+
+        Si el COPY falla, se reintenta fila a fila para que un evento inválido
+        no arrastre al resto del lote; solo se descartan (y registran) las
+        filas que fallan por sí solas.
+        """
+        if not records:
+            return
+
+        try:
+            await self._copy(records)
+            return
+        except Exception as e:
+            if len(records) == 1:
+                logger.error(f"❌ Error escribiendo log de auditoría: {e}")
+                return
+            logger.warning(f"⚠️ COPY de {len(records)} logs de auditoría falló, reintentando fila a fila: {e}")
+
+        written = 0
+        try:
+            async with async_engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                for record in records:
+                    try:
+                        await self._copy_to(raw.driver_connection, [record])
+                        written += 1
+                    except Exception as e:
+                        logger.error(f"❌ Log de auditoría descartado ({record[0]}): {e}")
+        except Exception as e:
+            logger.error(f"❌ Sin conexión para reintentar los logs de auditoría: {e}")
+
+        dropped = len(records) - written
+        if dropped:
+            logger.error(f"❌ {dropped}/{len(records)} logs de auditoría no escritos")
+
+    async def _copy(self, records: List[Tuple]) -> None:
+        """COPY de las filas a audit_logs (los errores se propagan)."""
+        async with async_engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await self._copy_to(raw.driver_connection, records)
+
+    @staticmethod
+    async def _copy_to(driver_connection: Any, records: List[Tuple]) -> None:
+        """COPY sobre una conexión asyncpg ya abierta."""
+        await driver_connection.copy_records_to_table(
+            "audit_logs",
+            records=records,
+            columns=COPY_COLUMNS
+        )
+
+
+# Singleton global
+_audit_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    """Obtiene la instancia singleton del escritor de auditoría."""
+    global _audit_writer
+
+    if _audit_writer is None:
+        _audit_writer = AuditWriter()
+
+    return _audit_writer
@@ -10,22 +10,61 @@ Orquesta el flujo completo:
 6. Se registra en LLMRequest para auditoría
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Optional
+import time
+from typing import AsyncIterator, Dict, Optional
 from pathlib import Path
 
-from app.connectors.llm.openai_adapter import OpenAIAdapter
-from app.connectors.llm.anthropic_adapter import AnthropicAdapter
 from app.services.rag_service import get_rag_service
+from app.services.semantic_cache import get_semantic_cache
 from app.config import get_settings
 from app.models import LLMRequest
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+# System prompt estático: instrucciones y requisitos de salida, primero en cada
+# request para que el proveedor reutilice el prefijo cacheado
+_SYSTEM_PROMPT = """You are an expert OT (Operational Technology) systems engineer specializing in:
+- Control systems (PID, state-space, transfer functions)
+- Process control (tanks, valves, pumps, heat exchangers)
+- SCADA systems and industrial automation
+- Cybersecurity in critical infrastructure
+
+Your task is to generate detailed, physically accurate models of OT systems based on user prompts.
+
+OUTPUT FORMAT:
+You MUST respond with a valid JSON object that strictly follows the TwinSec Model V1 schema.
+
+KEY REQUIREMENTS:
+1. Use proper differential equations for dynamics
+2. Include realistic physical parameters (capacities, flow rates, constants)
+3. Define clear signal names (component_id.signal_id format)
+4. Specify HMI widgets for visualization
+5. Include appropriate attack vectors for cybersecurity testing
+
+IMPORTANT:
+- Use SI units (meters, seconds, kg, etc.)
+- Provide meaningful descriptions
+- Ensure mathematical consistency
+- Think step-by-step about the physics
+
+For every USER REQUEST:
+- Generate a complete TwinSec Model V1 JSON
+- Include the 'solver' configuration (method, timestep, duration)
+- Define all 'components' with their types and parameters
+- Specify 'connections' between components
+- List all 'signals' (outputs of components)
+- Design 'hmi' widgets for visualization
+- Suggest realistic 'attacks' for security testing
+
+Think carefully about the physics and mathematics. Provide a realistic, detailed model."""
+
+
 class LLMService:
     """
     Servicio principal de generación de modelos con LLM + RAG.
@@ -34,14 +73,16 @@ class LLMService:
     def __init__(self):
         self.settings = settings
         
-        # Inicializar adaptadores según configuración
+        # Inicializar adaptadores según configuración (solo se importa el SDK usado)
         if self.settings.LLM_PROVIDER == "openai":
+            from app.connectors.llm.openai_adapter import OpenAIAdapter
             self.llm = OpenAIAdapter(
                 model=self.settings.OPENAI_MODEL,
                 temperature=self.settings.OPENAI_TEMPERATURE,
                 max_tokens=self.settings.OPENAI_MAX_TOKENS
             )
         elif self.settings.LLM_PROVIDER == "anthropic":
+            from app.connectors.llm.anthropic_adapter import AnthropicAdapter
             self.llm = AnthropicAdapter(
                 model="claude-sonnet-4.5",
                 temperature=0.0,
@@ -69,31 +110,11 @@ class LLMService:
     
     def _build_system_prompt(self) -> str:
         """
-        Construye el system prompt base para generación de modelos.
+        System prompt base para generación de modelos.
+        
+        Es idéntico en todas las requests (prefijo cacheable en el proveedor).
         """
-        return """You are an expert OT (Operational Technology) systems engineer specializing in:
-- Control systems (PID, state-space, transfer functions)
-- Process control (tanks, valves, pumps, heat exchangers)
-- SCADA systems and industrial automation
-- Cybersecurity in critical infrastructure
-
-Your task is to generate detailed, physically accurate models of OT systems based on user prompts.
-
-OUTPUT FORMAT:
-You MUST respond with a valid JSON object that strictly follows the TwinSec Model V1 schema.
-
-KEY REQUIREMENTS:
-1. Use proper differential equations for dynamics
-2. Include realistic physical parameters (capacities, flow rates, constants)
-3. Define clear signal names (component_id.signal_id format)
-4. Specify HMI widgets for visualization
-5. Include appropriate attack vectors for cybersecurity testing
-
-IMPORTANT:
-- Use SI units (meters, seconds, kg, etc.)
-- Provide meaningful descriptions
-- Ensure mathematical consistency
-- Think step-by-step about the physics"""
+        return _SYSTEM_PROMPT
     
     def _build_user_prompt(
         self,
@@ -103,33 +124,216 @@ IMPORTANT:
     ) -> str:
         """
         Construye el prompt del usuario enriquecido con contexto RAG.
+        
+        La parte dinámica va al final para no romper el prefijo cacheado.
         """
         prompt = f"{rag_context}\n" if rag_context else ""
         
         prompt += f"""USER REQUEST:
 Create a {model_type} system with the following specifications:
 
-{user_prompt}
-
-REQUIREMENTS:
-- Generate a complete TwinSec Model V1 JSON
-- Include the 'solver' configuration (method, timestep, duration)
-- Define all 'components' with their types and parameters
-- Specify 'connections' between components
-- List all 'signals' (outputs of components)
-- Design 'hmi' widgets for visualization
-- Suggest realistic 'attacks' for security testing
-
-Think carefully about the physics and mathematics. Provide a realistic, detailed model."""
+{user_prompt}"""
         
         return prompt
     
+    def _semantic_key(self, model_type: str) -> str:
+        """Bucket del caché semántico: mismo proveedor, modelo y model_type."""
+        return f"{self.settings.LLM_PROVIDER}:{self.llm.model}:{model_type}"
+    
+    async def _semantic_lookup(
+        self,
+        user_prompt: str,
+        model_type: str,
+        user_id: int,
+        db: AsyncSession,
+        t0: float
+    ):
+        """
+        Caché semántico: un prompt casi idéntico ya generado reutiliza el resultado.
+        
+        Como el caché exacto, solo se usa con temperature == 0.0. Un hit se
+        registra como un LLMRequest propio (sin tokens ni costo), así el
+        llm_request_id del resultado es de esta request y no de la cacheada.
+        
+        Returns:
+            (embedding del prompt o None, resultado cacheado o None)
+        """
+        if not self.settings.SEMANTIC_CACHE_ENABLED or self.llm.temperature != 0.0:
+            return None, None
+        
+        embedding = None
+        try:
+            embedding = await asyncio.to_thread(self.rag.embeddings.embed_query, user_prompt)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo calcular el embedding para el caché semántico: {e}")
+        
+        cached = None
+        if embedding is not None:
+            cached = get_semantic_cache().lookup(self._semantic_key(model_type), embedding)
+        if cached is None:
+            return embedding, None
+        
+        latency_ms = int((time.perf_counter() - t0) * 1000)
+        llm_request = LLMRequest(
+            user_id=user_id,
+            provider=self.settings.LLM_PROVIDER,
+            model_name=self.llm.model,
+            prompt=user_prompt,
+            temperature=self.llm.temperature,
+            max_tokens=self.llm.max_tokens,
+            response=json.dumps(cached["model"]),
+            prompt_tokens=0,
+            completion_tokens=0,
+            total_tokens=0,
+            cost_usd=0.0,
+            latency_ms=latency_ms,
+            success=True,
+            validation_passed=True,
+            model_type_requested=model_type,
+            user_metadata={"semantic_cache_hit": True}
+        )
+        db.add(llm_request)
+        await db.commit()
+        
+        return embedding, {
+            **cached,
+            "llm_request_id": llm_request.id,
+            "metadata": {
+                **cached["metadata"],
+                "cost_usd": 0.0,
+                "latency_ms": latency_ms,
+                "total_tokens": 0,
+                "semantic_cache_hit": True
+            }
+        }
+    
+    def _retrieve_context(self, user_prompt: str, model_type: str, use_rag: bool):
+        """
+        Recupera contexto con RAG (si está habilitado).
+        
+        Returns:
+            (contexto formateado para el prompt, fragmentos recuperados)
+        """
+        if not use_rag or self.rag.vectorstore is None:
+            return "", []
+        
+        logger.info("Recuperando contexto con RAG...")
+        
+        # Crear query optimizada para búsqueda
+        rag_query = f"{model_type} system {user_prompt} differential equations parameters"
+        
+        rag_results = self.rag.retrieve_context(
+            query=rag_query,
+            top_k=5,
+            min_relevance_score=0.5
+        )
+        
+        if not rag_results:
+            logger.warning("⚠️ No se encontró contexto relevante en RAG")
+            return "", []
+        
+        logger.info(f"✅ Contexto RAG recuperado ({len(rag_results)} fragmentos)")
+        return self.rag.format_context_for_prompt(rag_results), rag_results
+    
+    async def _record_success(
+        self,
+        response: Dict,
+        user_prompt: str,
+        system_prompt: str,
+        model_type: str,
+        user_id: int,
+        db: AsyncSession,
+        rag_results: list,
+        embedding
+    ) -> Dict:
+        """
+        Valida la respuesta del LLM, la registra en LLMRequest y arma el resultado.
+        """
+        # 4. Validar respuesta
+        if response["validation_error"]:
+            raise ValueError(f"LLM no generó JSON válido: {response['validation_error']}")
+        
+        model_json = response["parsed_json"]
+        
+        # TODO: Validar contra schema twinsec_model_v1.json
+        validation_passed = True
+        validation_errors = None
+        
+        # 5. Calcular costo
+        cost_usd = self.llm.estimate_cost(response["usage"])
+        
+        # 6. Registrar en base de datos (LLMRequest)
+        llm_request = LLMRequest(
+            user_id=user_id,
+            provider=self.settings.LLM_PROVIDER,
+            model_name=self.llm.model,
+            prompt=user_prompt,
+            system_prompt=system_prompt,
+            temperature=self.llm.temperature,
+            max_tokens=self.llm.max_tokens,
+            response=response["content"],
+            finish_reason=response["finish_reason"],
+            prompt_tokens=response["usage"]["prompt_tokens"],
+            completion_tokens=response["usage"]["completion_tokens"],
+            total_tokens=response["usage"]["total_tokens"],
+            cost_usd=cost_usd,
+            latency_ms=response["latency_ms"],
+            success=True,
+            validation_passed=validation_passed,
+            validation_errors=validation_errors,
+            model_type_requested=model_type
+        )
+        
+        # El INSERT trae el id con RETURNING; sin refresh (expire_on_commit=False)
+        db.add(llm_request)
+        await db.commit()
+        
+        logger.info(f"✅ Modelo generado exitosamente (ID: {llm_request.id}, Costo: ${cost_usd:.6f})")
+        
+        result = {
+            "model": model_json,
+            "llm_request_id": llm_request.id,
+            "metadata": {
+                "cost_usd": cost_usd,
+                "latency_ms": response["latency_ms"],
+                "total_tokens": response["usage"]["total_tokens"],
+                "rag_context_used": len(rag_results) > 0,
+                "rag_fragments_count": len(rag_results),
+                "cache_creation_input_tokens": response["usage"].get("cache_creation_input_tokens", 0),
+                "cache_read_input_tokens": response["usage"].get("cache_read_input_tokens", 0),
+                "semantic_cache_hit": False
+            }
+        }
+        
+        if embedding is not None:
+            get_semantic_cache().add(self._semantic_key(model_type), embedding, result)
+        
+        return result
+    
+    async def _record_failure(self, error: Exception, user_prompt: str, user_id: int, db: AsyncSession) -> None:
+        """
+        Registra una generación fallida en LLMRequest.
+        """
+        logger.error(f"❌ Error al generar modelo: {str(error)}")
+        
+        llm_request = LLMRequest(
+            user_id=user_id,
+            provider=self.settings.LLM_PROVIDER,
+            model_name=self.llm.model,
+            prompt=user_prompt,
+            success=False,
+            error_message=str(error)
+        )
+        
+        db.add(llm_request)
+        await db.commit()
+    
     async def generate_model(
         self,
         user_prompt: str,
         model_type: str,
         user_id: int,
-        db: Session,
+        db: AsyncSession,
         use_rag: bool = True
     ) -> Dict:
         """
@@ -155,28 +359,15 @@ Think carefully about the physics and mathematics. Provide a realistic, detailed
             }
         """
         logger.info(f"Generando modelo '{model_type}' para usuario {user_id}")
+        t0 = time.perf_counter()
         
-        # 1. Recuperar contexto con RAG (si está habilitado)
-        rag_context = ""
-        rag_results = []
+        # 0. Caché semántico
+        embedding, cached = await self._semantic_lookup(user_prompt, model_type, user_id, db, t0)
+        if cached is not None:
+            return cached
         
-        if use_rag and self.rag.vectorstore is not None:
-            logger.info("Recuperando contexto con RAG...")
-            
-            # Crear query optimizada para búsqueda
-            rag_query = f"{model_type} system {user_prompt} differential equations parameters"
-            
-            rag_results = self.rag.retrieve_context(
-                query=rag_query,
-                top_k=5,
-                min_relevance_score=0.5
-            )
-            
-            if rag_results:
-                rag_context = self.rag.format_context_for_prompt(rag_results)
-                logger.info(f"✅ Contexto RAG recuperado ({len(rag_results)} fragmentos)")
-            else:
-                logger.warning("⚠️ No se encontró contexto relevante en RAG")
+        # 1. Recuperar contexto con RAG (si está habilitado)
+        rag_context, rag_results = self._retrieve_context(user_prompt, model_type, use_rag)
         
         # 2. Construir prompts
         system_prompt = self._build_system_prompt()
@@ -188,80 +379,68 @@ Think carefully about the physics and mathematics. Provide a realistic, detailed
         
         # 3. Generar con LLM
         try:
-            response = self.llm.generate_json(
+            response = await self.llm.generate_json(
                 prompt=user_prompt_enriched,
                 system_prompt=system_prompt
             )
             
-            # 4. Validar respuesta
-            if response["validation_error"]:
-                raise ValueError(f"LLM no generó JSON válido: {response['validation_error']}")
-            
-            model_json = response["parsed_json"]
-            
-            # TODO: Validar contra schema twinsec_model_v1.json
-            validation_passed = True
-            validation_errors = None
-            
-            # 5. Calcular costo
-            cost_usd = self.llm.estimate_cost(response["usage"])
-            
-            # 6. Registrar en base de datos (LLMRequest)
-            llm_request = LLMRequest(
-                user_id=user_id,
-                provider=self.settings.LLM_PROVIDER,
-                model_name=self.llm.model,
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                temperature=self.llm.temperature,
-                max_tokens=self.llm.max_tokens,
-                response=response["content"],
-                finish_reason=response["finish_reason"],
-                prompt_tokens=response["usage"]["prompt_tokens"],
-                completion_tokens=response["usage"]["completion_tokens"],
-                total_tokens=response["usage"]["total_tokens"],
-                cost_usd=cost_usd,
-                latency_ms=response["latency_ms"],
-                success=True,
-                validation_passed=validation_passed,
-                validation_errors=validation_errors,
-                model_type_requested=model_type
+            return await self._record_success(
+                response, user_prompt, system_prompt, model_type, user_id, db, rag_results, embedding
             )
-            
-            db.add(llm_request)
-            db.commit()
-            db.refresh(llm_request)
-            
-            logger.info(f"✅ Modelo generado exitosamente (ID: {llm_request.id}, Costo: ${cost_usd:.6f})")
-            
-            return {
-                "model": model_json,
-                "llm_request_id": llm_request.id,
-                "metadata": {
-                    "cost_usd": cost_usd,
-                    "latency_ms": response["latency_ms"],
-                    "total_tokens": response["usage"]["total_tokens"],
-                    "rag_context_used": len(rag_results) > 0,
-                    "rag_fragments_count": len(rag_results)
-                }
-            }
         
         except Exception as e:
-            logger.error(f"❌ Error al generar modelo: {str(e)}")
-            
-            # Registrar error en base de datos
-            llm_request = LLMRequest(
-                user_id=user_id,
-                provider=self.settings.LLM_PROVIDER,
-                model_name=self.llm.model,
-                prompt=user_prompt,
-                success=False,
-                error_message=str(e)
-            )
-            
-            db.add(llm_request)
-            db.commit()
+            await self._record_failure(e, user_prompt, user_id, db)
+            raise
+    
+    async def generate_model_stream(
+        self,
+        user_prompt: str,
+        model_type: str,
+        user_id: int,
+        db: AsyncSession,
+        use_rag: bool = True
+    ) -> AsyncIterator[Dict]:
+        """
+        Igual que generate_model, pero emite el texto del LLM a medida que llega.
+        
+        Yields:
+            {"delta": "..."} por cada fragmento y, al final,
+            {"result": {...}} con el mismo formato que retorna generate_model
+        """
+        logger.info(f"Generando modelo '{model_type}' (streaming) para usuario {user_id}")
+        t0 = time.perf_counter()
+        
+        embedding, cached = await self._semantic_lookup(user_prompt, model_type, user_id, db, t0)
+        if cached is not None:
+            yield {"result": cached}
+            return
+        
+        rag_context, rag_results = self._retrieve_context(user_prompt, model_type, use_rag)
+        
+        system_prompt = self._build_system_prompt()
+        user_prompt_enriched = self._build_user_prompt(
+            user_prompt, 
+            model_type,
+            rag_context
+        )
+        
+        try:
+            response = None
+            async for item in self.llm.generate_json_stream(
+                prompt=user_prompt_enriched,
+                system_prompt=system_prompt
+            ):
+                if isinstance(item, dict):
+                    response = item
+                else:
+                    yield {"delta": item}
             
+            yield {"result": await self._record_success(
+                response, user_prompt, system_prompt, model_type, user_id, db, rag_results, embedding
+            )}
+        
+        except Exception as e:
+            await self._record_failure(e, user_prompt, user_id, db)
             raise
 
 
@@ -13,10 +13,13 @@ Arquitectura:
 """
 
 import os
+from hashlib import sha256
 from pathlib import Path
 from typing import List, Dict, Optional
 import logging
 
+from cachetools import TTLCache
+
 # LangChain para RAG
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.embeddings import HuggingFaceEmbeddings
@@ -31,6 +34,10 @@ from langchain.schema import Document
 
 logger = logging.getLogger(__name__)
 
+# Resultados de retrieve_context por sha256(query normalizada, top_k, score mínimo)
+RETRIEVAL_CACHE_TTL_S = 900
+RETRIEVAL_CACHE_MAX_ENTRIES = 1024
+
 
 class RAGService:
     """
@@ -74,6 +81,12 @@ class RAGService:
             separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
         )
         
+        # Caché de recuperaciones (evita embedding + búsqueda en prompts repetidos)
+        self._retrieval_cache: TTLCache = TTLCache(
+            maxsize=RETRIEVAL_CACHE_MAX_ENTRIES,
+            ttl=RETRIEVAL_CACHE_TTL_S
+        )
+        
         # Estadísticas
         self.stats = {
             "total_documents": 0,
@@ -219,6 +232,9 @@ class RAGService:
         Args:
             force_reindex: Si True, re-indexa aunque exista el vector store
         """
+        # Las recuperaciones cacheadas apuntan al índice anterior
+        self._retrieval_cache.clear()
+        
         # Intentar cargar vector store existente
         if not force_reindex:
             self.vectorstore = self.load_vectorstore()
@@ -275,6 +291,14 @@ class RAGService:
             logger.warning("Vector store no inicializado")
             return []
         
+        key = sha256(
+            f"{' '.join(query.lower().split())}|{top_k}|{min_relevance_score}".encode()
+        ).digest()
+        cached = self._retrieval_cache.get(key)
+        if cached is not None:
+            logger.info(f"📖 Recuperados {len(cached)}/{top_k} fragmentos relevantes (cache)")
+            return list(cached)
+        
         # Búsqueda semántica con scores
         results = self.vectorstore.similarity_search_with_score(
             query,
@@ -295,6 +319,8 @@ class RAGService:
         
         logger.info(f"📖 Recuperados {len(relevant_results)}/{top_k} fragmentos relevantes")
         
+        self._retrieval_cache[key] = relevant_results
+        
         return relevant_results
     
     def format_context_for_prompt(self, context_results: List[Dict]) -> str:
@@ -0,0 +1,105 @@
+"""
+Semantic Cache Service
+
+Caché en proceso de resultados de generate_model indexado por embedding del
+prompt. Un prompt nuevo cuya similitud coseno con uno ya generado (del mismo
+bucket: proveedor, modelo y model_type) supere SEMANTIC_CACHE_THRESHOLD
+reutiliza ese resultado y evita la llamada al LLM y la búsqueda RAG.
+
+Los embeddings vienen normalizados (RAGService usa normalize_embeddings=True),
+así que la similitud coseno es un producto punto: un lookup es un único
+matmul (N x D) @ (D,) sobre la matriz del model_type.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class _Bucket:
+    """Embeddings y resultados cacheados de un model_type (filas alineadas)."""
+    
+    __slots__ = ("vectors", "expires_at", "results")
+    
+    def __init__(self, dim: int):
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.expires_at = np.empty(0, dtype=np.float64)
+        self.results: List[Dict[str, Any]] = []
+
+
+class SemanticCache:
+    """
+    Índice coseno por model_type con TTL y tamaño máximo (FIFO).
+    """
+    
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        ttl_s: int = settings.SEMANTIC_CACHE_TTL_S,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._buckets: Dict[str, _Bucket] = {}
+    
+    def lookup(self, model_type: str, embedding: Sequence[float]) -> Optional[Dict[str, Any]]:
+        """
+        Busca el resultado más similar vigente.
+        
+        Returns:
+            El resultado cacheado, o None si ninguno supera el umbral
+        """
+        bucket = self._buckets.get(model_type)
+        if bucket is None or not bucket.results:
+            return None
+        
+        scores = bucket.vectors @ np.asarray(embedding, dtype=np.float32)
+        scores[bucket.expires_at < time.time()] = -1.0
+        
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        
+        logger.info(f"🎯 Semantic cache hit ({model_type}, similitud {scores[best]:.3f})")
+        return bucket.results[best]
+    
+    def add(self, model_type: str, embedding: Sequence[float], result: Dict[str, Any]) -> None:
+        """Agrega un resultado, descartando los vencidos y los más viejos si excede el máximo."""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        bucket = self._buckets.get(model_type)
+        if bucket is None:
+            bucket = self._buckets[model_type] = _Bucket(vector.shape[1])
+        
+        keep = bucket.expires_at >= time.time()
+        live = np.flatnonzero(keep)
+        keep[live[:max(0, len(live) + 1 - self.max_entries)]] = False
+        
+        bucket.vectors = np.vstack([bucket.vectors[keep], vector])
+        bucket.expires_at = np.append(bucket.expires_at[keep], time.time() + self.ttl_s)
+        bucket.results = [r for r, k in zip(bucket.results, keep) if k] + [result]
+    
+    def clear(self) -> None:
+        """Vacía el caché."""
+        self._buckets.clear()
+
+
+# Singleton global
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Obtiene la instancia singleton del caché semántico."""
+    global _semantic_cache
+    
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    
+    return _semantic_cache